@@ -3,9 +3,23 @@ import re
 import sys
 import json
 import time
+import shutil
 from urllib.parse import unquote
 from playwright.sync_api import sync_playwright
-from pypdf import PdfWriter
+from pdf_merge import merge_pdfs
+from markdown_export import export_markdown
+from resource_policy import ResourcePolicy
+from crawl_manifest import CrawlManifest
+from crawl_store import CrawlStore
+from discovery_cache import DiscoveryCache
+from static_sidebar import StaticSidebar, tree_from_rows
+from web_archive import WebArchive
+from crawl_metrics import CrawlMetrics
+from context_pool import PageRecycler
+from search_index import SearchIndex
+from light_render import render_light_jobs
+from section_render import CAPTURE_JS, ASSEMBLE_JS, SECTION_FILE, section_batches, split_section
+from wait_policy import WaitPolicy, MAIN_CONTENT, H1_HYDRATED, ACCORDION_NAV_POPULATED
 
 # Force UTF-8
 sys.stdout.reconfigure(encoding='utf-8')
@@ -14,6 +28,86 @@ sys.stdout.reconfigure(encoding='utf-8')
 START_URL = "https://pro.arcgis.com/en/pro-app/latest/arcpy/main/arcgis-pro-arcpy-reference.htm"
 OUTPUT_DIR = "05Pro_ArcPyReference"
 MERGED_FILENAME = "ArcGIS_Pro_ArcPyReference.pdf"
+MERGE_WORKERS = 4 # processes copying merge fragments in parallel; 0 or 1 = single process
+OPTIMIZE_PDF = True # after merging, share identical font/image streams and compress unfiltered streams
+MERGE_REPORT = "pro_merge_report.json" # inputs skipped by the merge, plus time / memory figures
+HIERARCHY_LOG = "pro_hierarchy.txt"
+DEBUG_JSON = "pro_sidebar_debug.json"
+RESOLVED_TREE = "pro_resolved_tree.json" # sidebar with lazy groups/folders expanded (discovery output)
+
+# Section rendering (see section_render.py): print the pages of each folder with one page.pdf
+# call, SECTION_BATCH_PAGES pages at a time, and cut the result back into per-page PDFs.
+# False = one print job per page.
+SECTION_BATCH = False
+SECTION_BATCH_PAGES = 50
+
+# Lightweight rendering (see light_render.py): pages without complex layout are fetched over
+# HTTP and printed by a pure-Python HTML-to-PDF engine ("weasyprint" or "xhtml2pdf", must be
+# installed) in LIGHT_RENDER_WORKERS processes before Chromium starts; Chromium prints the rest.
+# Live runs only (not with --record / --replay). None = Chromium prints every page.
+LIGHT_RENDER = None
+LIGHT_RENDER_WORKERS = 4
+
+# Request interception: block consent/analytics/feedback hosts and fonts/media so pages
+# stop waiting on them (see resource_policy.py). None = load everything.
+RESOURCE_POLICY = ResourcePolicy.esri_docs()
+
+# Timing (see crawl_metrics.py): per-page stage timings (navigate, details, header, css, index,
+# pdf; discovery scrapes; merge) streamed to METRICS_FILE (.jsonl or .csv), with a percentile
+# summary at the end of the run. TRACE_FILE = a Chrome trace JSON path, None = no trace.
+METRICS_FILE = "pro_crawl_metrics.jsonl"
+TRACE_FILE = None
+METRICS = CrawlMetrics(METRICS_FILE, TRACE_FILE)
+
+# Context recycling (see context_pool.py): the render page gets a fresh browser context after
+# RECYCLE_PAGES pages, or as soon as its JS heap passes RECYCLE_HEAP_MB. 0 = no limit.
+RECYCLE_PAGES = 200
+RECYCLE_HEAP_MB = 512
+
+# Incremental crawl (see crawl_manifest.py): keep the previous output and only re-print pages
+# whose content, title or print settings changed since the last run. --incremental overrides this.
+INCREMENTAL = False
+MANIFEST = "pro_crawl_manifest.json"
+
+# Durable crawl state (see crawl_store.py): the planned work list and each page's status are
+# written to this SQLite file as the crawl runs. --resume continues an interrupted run from it.
+CRAWL_DB = "pro_crawl_state.db"
+STORE = CrawlStore(CRAWL_DB)
+
+# Record/replay archive (see web_archive.py). "record" saves every response under ARCHIVE_DIR
+# while crawling; "replay" serves pages from it with no network, so changing CSS_INJECT or
+# PDF_OPTIONS only costs a re-render. None = live. --record / --replay override this.
+ARCHIVE_DIR = "pro_site_archive"
+ARCHIVE = WebArchive(ARCHIVE_DIR, mode=None)
+
+# Page readiness (see wait_policy.py). Pro pages are server-rendered: main content, the
+# hero H1 and the accordion links are enough; networkidle is only the fallback.
+# Lazy accordion groups get 5s for their links before falling back for another 5s.
+WAIT_POLICY = WaitPolicy({"main content": MAIN_CONTENT, "h1": H1_HYDRATED, "accordion nav": ACCORDION_NAV_POPULATED})
+SIDEBAR_WAIT = WaitPolicy({"accordion nav": ACCORDION_NAV_POPULATED}, signal_timeout=5000, fallback_timeout=5000)
+
+# Discovery cache (see discovery_cache.py): the children each lazy folder's scrape returned,
+# reused on later runs (no navigation) while the sidebar list the folder sits in is unchanged
+# and the entry is younger than a week. None = always scrape.
+DISCOVERY_CACHE_FILE = "pro_discovery_cache.json"
+DISCOVERY_CACHE = DiscoveryCache(DISCOVERY_CACHE_FILE)
+
+# Sidebar discovery engine: "browser" (Chromium clicks .accordion-title) or "static" (HTTP fetch
+# of pages and of the lazy groups' sidebar fragment .js files, see static_sidebar.py).
+DISCOVERY_ENGINE = "browser"
+
+# Markdown export (see markdown_export.py, --markdown): .md files in the numbered tree plus
+# heading-aware JSONL chunks, fetched over HTTP (or from ARCHIVE_DIR with --replay), no Chromium.
+MARKDOWN_DIR = "05Pro_ArcPyReference_Markdown"
+CHUNKS_JSONL = "ArcGIS_Pro_ArcPyReference.jsonl"
+MARKDOWN_WORKERS = 8
+
+# Full-text search (see search_index.py): the text of every printed page goes into an FTS5
+# index shared by all printers (site = OUTPUT_DIR name), captured from the loaded page right
+# before page.pdf. None = off. Query it with: python search_index.py "some words"
+CONTENT_SELECTORS = ['div[role="main"]', ".column-19", ".column-17", "main"] # same lookup order as HEADER_INJECT_JS
+SEARCH_DB = "docs_search.db"
+SEARCH_INDEX = SearchIndex(SEARCH_DB, site=os.path.basename(OUTPUT_DIR), content_selectors=CONTENT_SELECTORS)
 
 # Aggressive CSS to reveal everything and clean print
 CSS_INJECT = """
@@ -38,459 +132,820 @@ div[role="main"] { width: 100% !important; margin: 0 !important; }
 body { background-color: white !important; -webkit-print-color-adjust: exact; }
 """
 
+PDF_OPTIONS = {"format": "A4", "margin": {"top":"1cm","bottom":"1cm","left":"1cm","right":"1cm"}}
+
+# ------------------------------------------------------------------
+# IN-PAGE SCRIPTS
+# ------------------------------------------------------------------
+# HYBRID TREE PARSER
+# Flat node table like full_site_printer.TREE_PARSER_JS: [parent, kind, title,
+# url, flags] rows in document order, nested by static_sidebar.tree_from_rows.
+TREE_PARSER_JS = """() => {
+    const COLLAPSED = 1, NEEDS_EXPANSION = 2;
+    const FIRST = [['title', el => el.classList.contains('accordion-title')], ['h3', el => el.tagName === 'H3'],
+                   ['h4', el => el.tagName === 'H4'], ['content', el => el.classList.contains('accordion-content')]];
+    let first = new Map();
+    function index(el) {
+        let found = {};
+        for (let child of el.children) {
+            let sub = index(child);
+            for (let [key, test] of FIRST) {
+                if (found[key]) continue;
+                if (test(child)) found[key] = child;
+                else if (sub[key]) found[key] = sub[key];
+            }
+        }
+        first.set(el, found);
+        return found;
+    }
+
+    let rows = [];
+    let kept = []; // per row: direct children that survive the group title filter
+    function counts(parent, title) {
+        return parent >= 0 && !(rows[parent][1] === 'accordion' && rows[parent][2] === title);
+    }
+    function push(parent, kind, title, url, flags) {
+        rows.push([parent, kind, title, url || '', flags || 0]);
+        kept.push(0);
+        if (counts(parent, title)) kept[parent]++;
+        return rows.length - 1;
+    }
+    function truncate(mark) {
+        if (counts(rows[mark][0], rows[mark][2])) kept[rows[mark][0]]--;
+        rows.length = mark;
+        kept.length = mark;
+    }
+    function linkFlags(a) {
+        return (a.hasAttribute('data-collapsed') || a.classList.contains('icon-ui-right')) ? COLLAPSED : 0;
+    }
+
+    function walk(node, parent) {
+        for (let child of node.children) {
+            // SKIP Headers that are just titles (handled in group check)
+            if (child.classList.contains('accordion-title') || ['H3','H4'].includes(child.tagName)) continue;
+
+            // CASE 1: GROUP (Accordion/Header Container)
+            // Pro uses h4.accordion-title inside div.accordion-section
+            let found = first.get(child);
+            let headerEl = found.title || found.h3 || found.h4;
+            let isSection = child.classList.contains('accordion-section');
+            if (isSection || (headerEl && found.content)) {
+                let gid = push(parent, 'accordion', (headerEl || child).innerText.trim());
+                walk(found.content || child, gid);
+
+                // Needs expansion: has data-url, or an empty section
+                let needsExpansion = child.hasAttribute('data-url') || (kept[gid] === 0 && isSection);
+                if (kept[gid] > 0 || needsExpansion) {
+                    rows[gid][4] = needsExpansion ? NEEDS_EXPANSION : 0;
+                    continue;
+                }
+                truncate(gid);
+            }
+
+            // CASE 2: LI WRAPPER (Common in older docs, Pro uses div/nav mostly but good to keep)
+            if (child.tagName === 'LI') {
+                let link = child.querySelector(':scope > a');
+                if (!link) {
+                    walk(child, parent);
+                    continue;
+                }
+                let gid = push(parent, 'group', link.innerText.trim(), link.href);
+                for (let c of child.children) {
+                    if (c !== link) walk(c, gid);
+                }
+                if (kept[gid] === 0) {
+                    rows[gid][1] = 'link';
+                    rows[gid][4] = linkFlags(link);
+                }
+                continue;
+            }
+
+            // CASE 3: FLATTEN WRAPPERS
+            if (['NAV','DIV','UL'].includes(child.tagName)) {
+                walk(child, parent);
+                continue;
+            }
+
+            // CASE 4: LOOSE LINK
+            if (child.tagName === 'A') {
+                push(parent, 'link', child.innerText.trim(), child.href, linkFlags(child));
+            }
+        }
+    }
+
+    let root = document.querySelector('aside.js-accordion');
+    if (!root) return [];
+    index(root);
+    walk(root, -1);
+    return rows;
+}"""
+
+# SCRAPE ACTIVE CHILDREN (LAZY LOAD)
+ACTIVE_CHILDREN_JS = """() => {
+    // Re-use parseNode logic roughly. Unlike full_site_printer this returns the
+    // active link's whole section (siblings included) and the Python side
+    // dedups through 'visited', so there is no depth or indentation to detect;
+    // links are appended to one list instead of concatenating one per level.
+    function parseNode(node, items) {
+        for (let child of node.children) {
+            if (['H1','H2','H3','H4','H5'].includes(child.tagName) || child.classList.contains('accordion-title')) continue;
+
+            if (child.classList.contains('accordion-section')) {
+                // Recurse into section content
+                parseNode(child.querySelector('.accordion-content') || child, items);
+                continue;
+            }
+
+            if (child.tagName === 'LI') {
+                let link = child.querySelector(':scope > a');
+                if (link) items.push(linkItem(link));
+                // Recurse for nested lists
+                for (let c of child.children) {
+                    if (c.tagName === 'UL' || c.tagName === 'DIV') parseNode(c, items);
+                }
+                continue;
+            }
+
+            // General Containers
+            if (['NAV','DIV','UL'].includes(child.tagName)) {
+                parseNode(child, items);
+                continue;
+            }
+
+            // Direct Link
+            if (child.tagName === 'A') items.push(linkItem(child));
+        }
+        return items;
+    }
+    function linkItem(a) {
+        let isCollapsed = a.hasAttribute('data-collapsed') || a.classList.contains('icon-ui-right');
+        return { type: 'link', title: a.innerText.trim(), url: a.href, is_collapsed: isCollapsed };
+    }
+
+    let items = [];
+    
+    // 1. Find the Active Element
+    let activeEl = document.querySelector('.is-active');
+    if (!activeEl) return [];
+
+    // 2. Identify Scope (The Section/Container we are in)
+    // If we are in an accordion content, we want everything in that content.
+    let sectionContent = activeEl.closest('.accordion-content');
+    let sectionWrapper = activeEl.closest('.accordion-section');
+    
+    // If NO specific section found (rare), maybe just siblings?
+    let targetContainer = sectionContent || sectionWrapper;
+    
+    if (targetContainer) {
+        // We found a container. Parse it fully.
+        // This returns ALL siblings (including the active one).
+        // The python side handles deduplication of the active one via 'visited' set.
+        items = parseNode(targetContainer, []);
+    } else {
+         // Fallback: Just look for immediate sibling links if we are loose
+         // e.g. Side-nav-link
+         let parent = activeEl.parentElement;
+         if (parent) items = parseNode(parent, []);
+    }
+
+    return items;
+}"""
+
+# SCRAPE AN EXPANDED LAZY GROUP
+GROUP_CHILDREN_JS = """(title) => {
+    let headers = Array.from(document.querySelectorAll('.accordion-title'));
+    let target = headers.find(h => h.innerText.trim() === title);
+    if (!target) return [];
+    let section = target.closest('.accordion-section');
+    if (!section) return [];
+    let content = section.querySelector('.accordion-content') || section.querySelector('nav');
+    if (!content) return [];
+    
+    let items = [];
+    content.querySelectorAll('a').forEach(a => {
+         let isCollapsed = a.hasAttribute('data-collapsed') || a.classList.contains('icon-ui-right');
+         items.push({ type: 'link', title: a.innerText.trim(), url: a.href, is_collapsed: isCollapsed });
+    });
+    return items;
+}"""
+
+# LAZY GROUP READY: its nav links are in the DOM
+GROUP_READY_JS = """(title) => {
+    let headers = Array.from(document.querySelectorAll('.accordion-title'));
+    let target = headers.find(h => h.innerText.trim() === title);
+    let section = target && target.closest('.accordion-section');
+    return !!section && section.querySelectorAll('nav a').length > 0;
+}"""
+
+# CLICK A LAZY GROUP OPEN (only if collapsed)
+EXPAND_GROUP_JS = """(title) => {
+    let headers = Array.from(document.querySelectorAll('.accordion-title'));
+    let target = headers.find(h => h.innerText.trim() === title);
+    if (target) {
+        let section = target.closest('.accordion-section');
+        // If generic section or explicitly collapsed, click it.
+        // Check if content is visible?
+        let content = section.querySelector('.accordion-content');
+        if (!content || content.style.display === 'none' || section.getAttribute('data-collapsed') === 'true') {
+            target.click();
+        }
+    }
+}"""
+
+# EXPAND EVERY PENDING LAZY GROUP AT ONCE (click the collapsed ones, like EXPAND_GROUP_JS)
+EXPAND_GROUPS_JS = """(titles) => {
+    let wanted = new Set(titles);
+    let clicked = 0;
+    for (let target of document.querySelectorAll('.accordion-title')) {
+        let title = target.innerText.trim();
+        if (!wanted.has(title)) continue;
+        wanted.delete(title); // first header with that title, as in EXPAND_GROUP_JS
+        let section = target.closest('.accordion-section');
+        if (!section) continue;
+        let content = section.querySelector('.accordion-content');
+        if (!content || content.style.display === 'none' || section.getAttribute('data-collapsed') === 'true') {
+            target.click();
+            clicked++;
+        }
+    }
+    return clicked;
+}"""
+
+# SECTION OF EACH TITLE (shared by the bulk ready check and scrape)
+GROUP_SECTIONS_JS = """
+    let sections = {};
+    for (let target of document.querySelectorAll('.accordion-title')) {
+        let title = target.innerText.trim();
+        if (titles.includes(title) && !(title in sections)) sections[title] = target.closest('.accordion-section');
+    }
+"""
+
+# ALL LAZY GROUPS READY: every one of them has nav links
+GROUPS_READY_JS = """(titles) => {""" + GROUP_SECTIONS_JS + """
+    return titles.every(t => sections[t] && sections[t].querySelectorAll('nav a').length > 0);
+}"""
+
+# SCRAPE EVERY EXPANDED LAZY GROUP: {title: children}
+GROUPS_CHILDREN_JS = """(titles) => {""" + GROUP_SECTIONS_JS + """
+    let groups = {};
+    for (let title of titles) {
+        let section = sections[title];
+        let content = section && (section.querySelector('.accordion-content') || section.querySelector('nav'));
+        groups[title] = content ? Array.from(content.querySelectorAll('a')).map(a => {
+            let isCollapsed = a.hasAttribute('data-collapsed') || a.classList.contains('icon-ui-right');
+            return { type: 'link', title: a.innerText.trim(), url: a.href, is_collapsed: isCollapsed };
+        }) : [];
+    }
+    return groups;
+}"""
+
+# INJECT BREADCRUMBS & TITLE
+HEADER_INJECT_JS = """(title) => {
+    // Possible main content containers in Pro docs
+    let content = document.querySelector('div[role="main"]') || document.querySelector('.column-19') || document.querySelector('.column-17') || document.querySelector('main') || document.body;
+    
+    let targetH1 = document.querySelector('h1');
+    let breadcrumbs = document.querySelector('nav.breadcrumbs');
+
+    if (targetH1) {
+        let newH1 = targetH1.cloneNode(true);
+        newH1.style.cssText = 'display: block !important; font-size: 24pt !important; font-weight: bold !important; margin-bottom: 20px !important; color: #000 !important; page-break-after: avoid !important; visibility: visible !important; opacity: 1 !important;';
+        content.prepend(newH1);
+    } else {
+        let h1 = document.createElement('h1');
+        h1.innerText = title;
+        h1.style.cssText = 'display: block !important; font-size: 24pt !important; font-weight: bold !important; margin-bottom: 20px !important; color: #000 !important; page-break-after: avoid !important;';
+        content.prepend(h1);
+    }
+
+    if (breadcrumbs) {
+        let newBC = breadcrumbs.cloneNode(true);
+        newBC.classList.add('injected-breadcrumb');
+        newBC.style.cssText = 'display: block !important; font-size: 10pt !important; color: #666 !important; margin-bottom: 10px !important; visibility: visible !important; opacity: 1 !important;';
+        content.prepend(newBC);
+    }
+}"""
+
 def clean_filename(name):
     name = unquote(name)
     name = re.sub(r'[\\/*?:"<>|]', "", name)
     name = name.replace(" ", "_").strip()
     return name[:80]
 
-def merge_pdfs(root_dir, output_file):
-    entries = []
-    for root, dirs, files in os.walk(root_dir):
-        for f in files:
-            if f.endswith(".pdf"):
-                entries.append(os.path.join(root, f))
-    entries.sort()
-    
-    if not entries: return
-    print(f"\n📦 Merging {len(entries)} pages into {output_file}...")
-    
-    merger = PdfWriter()
-    for p in entries:
-        try: merger.append(p)
-        except: pass
-        
-    with open(output_file, "wb") as f_out:
-        merger.write(f_out)
-    print(f"✅ Created Combined PDF: {output_file}")
-
-def run():
-    if os.path.exists(OUTPUT_DIR):
-        import shutil
+class CrawlState:
+    """Planner bookkeeping: dedup set, expected files, work list and hierarchy log."""
+
+    def __init__(self, log_path=None):
+        self.visited = set()
+        self.expected_pdfs = {} # path -> url
+        self.jobs = [] # flat render work list, in merge order
+        self.folders = []
+        self.titles = {} # folder path -> sidebar title (merged PDF bookmarks)
+        self.log_path = log_path
+
+    def log(self, level, line):
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(f"{'  '*level}{line}\n")
+
+    def add_job(self, path, url, title):
+        self.expected_pdfs[path] = url
+        self.jobs.append({"path": path, "url": url, "title": title})
+
+    def add_folder(self, path, title):
+        self.folders.append(path)
+        self.titles[path] = title
+
+def prepare_output():
+    # Incremental runs move the last output aside instead of deleting it (PDFs are reused from there)
+    previous = None
+    if INCREMENTAL:
+        previous = CrawlManifest.stash_output(OUTPUT_DIR)
+    elif os.path.exists(OUTPUT_DIR):
         try: shutil.rmtree(OUTPUT_DIR)
         except: pass
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
+
     # Init Hierarchy Log
-    with open("pro_hierarchy.txt", "w", encoding="utf-8") as f:
+    with open(HIERARCHY_LOG, "w", encoding="utf-8") as f:
         f.write("🌳 Full Detected Hierarchy\n==========================\n")
-
+    return previous
+
+def incremental_jobs(state, previous):
+    """Incremental mode: copy unchanged PDFs from the previous output, return (manifest, jobs left to print)."""
+    if not INCREMENTAL:
+        return None, state.jobs
+    manifest = CrawlManifest(MANIFEST)
+    return manifest, manifest.reuse_unchanged(state.jobs, OUTPUT_DIR, previous, (CSS_INJECT, PDF_OPTIONS))
+
+def merge_output(state):
+    # Work-list order and sidebar titles give the merged PDF its bookmark tree
+    with METRICS.record("merge", path=MERGED_FILENAME) as timing:
+        with timing.stage("merge"):
+            merge_pdfs(OUTPUT_DIR, MERGED_FILENAME, MERGE_REPORT, entries=[(job['path'], job['title']) for job in state.jobs],
+                       titles=state.titles, workers=MERGE_WORKERS, optimize=OPTIMIZE_PDF)
+    METRICS.report()
+
+def start_run(page, from_tree=False, resume=False):
+    """Output folder + work list for a render run: (state, jobs left to print, manifest, previous output)."""
+    if resume and STORE.has_plan():
+        state = STORE.load_plan(CrawlState())
+        for folder in state.folders:
+            os.makedirs(folder, exist_ok=True)
+        jobs = STORE.incomplete(state)
+        print(f"⏯️ Resuming from {CRAWL_DB}: {len(state.jobs) - len(jobs)} of {len(state.jobs)} pages already printed, {len(jobs)} to go")
+        if SEARCH_INDEX: SEARCH_INDEX.set_plan(OUTPUT_DIR, state.titles)
+        return state, jobs, None, None
+    if resume:
+        print(f"⚠️ No saved plan in {CRAWL_DB}, starting a fresh run")
+
+    previous = prepare_output()
+    METRICS.reset()
+    state = build_work_list(page, from_tree)
+    STORE.save_plan(state)
+    manifest, jobs = incremental_jobs(state, previous)
+    left = {job['path'] for job in jobs}
+    STORE.mark_many([job['path'] for job in state.jobs if job['path'] not in left], "done")
+    if SEARCH_INDEX: SEARCH_INDEX.set_plan(OUTPUT_DIR, state.titles)
+    return state, jobs, manifest, previous
+
+def print_preview(items, indent=0):
+    idx = 1
+    for item in items:
+        prefix = f"{idx:03d}" if indent > 0 else "---"
+        if item['type'] == 'group':
+            print(f"{'  '*indent}📂 [{prefix}] {item['title']}")
+            print_preview(item['children'], indent + 1)
+        else:
+            print(f"{'  '*indent}📄 [{prefix}] {item['title']}")
+        idx += 1
+
+def open_page(browser):
+    page = browser.new_page()
+    ARCHIVE.attach(page) # before the policy: the policy's handler runs first
+    if RESOURCE_POLICY: RESOURCE_POLICY.attach(page)
+    return page
+
+def setup_context(ctx):
+    # Render contexts get the same route handlers, in the same order, as open_page
+    ARCHIVE.attach(ctx)
+    if RESOURCE_POLICY: RESOURCE_POLICY.attach(ctx)
+
+def format_eta(started, done, total):
+    if not done: return "ETA --:--"
+    remaining = (time.time() - started) / done * (total - done)
+    return f"ETA {int(remaining // 60)}m{int(remaining % 60):02d}s"
+
+# ------------------------------------------------------------------
+# PHASE 1: DISCOVERY (lightweight navigation, no print CSS / PDF)
+# ------------------------------------------------------------------
+class BrowserSidebar:
+    """Discovery source driving a Chromium page (static_sidebar.StaticSidebar is the HTTP one)."""
+
+    def __init__(self, page):
+        self.page = page
+        self.last_wait = "ready" # outcome of the last lazy_children() readiness wait
+
+    def tree(self, url):
+        with METRICS.record("discover", url) as timing:
+            try:
+                with timing.stage("navigate"): SIDEBAR_WAIT.goto(self.page, url)
+            except:
+                print("⚠️ Timeout loading page, proceeding with DOM parse anyway...")
+            with timing.stage("scrape"): return tree_from_rows(self.page.evaluate(TREE_PARSER_JS))
+
+    def lazy_children(self, url):
+        with METRICS.record("discover", url) as timing:
+            with timing.stage("navigate"): self.last_wait = SIDEBAR_WAIT.goto(self.page, url)
+            with timing.stage("scrape"): return self.page.evaluate(ACTIVE_CHILDREN_JS)
+
+    def group_children(self, item):
+        with METRICS.record("discover", item.get('url'), group=item['title']) as timing:
+            # 1. Click ONLY if collapsed
+            self.page.evaluate(EXPAND_GROUP_JS, item['title'])
+
+            # 2. Wait for 'a' tags to appear inside that specific section
+            # Many of these trigger a fetch for a .js file
+            with timing.stage("navigate"):
+                if SIDEBAR_WAIT.until(self.page, GROUP_READY_JS, item['title']) == "fallback":
+                    print("    ⚠️ Wait for children timed out, checking anyway...")
+
+            # 3. Scrape new children
+            with timing.stage("scrape"): return self.page.evaluate(GROUP_CHILDREN_JS, item['title'])
+
+    def expand_groups(self, items):
+        """Children of every lazy group in items, expanded together with one wait: {title: children}."""
+        titles = [item['title'] for item in items]
+        with METRICS.record("discover", START_URL, groups=len(titles)) as timing:
+            self.page.evaluate(EXPAND_GROUPS_JS, titles)
+            with timing.stage("navigate"):
+                if SIDEBAR_WAIT.until(self.page, GROUPS_READY_JS, titles) == "fallback":
+                    print("    ⚠️ Not every group finished loading, scraping what is there...")
+            with timing.stage("scrape"): return self.page.evaluate(GROUPS_CHILDREN_JS, titles)
+
+def pending_groups(items):
+    for item in items:
+        if item.get('needs_expansion', False) and not item.get('children'):
+            yield item
+        yield from pending_groups(item.get('children', []))
+
+def expand_lazy_groups(sidebar, tree):
+    """Expand every lazy accordion group of the tree in one go, before the walk: {title: children}."""
+    pending = list(pending_groups(tree))
+    if not pending:
+        return {}
+    print(f"\n⚡ Expanding {len(pending)} lazy groups at once...")
+    started = time.time()
+    try:
+        groups = sidebar.expand_groups(pending)
+    except Exception as e:
+        print(f"  ❌ Bulk expansion failed ({e}), groups will be expanded one by one")
+        return {}
+    print(f"  ✅ {sum(1 for children in groups.values() if children)} of {len(pending)} groups expanded in {time.time() - started:.1f}s")
+    return groups
+
+def expand_lazy_group(sidebar, item):
+    print(f"  ⚡ Expanding Lazy Group: '{item['title']}'")
+    try:
+        expanded_children = sidebar.group_children(item)
+        if expanded_children:
+             print(f"  ✅ Found {len(expanded_children)} children after expansion")
+             item['children'] = expanded_children
+        else:
+             print(f"  ⚠️ No children found after expansion for {item['title']}")
+
+    except Exception as e:
+        print(f"  ❌ Failed to expand: {e}")
+
+def lazy_folder_children(sidebar, item, siblings):
+    if DISCOVERY_CACHE is None:
+        return sidebar.lazy_children(item['url'])
+    # A scrape after a readiness-wait fallback may have run before the sidebar was built: don't keep it
+    return DISCOVERY_CACHE.children(item['url'], siblings, sidebar.lazy_children, trusted=lambda: sidebar.last_wait != "fallback")
+
+def discover_items(sidebar, items, expanded, groups):
+    for item in items:
+        is_lazy_folder = (item['type'] == 'link') and item.get('is_collapsed', False)
+        if item['type'] != 'group' and not is_lazy_folder:
+            continue
+
+        # Lazy accordion groups (sidebar fragment loaded on click): already
+        # expanded in bulk, one by one only if that missed them
+        if item.get('needs_expansion', False) and not item.get('children'):
+            if groups.get(item['title']):
+                item['children'] = groups[item['title']]
+            else:
+                expand_lazy_group(sidebar, item)
+
+        # Lazy folder links. The active-children scrape returns the whole
+        # section (siblings included), so each landing URL is opened once;
+        # later copies become plain folders instead of re-walking the section.
+        if is_lazy_folder and 'url' in item and item['url'].split('#')[0] not in expanded:
+            expanded.add(item['url'].split('#')[0])
+            print(f"  🔍 Discovering: {item['title']}")
+            try:
+                lazy_children = lazy_folder_children(sidebar, item, items)
+                if lazy_children:
+                    print(f"  ✅ Found {len(lazy_children)} lazy children/siblings!")
+                    item['children'] = lazy_children
+            except Exception as e:
+                print(f"  ❌ Error: {e}")
+
+        if 'children' in item:
+            discover_items(sidebar, item['children'], expanded, groups)
+
+def discover_structure(sidebar):
+    print(f"🚀 Analyzing Site Structure from: {START_URL}")
+    tree = sidebar.tree(START_URL)
+
+    # Save Debug JSON
+    with open(DEBUG_JSON, "w", encoding="utf-8") as f:
+        json.dump(tree, f, indent=2)
+
+    # ------------------------------------------------------------------
+    # PRINT STRUCTURE PREVIEW
+    # ------------------------------------------------------------------
+    print("\n🌳 Detected Hierarchy (Preview):")
+    print_preview(tree)
+
+    groups = expand_lazy_groups(sidebar, tree)
+    print("\n🔭 Resolving lazy groups and folders...")
+    discover_items(sidebar, tree, set(), groups)
+    if DISCOVERY_CACHE:
+        DISCOVERY_CACHE.save()
+        DISCOVERY_CACHE.report()
+    with open(RESOLVED_TREE, "w", encoding="utf-8") as f:
+        json.dump(tree, f, indent=2)
+    print(f"💾 Resolved tree saved to {RESOLVED_TREE}")
+    return tree
+
+# ------------------------------------------------------------------
+# PHASE 2: PLAN (resolved tree -> numbered work list)
+# ------------------------------------------------------------------
+def plan_items(items, parent_path, level, state):
+    idx = 1
+    # Track first group for intro injection
+    first_group_seen = False
+
+    for item in items:
+        # SPECIAL CASE: Intro is the first group at root level
+        is_intro_group = False
+        if level == 0 and item['type'] == 'group' and not first_group_seen:
+            is_intro_group = True
+            first_group_seen = True
+
+        safe_title = clean_filename(item['title'])
+        is_lazy_folder = (item['type'] == 'link') and item.get('is_collapsed', False)
+
+        if item['type'] == 'group' or is_lazy_folder:
+            folder_name = f"{idx:03d}_{safe_title}"
+            idx += 1
+
+            new_path = os.path.join(parent_path, folder_name)
+            state.add_folder(new_path, item['title'])
+            state.log(level, f"📂 {folder_name}")
+
+            # 1. SPECIAL INTRO HANDLING (Start URL)
+            if is_intro_group:
+                state.visited.add(START_URL.split('#')[0])
+                state.add_job(os.path.join(new_path, "000_Introduction.pdf"), START_URL, item['title'])
+
+            # 2. Lazy Folder Handling (Links): intro PDF inside folder
+            if is_lazy_folder and 'url' in item:
+                state.visited.add(item['url'].split('#')[0])
+                state.add_job(os.path.join(new_path, "000_Introduction.pdf"), item['url'], item['title'])
+
+            if 'children' in item:
+                plan_items(item['children'], new_path, level + 1, state)
+
+        elif item['type'] == 'link':
+            # Only skip if truly redundant and don't burn an index
+            if item['url'].split('#')[0] in state.visited:
+                # Do NOT increment idx if skipped
+                continue
+            state.visited.add(item['url'].split('#')[0])
+
+            pdf_name = f"{idx:03d}_{safe_title}.pdf"
+            idx += 1
+            state.log(level, f"📄 {pdf_name}")
+            state.add_job(os.path.join(parent_path, pdf_name), item['url'], item['title'])
+
+def build_work_list(page, from_tree=False):
+    if from_tree:
+        print(f"📂 Loading resolved tree from {RESOLVED_TREE}")
+        with open(RESOLVED_TREE, encoding="utf-8") as f:
+            tree = json.load(f)
+    elif DISCOVERY_ENGINE == "static":
+        tree = discover_structure(StaticSidebar("pro"))
+    else:
+        tree = discover_structure(BrowserSidebar(page))
+
+    state = CrawlState(HIERARCHY_LOG)
+    plan_items(tree, OUTPUT_DIR, 0, state)
+    for folder in state.folders:
+        os.makedirs(folder, exist_ok=True)
+    print(f"\n📋 Work list: {len(state.jobs)} pages")
+    return state
+
+# ------------------------------------------------------------------
+# PHASE 3: RENDER
+# ------------------------------------------------------------------
+def print_page(pg, url, path, title):
+    with METRICS.record("render", url, path) as timing:
+        with timing.stage("navigate"): WAIT_POLICY.goto(pg, url)
+        with timing.stage("details"): pg.evaluate("document.querySelectorAll('details').forEach(e => e.open = true)")
+        with timing.stage("header"): pg.evaluate(HEADER_INJECT_JS, title)
+        with timing.stage("css"): pg.add_style_tag(content=CSS_INJECT)
+        if SEARCH_INDEX:
+            with timing.stage("index"): SEARCH_INDEX.capture(pg, url, path, title)
+        with timing.stage("pdf"): pg.pdf(path=path, **PDF_OPTIONS)
+
+def capture_page(pg, url, path, title):
+    # print_page without the print job: the prepared content, for a section document
+    with METRICS.record("render", url, path) as timing:
+        with timing.stage("navigate"): WAIT_POLICY.goto(pg, url)
+        with timing.stage("details"): pg.evaluate("document.querySelectorAll('details').forEach(e => e.open = true)")
+        with timing.stage("header"): pg.evaluate(HEADER_INJECT_JS, title)
+        with timing.stage("css"): pg.add_style_tag(content=CSS_INJECT)
+        if SEARCH_INDEX:
+            with timing.stage("index"): SEARCH_INDEX.capture(pg, url, path, title)
+        with timing.stage("capture"): return pg.evaluate(CAPTURE_JS, CONTENT_SELECTORS)
+
+def print_section(pg, batch, parts):
+    """One page.pdf for a batch of captured pages (pg holds the last one), cut into their PDFs; False when it can't be cut."""
+    folder = os.path.dirname(batch[0]['path'])
+    section_pdf = os.path.join(folder, SECTION_FILE)
+    with METRICS.record("section", batch[0]['url'], folder, pages=len(batch)) as timing:
+        with timing.stage("assemble"): pg.evaluate(ASSEMBLE_JS, [CONTENT_SELECTORS, parts])
+        with timing.stage("css"): pg.add_style_tag(content=CSS_INJECT) # in case the last capture failed before its CSS
+        with timing.stage("pdf"): pg.pdf(path=section_pdf, **PDF_OPTIONS)
+        try:
+            with timing.stage("split"): return split_section(section_pdf, [job['path'] for job in batch])
+        finally:
+            os.remove(section_pdf)
+
+def render_pages(pages, jobs):
+    started = time.time()
+    for n, job in enumerate(jobs, 1):
+        print(f"  ⚡ [{n}/{len(jobs)}] '{job['title']}' -> {os.path.relpath(job['path'], OUTPUT_DIR)}  ({format_eta(started, n - 1, len(jobs))})")
+        try:
+            print_page(pages.page, job['url'], job['path'], job['title'])
+            STORE.mark(job['path'], "done")
+        except Exception as e:
+             STORE.mark(job['path'], "failed", e)
+             print(f"  ❌ Error: {e}")
+        finally:
+            pages.done()
+
+def render_sections(pages, jobs):
+    started = time.time()
+    done = 0
+    for batch in section_batches(jobs, SECTION_BATCH_PAGES):
+        folder = os.path.relpath(os.path.dirname(batch[0]['path']), OUTPUT_DIR)
+        print(f"  📚 [{done + 1}-{done + len(batch)}/{len(jobs)}] {folder}: {len(batch)} pages, one print job  ({format_eta(started, done, len(jobs))})")
+        captured, parts = [], []
+        for job in batch:
+            try:
+                parts.append(capture_page(pages.page, job['url'], job['path'], job['title']))
+                captured.append(job)
+            except Exception as e:
+                STORE.mark(job['path'], "failed", e)
+                print(f"  ❌ Error ({job['title']}): {e}")
+        done += len(batch)
+        if not captured:
+            continue
+
+        printed = False
+        try:
+            printed = print_section(pages.page, captured, parts)
+            if not printed: print("  ⚠️ No section anchors in the PDF, printing these pages one by one")
+        except Exception as e:
+            print(f"  ⚠️ Section print failed ({e}), printing these pages one by one")
+        finally:
+            pages.done()
+        if printed:
+            STORE.mark_many([job['path'] for job in captured], "done")
+        else:
+            render_pages(pages, captured)
+
+def render_jobs(pages, jobs):
+    print("\n⚡ Starting Render...")
+    if SECTION_BATCH:
+        render_sections(pages, jobs)
+    else:
+        render_pages(pages, jobs)
+
+def print_light(jobs):
+    """Print what LIGHT_RENDER can without Chromium; returns the jobs left for the browser."""
+    if not LIGHT_RENDER or not jobs or ARCHIVE.mode is not None:
+        return jobs
+    printed, left = render_light_jobs(jobs, "pro", LIGHT_RENDER, PDF_OPTIONS, LIGHT_RENDER_WORKERS,
+                                      search_index=SEARCH_INDEX, metrics=METRICS)
+    STORE.mark_many([job['path'] for job in printed], "done")
+    return left
+
+def retry_missing(pages, expected_pdfs):
+    # ------------------------------------------------------------------
+    # VERIFICATION & RETRY
+    # ------------------------------------------------------------------
+    print("\n🕵️ Starting Integrity Check...")
+    missing = []
+    for path, url in expected_pdfs.items():
+        if not os.path.exists(path) or os.path.getsize(path) < 1000:
+            missing.append((path, url))
+
+    if missing:
+        print(f"⚠️ Found {len(missing)} missing or corrupted files. Retrying...")
+        for path, url in missing:
+            print(f"  🔄 Retrying: {os.path.basename(path)}")
+            try:
+                fname = os.path.basename(path).replace(".pdf", "")
+                title = " ".join(fname.split("_")[1:])
+                print_page(pages.page, url, path, title)
+                STORE.mark(path, "done")
+                print("     ✅ Recovered!")
+            except Exception as e:
+                STORE.mark(path, "failed", e)
+                print(f"     ❌ Retry Failed: {e}")
+            finally:
+                pages.done()
+    else:
+        print("✅ Integrity Check Passed: All files present.")
+
+def run(from_tree=False, resume=False):
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        
-        print(f"🚀 Analyzing Site Structure from: {START_URL}")
-        try:
-            page.goto(START_URL, wait_until="networkidle", timeout=60000)
-        except:
-            print("⚠️ Timeout loading page, proceeding with DOM parse anyway...")
-        
-        # ------------------------------------------------------------------
-        # HYBRID TREE PARSER
-        # ------------------------------------------------------------------
-        tree = page.evaluate("""() => {
-            function parseNode(node, level) {
-                let items = [];
-                let children = Array.from(node.children);
-                
-                for (let i = 0; i < children.length; i++) {
-                    let child = children[i];
-                    
-                    // SKIP Headers that are just titles (handled in group check)
-                    if (child.classList.contains('accordion-title') || ['H3','H4'].includes(child.tagName)) continue;
-
-                    // CASE 1: GROUP (Accordion/Header Container)
-                    // Pro uses h4.accordion-title inside div.accordion-section
-                    let headerEl = child.querySelector('.accordion-title') || child.querySelector('h3') || child.querySelector('h4');
-                    let isGroup = child.classList.contains('accordion-section') || (headerEl && child.querySelector('.accordion-content'));
-                    
-                    if (isGroup) {
-                        let titleEl = headerEl || child;
-                        let groupTitle = titleEl.innerText.trim();
-                        let contentEl = child.querySelector('.accordion-content');
-                        let container = contentEl ? contentEl : child;
-                        
-                        let subItems = parseNode(container, level + 1);
-                        subItems = subItems.filter(i => i.title !== groupTitle);
-                        
-                        // Check if needs expansion (empty children but has data-url or just is section)
-                        let needsExpansion = child.hasAttribute('data-url') || (subItems.length === 0 && child.classList.contains('accordion-section'));
-                        
-                        if (subItems.length > 0 || needsExpansion) {
-                             items.push({ type: 'group', title: groupTitle, children: subItems, needs_expansion: needsExpansion });
-                             continue;
-                        }
-                    }
-                    
-                    // CASE 2: LI WRAPPER (Common in older docs, Pro uses div/nav mostly but good to keep)
-                    if (child.tagName === 'LI') {
-                        let link = child.querySelector(':scope > a');
-                        if (!link) {
-                            items = items.concat(parseNode(child, level)); 
-                            continue;
-                        }
-                        let title = link.innerText.trim();
-                        let url = link.href;
-                        let subContainer = Array.from(child.children).filter(c => c !== link);
-                        let subItems = [];
-                        subContainer.forEach(c => subItems = subItems.concat(parseNode(c, level + 1)));
-                        
-                        if (subItems.length > 0) {
-                            items.push({ type: 'group', title: title, url: url, children: subItems });
-                        } else {
-                            let isCollapsed = link.hasAttribute('data-collapsed') || link.classList.contains('icon-ui-right');
-                            items.push({ type: 'link', title: title, url: url, is_collapsed: isCollapsed });
-                        }
-                        continue;
-                    }
-
-                    // CASE 3: FLATTEN WRAPPERS
-                    if (['NAV','DIV','UL'].includes(child.tagName)) {
-                        items = items.concat(parseNode(child, level));
-                        continue;
-                    }
-                    
-                    // CASE 4: LOOSE LINK
-                    if (child.tagName === 'A') {
-                         let isCollapsed = child.hasAttribute('data-collapsed') || child.classList.contains('icon-ui-right');
-                         items.push({ type: 'link', title: child.innerText.trim(), url: child.href, is_collapsed: isCollapsed });
-                    }
-                }
-                return items;
-            }
-            
-            let root = document.querySelector('aside.js-accordion');
-            if (!root) return [];
-            return parseNode(root, 0);
-        }""")
-        
-        # Save Debug JSON
-        with open("pro_sidebar_debug.json", "w", encoding="utf-8") as f:
-            json.dump(tree, f, indent=2)
-        
-        # ------------------------------------------------------------------
-        # HELPER: SCRAPE ACTIVE CHILDREN (LAZY LOAD)
-        # ------------------------------------------------------------------
-        def get_active_children(pg):
-            return pg.evaluate("""() => {
-                // Re-use parseNode logic roughly
-                function parseNode(node, level) {
-                    let items = [];
-                    let children = Array.from(node.children);
-                    
-                    for (let i = 0; i < children.length; i++) {
-                        let child = children[i];
-                        
-                        if (['H1','H2','H3','H4','H5'].includes(child.tagName) || child.classList.contains('accordion-title')) continue;
-
-                        if (child.classList.contains('accordion-section')) {
-                             // Recurse into section content
-                             let content = child.querySelector('.accordion-content') || child;
-                             items = items.concat(parseNode(content, level + 1));
-                             continue;
-                        }
-                        
-                        if (child.tagName === 'LI') {
-                            let link = child.querySelector(':scope > a');
-                            if (link) {
-                                let title = link.innerText.trim();
-                                let url = link.href;
-                                let isCollapsed = link.hasAttribute('data-collapsed') || link.classList.contains('icon-ui-right');
-                                items.push({ type: 'link', title: title, url: url, is_collapsed: isCollapsed });
-                            }
-                            // Recurse for nested lists
-                             let subContainer = Array.from(child.children).filter(c => c.tagName === 'UL' || c.tagName === 'DIV');
-                             subContainer.forEach(c => items = items.concat(parseNode(c, level + 1)));
-                            continue;
-                        }
-                        
-                         // General Containers
-                        if (['NAV','DIV','UL'].includes(child.tagName)) {
-                            items = items.concat(parseNode(child, level));
-                            continue;
-                        }
-
-                        // Direct Link
-                        if (child.tagName === 'A') {
-                             let isCollapsed = child.hasAttribute('data-collapsed') || child.classList.contains('icon-ui-right');
-                             items.push({ type: 'link', title: child.innerText.trim(), url: child.href, is_collapsed: isCollapsed });
-                        }
-                    }
-                    return items;
-                }
+        page = open_page(browser)
 
-                let items = [];
-                
-                // 1. Find the Active Element
-                let activeEl = document.querySelector('.is-active');
-                if (!activeEl) return [];
-
-                // 2. Identify Scope (The Section/Container we are in)
-                // If we are in an accordion content, we want everything in that content.
-                let sectionContent = activeEl.closest('.accordion-content');
-                let sectionWrapper = activeEl.closest('.accordion-section');
-                
-                // If NO specific section found (rare), maybe just siblings?
-                let targetContainer = sectionContent || sectionWrapper;
-                
-                if (targetContainer) {
-                    // We found a container. Parse it fully.
-                    // This returns ALL siblings (including the active one).
-                    // The python side handles deduplication of the active one via 'visited' set.
-                    items = parseNode(targetContainer, 0);
-                } else {
-                     // Fallback: Just look for immediate sibling links if we are loose
-                     // e.g. Side-nav-link
-                     let parent = activeEl.parentElement;
-                     if (parent) items = parseNode(parent, 0);
-                }
-
-                return items;
-            }""")
-
-        def get_expanded_group_children(pg, title):
-            return pg.evaluate(f"""() => {{
-                let headers = Array.from(document.querySelectorAll('.accordion-title'));
-                let target = headers.find(h => h.innerText.trim() === {json.dumps(title)});
-                if (!target) return [];
-                let section = target.closest('.accordion-section');
-                if (!section) return [];
-                let content = section.querySelector('.accordion-content') || section.querySelector('nav');
-                if (!content) return [];
-                
-                let items = [];
-                content.querySelectorAll('a').forEach(a => {{
-                     let isCollapsed = a.hasAttribute('data-collapsed') || a.classList.contains('icon-ui-right');
-                     items.push({{ type: 'link', title: a.innerText.trim(), url: a.href, is_collapsed: isCollapsed }});
-                }});
-                return items;
-            }}""")
-
-        # ------------------------------------------------------------------
-        # PRINT STRUCTURE PREVIEW
-        # ------------------------------------------------------------------
-        print("\n🌳 Detected Hierarchy (Preview):")
-        
-        def print_preview(items, indent=0):
-            idx = 1
-            for item in items:
-                prefix = f"{idx:03d}" if indent > 0 else "---" 
-                if item['type'] == 'group':
-                    print(f"{'  '*indent}📂 [{prefix}] {item['title']}")
-                    print_preview(item['children'], indent + 1)
-                else:
-                    print(f"{'  '*indent}📄 [{prefix}] {item['title']}")
-                idx += 1
-                
-        print_preview(tree)
-        print("\n⚡ Starting Hybrid Crawl...")
-
-        # ------------------------------------------------------------------
-        # CRAWLER
-        # ------------------------------------------------------------------
-        visited = set()
-        expected_pdfs = {}
-        
-        def process_items(items, parent_path, level):
-            idx = 1
-            # Track first group for intro injection
-            first_group_seen = False
-
-            for item in items:
-                # SPECIAL CASE: Intro is the first group at root level
-                is_intro_group = False
-                if level == 0 and item['type'] == 'group' and not first_group_seen:
-                    is_intro_group = True
-                    first_group_seen = True
-                
-                safe_title = clean_filename(item['title'])
-                is_lazy_folder = (item['type'] == 'link') and item.get('is_collapsed', False)
-                
-                if item['type'] == 'group' or is_lazy_folder:
-                    folder_name = f"{idx:03d}_{safe_title}"
-                    idx += 1 
-                    
-                    new_path = os.path.join(parent_path, folder_name)
-                    os.makedirs(new_path, exist_ok=True)
-                    print(f"\n📂 Entering: {folder_name}")
-                    
-                    with open("pro_hierarchy.txt", "a", encoding="utf-8") as f:
-                        f.write(f"{'  '*level}📂 {folder_name}\n")
-                    
-                    # 1. SPECIAL INTRO HANDLING
-                    if is_intro_group:
-                         pdf_name = f"000_Introduction.pdf"
-                         pdf_path = os.path.join(new_path, pdf_name)
-                         print(f"  ⚡ Printing Intro Page (Start URL): {pdf_name}")
-                         try:
-                             print_page(page, START_URL, pdf_path, item['title'])
-                             visited.add(START_URL.split('#')[0])
-                         except Exception as e:
-                             print(f"  ❌ Error printing intro: {e}")
-
-                    # 2. DYNAMIC EXPANSION (NEW)
-                    if item.get('needs_expansion', False) and not item.get('children'):
-                         print(f"  ⚡ Expanding Lazy Group: '{item['title']}'")
-                         try:
-                             # 1. Click ONLY if collapsed
-                             page.evaluate(f"""() => {{
-                                 let headers = Array.from(document.querySelectorAll('.accordion-title'));
-                                 let target = headers.find(h => h.innerText.trim() === {json.dumps(item['title'])});
-                                 if (target) {{
-                                     let section = target.closest('.accordion-section');
-                                     // If generic section or explicitly collapsed, click it.
-                                     // Check if content is visible?
-                                     let content = section.querySelector('.accordion-content');
-                                     if (!content || content.style.display === 'none' || section.getAttribute('data-collapsed') === 'true') {{
-                                         target.click();
-                                     }}
-                                 }}
-                             }}""")
-                             
-                             # 2. Wait for content load (Network + DOM)
-                             # Many of these trigger a fetch for a .js file
-                             try:
-                                 page.wait_for_load_state("networkidle", timeout=5000)
-                             except: pass
-
-                             # 3. Wait for 'a' tags to appear inside that specific section
-                             # Find the section again by title text to be safe
-                             try:
-                                 xpath = f"//h4[contains(@class, 'accordion-title') and contains(normalize-space(.), {json.dumps(item['title'])})]/ancestor::div[contains(@class, 'accordion-section')]//nav//a"
-                                 page.wait_for_selector(xpath, state="attached", timeout=5000)
-                             except:
-                                 print("    ⚠️ Wait for children timed out, checking anyway...")
-
-                             # 4. Scrape new children
-                             expanded_children = get_expanded_group_children(page, item['title'])
-                             if expanded_children:
-                                  print(f"  ✅ Found {len(expanded_children)} children after expansion")
-                                  item['children'] = expanded_children
-                             else:
-                                  print(f"  ⚠️ No children found after expansion for {item['title']}")
-                                  
-                         except Exception as e:
-                             print(f"  ❌ Failed to expand: {e}")
-
-                    # 3. Lazy Folder Handling (Links)
-                    if is_lazy_folder and 'url' in item:
-                        landing_url = item['url']
-                        # Intro PDF inside folder
-                        pdf_name = f"000_Introduction.pdf"
-                        pdf_path = os.path.join(new_path, pdf_name)
-                        expected_pdfs[pdf_path] = landing_url
-                        
-                        if landing_url.split('#')[0] not in visited:
-                             visited.add(landing_url.split('#')[0])
-                             print(f"  ⚡ Printing Index: {pdf_name}")
-                             try:
-                                print_page(page, landing_url, pdf_path, item['title'])
-                                
-                                # Recursive check
-                                print(f"  🔍 Checking for hidden children/siblings...")
-                                lazy_children = get_active_children(page)
-                                if lazy_children:
-                                    print(f"  ✅ Found {len(lazy_children)} lazy children!")
-                                    process_items(lazy_children, new_path, level + 1)
-                                    
-                             except Exception as e:
-                                print(f"  ❌ Error: {e}")
-                        else:
-                             print(f"  🔍 Checking for hidden children (Visited)...")
-                             try:
-                                 page.goto(landing_url, wait_until="domcontentloaded")
-                                 lazy_children = get_active_children(page)
-                                 if lazy_children:
-                                     process_items(lazy_children, new_path, level + 1)
-                             except: pass
-
-                    if 'children' in item:
-                        process_items(item['children'], new_path, level + 1)
-                    
-                elif item['type'] == 'link':
-                    # Only skip if truly redundant and don't burn an index
-                    if item['url'].split('#')[0] in visited:
-                        # Do NOT increment idx if skipped
-                        continue
-                    visited.add(item['url'].split('#')[0])
-                    
-                    pdf_name = f"{idx:03d}_{safe_title}.pdf"
-                    idx += 1
-                    pdf_path = os.path.join(parent_path, pdf_name)
-                    expected_pdfs[pdf_path] = item['url']
-                    
-                    with open("pro_hierarchy.txt", "a", encoding="utf-8") as f:
-                        f.write(f"{'  '*level}📄 {pdf_name}\n")
-                    
-                    print(f"  ⚡ Printing: '{item['title']}' -> {pdf_name}")
-                    try:
-                        print_page(page, item['url'], pdf_path, item['title'])
-                    except Exception as e:
-                         print(f"  ❌ Error: {e}")
-
-
-        def print_page(pg, url, path, title):
-             pg.goto(url, wait_until="networkidle", timeout=60000)
-             pg.evaluate("document.querySelectorAll('details').forEach(e => e.open = true)")
-             
-             # INJECT BREADCRUMBS & TITLE
-             pg.evaluate(f"""() => {{
-                let title = {json.dumps(title)};
-                // Possible main content containers in Pro docs
-                let content = document.querySelector('div[role="main"]') || document.querySelector('.column-19') || document.querySelector('.column-17') || document.querySelector('main') || document.body;
-                
-                let targetH1 = document.querySelector('h1');
-                let breadcrumbs = document.querySelector('nav.breadcrumbs');
-
-                if (targetH1) {{
-                    let newH1 = targetH1.cloneNode(true);
-                    newH1.style.cssText = 'display: block !important; font-size: 24pt !important; font-weight: bold !important; margin-bottom: 20px !important; color: #000 !important; page-break-after: avoid !important; visibility: visible !important; opacity: 1 !important;';
-                    content.prepend(newH1);
-                }} else {{
-                    let h1 = document.createElement('h1');
-                    h1.innerText = title;
-                    h1.style.cssText = 'display: block !important; font-size: 24pt !important; font-weight: bold !important; margin-bottom: 20px !important; color: #000 !important; page-break-after: avoid !important;';
-                    content.prepend(h1);
-                }}
-
-                if (breadcrumbs) {{
-                    let newBC = breadcrumbs.cloneNode(true);
-                    newBC.classList.add('injected-breadcrumb');
-                    newBC.style.cssText = 'display: block !important; font-size: 10pt !important; color: #666 !important; margin-bottom: 10px !important; visibility: visible !important; opacity: 1 !important;';
-                    content.prepend(newBC);
-                }}
-             }}""")
-             pg.add_style_tag(content=CSS_INJECT)
-             pg.pdf(path=path, format="A4", margin={"top":"1cm","bottom":"1cm","left":"1cm","right":"1cm"})
-
-        process_items(tree, OUTPUT_DIR, 0)
-        
-        # ------------------------------------------------------------------
-        # VERIFICATION & RETRY
-        # ------------------------------------------------------------------
-        print("\n🕵️ Starting Integrity Check...")
-        missing = []
-        for path, url in expected_pdfs.items():
-            if not os.path.exists(path) or os.path.getsize(path) < 1000:
-                missing.append((path, url))
-        
-        if missing:
-            print(f"⚠️ Found {len(missing)} missing or corrupted files. Retrying...")
-            for path, url in missing:
-                print(f"  🔄 Retrying: {os.path.basename(path)}")
-                try:
-                    fname = os.path.basename(path).replace(".pdf", "")
-                    title = " ".join(fname.split("_")[1:])
-                    print_page(page, url, path, title)
-                    print("     ✅ Recovered!")
-                except Exception as e:
-                    print(f"     ❌ Retry Failed: {e}")
-        else:
-            print("✅ Integrity Check Passed: All files present.")
+        state, jobs, manifest, previous = start_run(page, from_tree, resume)
+        page.close() # discovery page; rendering gets recycled contexts
+        jobs = print_light(jobs)
+        pages = PageRecycler(browser, setup_context, RECYCLE_PAGES, RECYCLE_HEAP_MB)
+        render_jobs(pages, jobs)
+        retry_missing(pages, state.expected_pdfs)
+        pages.close()
 
         browser.close()
 
-    merge_pdfs(OUTPUT_DIR, MERGED_FILENAME)
+    if manifest: manifest.commit(OUTPUT_DIR, previous)
+
+    WAIT_POLICY.report()
+    if RESOURCE_POLICY: RESOURCE_POLICY.report()
+    ARCHIVE.report()
+    pages.report()
+    if SEARCH_INDEX:
+        SEARCH_INDEX.finish(state.expected_pdfs.values())
+        SEARCH_INDEX.report()
+    merge_output(state)
+
+def discover():
+    # Discovery on its own (no render page to share with)
+    if DISCOVERY_ENGINE == "static":
+        return discover_structure(StaticSidebar("pro"))
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = open_page(browser)
+        tree = discover_structure(BrowserSidebar(page))
+        browser.close()
+    return tree
+
+def discover_only():
+    tree = discover()
+    state = CrawlState()
+    plan_items(tree, OUTPUT_DIR, 0, state)
+    print(f"\n📋 {len(state.jobs)} pages to render. Run with --render-only to print them.")
+
+def markdown_only(from_tree=False):
+    # Same plan as a render run, rooted at MARKDOWN_DIR, exported instead of printed
+    if from_tree:
+        print(f"📂 Loading resolved tree from {RESOLVED_TREE}")
+        with open(RESOLVED_TREE, encoding="utf-8") as f:
+            tree = json.load(f)
+    else:
+        tree = discover()
+
+    state = CrawlState()
+    plan_items(tree, MARKDOWN_DIR, 0, state)
+    if os.path.exists(MARKDOWN_DIR):
+        shutil.rmtree(MARKDOWN_DIR, ignore_errors=True)
+    os.makedirs(MARKDOWN_DIR, exist_ok=True)
+    export_markdown(state.jobs, state.titles, MARKDOWN_DIR, CHUNKS_JSONL, variant="pro", workers=MARKDOWN_WORKERS,
+                    archive=ARCHIVE_DIR if ARCHIVE.mode == "replay" else None)
 
 if __name__ == "__main__":
-    run()
+    # --discover-only: write RESOLVED_TREE and stop
+    # --render-only:   skip discovery and render from an existing RESOLVED_TREE
+    # --record:        save every response into ARCHIVE_DIR while crawling
+    # --replay:        serve every request from ARCHIVE_DIR, no network (use with --render-only)
+    if "--record" in sys.argv: ARCHIVE.mode = "record"
+    if "--replay" in sys.argv: ARCHIVE.mode = "replay"
+    # --incremental:   only re-print pages that changed since the last run (MANIFEST)
+    # --resume:        continue an interrupted run from CRAWL_DB (same plan, unfinished pages only)
+    # --markdown:      export Markdown + JSONL chunks to MARKDOWN_DIR / CHUNKS_JSONL instead of PDFs
+    if "--incremental" in sys.argv: INCREMENTAL = True
+    if "--discover-only" in sys.argv:
+        discover_only()
+    elif "--markdown" in sys.argv:
+        markdown_only(from_tree="--render-only" in sys.argv)
+    else:
+        run(from_tree="--render-only" in sys.argv, resume="--resume" in sys.argv)
@@ -0,0 +1,275 @@
+import os
+import sys
+import time
+import asyncio
+import importlib
+import itertools
+from contextlib import contextmanager
+from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+from pdf_merge import merge_pdfs
+from crawl_store import CrawlStore
+from search_index import SearchIndex
+from resource_policy import ResourcePolicy
+from context_pool import ContextPool
+from crawl_metrics import CrawlMetrics
+from discovery_cache import DiscoveryCache
+from host_limiter import HostLimiter, backoff
+
+# Force UTF-8
+sys.stdout.reconfigure(encoding='utf-8')
+
+# ------------------------------------------------------------------
+# MULTI-SITE BATCH (one browser, one page pool, every doc set)
+# ------------------------------------------------------------------
+# Each profile names the printer that knows its markup (tree parser,
+# CSS_INJECT, HEADER_INJECT_JS, waits) and the printer constants to override
+# for it, the same ones you would otherwise edit by hand (START_URL,
+# OUTPUT_DIR, MERGED_FILENAME, ...). Two profiles on the same printer need
+# their own log / tree / state / metrics / discovery cache file names too
+# (start_run resets METRICS, so a shared metrics file is truncated by the
+# next profile's plan).
+#
+#   1. Plan: every site is discovered and planned in turn with its overrides
+#      applied (start_run of its printer), sharing one Chromium when browser
+#      discovery is needed. Its render settings are captured into a SiteRun.
+#   2. Render: one async Chromium and CONCURRENCY contexts pull pages from a
+#      single queue, interleaved round-robin across sites so each site
+#      advances at the same rate. Navigations are paced per host (LIMITER), a
+#      failed page goes back into the queue after a backoff (PAGE_ATTEMPTS
+#      tries) and the watchdog cancels any page stuck past PAGE_DEADLINE.
+#      A site's missing pages are re-queued once more when it drains.
+#   3. As soon as a site has no pages left, it is merged in a thread while the
+#      pool keeps printing the other sites.
+
+CONCURRENCY = 6 # pages rendered at once across all sites (one browser context each)
+RESOURCE_POLICY = ResourcePolicy.esri_docs() # shared by every context; None = load everything
+RECYCLE_PAGES = 200 # fresh context after this many pages (see context_pool.py); 0 = no limit
+RECYCLE_HEAP_MB = 512 # ... or once its JS heap passes this; 0 = no limit
+METRICS = CrawlMetrics("batch_metrics.jsonl", trace_path=None) # per-page stage timings of the render phase (see crawl_metrics.py)
+LIMITER = HostLimiter(rate=4.0, start=CONCURRENCY, max_concurrency=CONCURRENCY) # per-host pacing (see host_limiter.py); None = off
+PAGE_ATTEMPTS = 3 # tries per page, re-queued after an exponential backoff
+PAGE_DEADLINE = 120 # seconds before the watchdog cancels a page and replaces its context
+
+SITES = [
+    {"name": "Enterprise Server", "printer": "full_site_printer",
+     "START_URL": "https://enterprise.arcgis.com/en/server/latest/develop/windows/about-extending-services.htm",
+     "OUTPUT_DIR": "04Server/Develop", "MERGED_FILENAME": "ArcGIS For Server Develop Guide.pdf",
+     "HIERARCHY_LOG": "enterprise_hierarchy.txt", "DEBUG_JSON": "enterprise_sidebar_debug.json",
+     "RESOLVED_TREE": "enterprise_resolved_tree.json", "MERGE_REPORT": "enterprise_merge_report.json",
+     "MANIFEST": "enterprise_crawl_manifest.json", "CRAWL_DB": "enterprise_crawl_state.db",
+     "METRICS_FILE": "enterprise_crawl_metrics.jsonl", "DISCOVERY_CACHE_FILE": "enterprise_discovery_cache.json"},
+    {"name": "ArcGIS Cookbook", "printer": "full_site_printer"},
+    {"name": "Pro ArcPy", "printer": "arcgis_pro_printer"},
+]
+
+# Printer constants a SiteRun renders and merges with (snapshotted, since the next profile may override them)
+RENDER_SETTINGS = ("OUTPUT_DIR", "MERGED_FILENAME", "MERGE_REPORT", "MERGE_WORKERS", "OPTIMIZE_PDF",
+                   "CSS_INJECT", "HEADER_INJECT_JS", "PDF_OPTIONS", "WAIT_POLICY", "STORE", "SEARCH_INDEX")
+
+@contextmanager
+def applied(module, overrides):
+    """Set a profile's constants on its printer module (and rebuild what depends on them), then restore."""
+    saved = {key: getattr(module, key) for key in list(overrides) + ["STORE", "SEARCH_INDEX", "METRICS", "DISCOVERY_CACHE"]}
+    for key, value in overrides.items():
+        setattr(module, key, value)
+    if "CRAWL_DB" in overrides:
+        module.STORE = CrawlStore(module.CRAWL_DB)
+    if "OUTPUT_DIR" in overrides and module.SEARCH_INDEX:
+        module.SEARCH_INDEX = SearchIndex(module.SEARCH_DB, site=os.path.basename(module.OUTPUT_DIR),
+                                          content_selectors=module.SEARCH_INDEX.content_selectors)
+    if "METRICS_FILE" in overrides or "TRACE_FILE" in overrides:
+        module.METRICS = CrawlMetrics(module.METRICS_FILE, module.TRACE_FILE)
+    if "DISCOVERY_CACHE_FILE" in overrides and module.DISCOVERY_CACHE:
+        module.DISCOVERY_CACHE = DiscoveryCache(module.DISCOVERY_CACHE_FILE, module.DISCOVERY_CACHE.max_age)
+    try:
+        yield module
+    finally:
+        for key, value in saved.items():
+            setattr(module, key, value)
+
+class SiteRun:
+    """One profile's plan plus the settings its pages are printed and merged with."""
+
+    def __init__(self, name, module):
+        self.name = name
+        for key in RENDER_SETTINGS:
+            setattr(self, key.lower(), getattr(module, key))
+        self.state = self.jobs = self.manifest = self.previous = None
+        self.outstanding = 0
+        self.retried = False
+        self.done = self.failed = 0
+        self.started = self.finished = None
+
+    def missing(self):
+        return [job for job in self.state.jobs
+                if not os.path.exists(job['path']) or os.path.getsize(job['path']) < 1000] # <1KB is suspicious
+
+# ------------------------------------------------------------------
+# PHASE 1: PLAN (site by site)
+# ------------------------------------------------------------------
+def plan_sites(from_tree=False, resume=False, incremental=False):
+    runs = []
+    with sync_playwright() as p:
+        browser = None
+        for profile in SITES:
+            module = importlib.import_module(profile["printer"])
+            module.INCREMENTAL = incremental
+            overrides = {key: value for key, value in profile.items() if key not in ("name", "printer")}
+            print(f"\n🗂️ Planning {profile['name']} ({profile['printer']})")
+            with applied(module, overrides):
+                page = None
+                if module.DISCOVERY_ENGINE == "browser" and not from_tree and not (resume and module.STORE.has_plan()):
+                    browser = browser or p.chromium.launch(headless=True)
+                    page = module.open_page(browser)
+                run = SiteRun(profile["name"], module)
+                run.state, run.jobs, run.manifest, run.previous = module.start_run(page=page, from_tree=from_tree, resume=resume)
+                if page: page.close()
+            runs.append(run)
+        if browser: browser.close()
+    return runs
+
+# ------------------------------------------------------------------
+# PHASE 2: RENDER (shared browser, fair interleaving)
+# ------------------------------------------------------------------
+def interleave(runs):
+    """Round-robin across sites: one page of each site in turn until each list runs out."""
+    lanes = [[(run, job, 0) for job in run.jobs] for run in runs]
+    return [item for batch in itertools.zip_longest(*lanes) for item in batch if item]
+
+async def prepare_and_print_async(run, pg, job, timing, lease):
+    with timing.stage("navigate"):
+        if lease is None: await run.wait_policy.goto_async(pg, job['url'])
+        else:
+            async with lease: await run.wait_policy.goto_async(pg, job['url'])
+    with timing.stage("details"): await pg.evaluate("document.querySelectorAll('details').forEach(e => e.open = true)")
+    with timing.stage("header"): await pg.evaluate(run.header_inject_js, job['title'])
+    with timing.stage("css"): await pg.add_style_tag(content=run.css_inject)
+    if run.search_index:
+        with timing.stage("index"): await run.search_index.capture_async(pg, job['url'], job['path'], job['title'])
+    with timing.stage("pdf"): await pg.pdf(path=job['path'], **run.pdf_options)
+
+async def print_page_async(run, pg, job):
+    with METRICS.record("render", job['url'], job['path'], site=run.name) as timing:
+        lease = None
+        if LIMITER:
+            with timing.stage("throttle"): lease = await LIMITER.acquire(job['url'])
+        # The watchdog only starts once the host gave a slot: queueing behind the limiter is not being stuck
+        try:
+            await asyncio.wait_for(prepare_and_print_async(run, pg, job, timing, lease), PAGE_DEADLINE)
+        except asyncio.TimeoutError:
+            try: await asyncio.wait_for(pg.close(), 10) # the pool replaces a closed page's context
+            except Exception: pass
+            raise TimeoutError(f"watchdog: no PDF after {PAGE_DEADLINE}s")
+        finally:
+            if lease: await lease.release() # no-op once the navigation released it
+
+def merge_site(run):
+    # Runs in a worker thread while the pool keeps printing other sites
+    with METRICS.record("merge", path=run.merged_filename, site=run.name) as timing:
+        with timing.stage("merge"):
+            merge_pdfs(run.output_dir, run.merged_filename, run.merge_report, entries=[(job['path'], job['title']) for job in run.state.jobs],
+                       titles=run.state.titles, workers=run.merge_workers, optimize=run.optimize_pdf)
+
+async def render_sites(runs):
+    queue = asyncio.Queue()
+    merges = []
+    started = time.time()
+    total = sum(len(run.jobs) for run in runs)
+    printed = 0
+    left = len(runs)
+
+    def site_drained(run):
+        nonlocal left
+        missing = [] if run.retried else run.missing()
+        if missing:
+            print(f"  🔄 {run.name}: re-queuing {len(missing)} missing or corrupted files")
+            run.retried = True
+            run.outstanding = len(missing)
+            for job in missing:
+                queue.put_nowait((run, job, 0))
+            return
+
+        run.finished = time.time()
+        print(f"\n🏁 {run.name}: {run.done} printed, {run.failed} failed in {run.finished - started:.0f}s, merging")
+        if run.manifest: run.manifest.commit(run.output_dir, run.previous)
+        if run.search_index: # sqlite connections stay on the event loop thread
+            run.search_index.finish(run.state.expected_pdfs.values())
+            run.search_index.report()
+        merges.append(asyncio.create_task(asyncio.to_thread(merge_site, run)))
+        left -= 1
+        if left == 0:
+            for _ in range(CONCURRENCY):
+                queue.put_nowait(None)
+
+    for item in interleave(runs):
+        queue.put_nowait(item)
+    for run in runs:
+        run.outstanding = len(run.jobs)
+        run.started = started
+    for run in runs:
+        if run.outstanding == 0:
+            site_drained(run)
+
+    async def setup(ctx):
+        if RESOURCE_POLICY: await RESOURCE_POLICY.attach_async(ctx)
+
+    async def worker(pool):
+        nonlocal printed
+        while (item := await queue.get()) is not None:
+            run, job, attempt = item
+            name = os.path.relpath(job['path'], run.output_dir)
+            try:
+                async with pool.page() as pg:
+                    await print_page_async(run, pg, job)
+                run.store.mark(job['path'], "done")
+                run.done += 1
+                printed += 1
+                elapsed = time.time() - started
+                print(f"  ✅ [{printed}/{total}] {run.name}: {name}  ({printed / elapsed * 60:.0f} pages/min)")
+            except Exception as e:
+                if attempt + 1 < PAGE_ATTEMPTS:
+                    delay = getattr(e, "retry_after", None) or backoff(attempt)
+                    print(f"  🔁 {run.name}: {name}: {e}; retry {attempt + 2}/{PAGE_ATTEMPTS} in {delay:.0f}s")
+                    asyncio.get_running_loop().call_later(delay, queue.put_nowait, (run, job, attempt + 1))
+                    continue
+                run.store.mark(job['path'], "failed", e)
+                run.failed += 1
+                print(f"  ❌ {run.name}: {name}: {e}")
+            run.outstanding -= 1
+            if run.outstanding == 0:
+                site_drained(run)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        pool = ContextPool(browser, CONCURRENCY, setup, RECYCLE_PAGES, RECYCLE_HEAP_MB)
+        await pool.open()
+        print(f"\n⚡ Rendering {total} pages from {len(runs)} sites on {CONCURRENCY} shared contexts")
+        await asyncio.gather(*(worker(pool) for _ in range(CONCURRENCY)))
+        await pool.close()
+        await browser.close()
+    await asyncio.gather(*merges)
+    return pool
+
+def run_batch(from_tree=False, resume=False, incremental=False):
+    started = time.time()
+    runs = plan_sites(from_tree, resume, incremental)
+    if not resume: METRICS.reset()
+    pool = asyncio.run(render_sites(runs))
+
+    for policy in {id(run.wait_policy): run.wait_policy for run in runs}.values():
+        policy.report()
+    if LIMITER: LIMITER.report()
+    if RESOURCE_POLICY: RESOURCE_POLICY.report()
+    pool.report()
+    METRICS.report()
+    print(f"\n📚 Batch finished in {time.time() - started:.0f}s")
+    for run in runs:
+        print(f"   {run.name}: {len(run.state.jobs)} pages, {run.done} printed this run, {run.failed} failures, "
+              f"rendered by {run.finished - run.started:.0f}s -> {run.merged_filename}")
+
+if __name__ == "__main__":
+    # --render-only:  plan every site from its existing RESOLVED_TREE
+    # --resume:       continue each site from its CRAWL_DB
+    # --incremental:  only re-print pages that changed (each site's MANIFEST)
+    run_batch(from_tree="--render-only" in sys.argv, resume="--resume" in sys.argv, incremental="--incremental" in sys.argv)
@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import importlib
+import threading
+import contextlib
+from playwright.sync_api import sync_playwright
+from batch_printer import applied
+from context_pool import PageRecycler
+from synthetic_site import SyntheticSite, serve
+
+# Force UTF-8
+sys.stdout.reconfigure(encoding='utf-8')
+
+# ------------------------------------------------------------------
+# OFFLINE BENCHMARK (synthetic site, no Esri servers)
+# ------------------------------------------------------------------
+# For every variant and size a SyntheticSite is served on localhost and the
+# printer that knows its markup runs the same phases as a normal crawl, with
+# START_URL pointed at it and every output / state file moved into
+# BENCH_DIR/<variant>_<pages> (the overrides go through batch_printer.applied):
+#   discovery  start_run(): sidebar tree, lazy folders and groups, work list
+#              (tree = the in-page TREE_PARSER_JS scrape on its own)
+#   render     crawl_async() for full_site_printer when CONCURRENCY > 1,
+#              otherwise the serial PageRecycler + render_jobs path (always
+#              with --sections, which prints one page.pdf per folder); with
+#              --light, the light renderer prints what it can first
+#   merge      search index finish + merge_output()
+# Peak RSS is sampled over the benchmark process and all of its children
+# (Chromium, merge workers). Printer output goes to run.log next to the run;
+# the results table is printed and saved to RESULTS_JSON.
+#
+#   python benchmark.py --sizes 100,1000 --variants site,pro --concurrency 4
+#   python benchmark.py --engine static --discover-only --sizes 20000
+#   python benchmark.py --sizes 1000 --variants site --sections
+#   python benchmark.py --sizes 1000 --light weasyprint
+
+BENCH_DIR = "benchmark_runs"
+RESULTS_JSON = "benchmark_results.json"
+SIZES = [100, 1000]
+VARIANTS = ["site", "cookbook", "pro"]
+PRINTERS = {"site": "full_site_printer", "cookbook": "full_site_printer", "pro": "arcgis_pro_printer"}
+ENGINE = "browser" # DISCOVERY_ENGINE for the printers: "browser" or "static"
+CONCURRENCY = 4 # full_site_printer render pages at once; 1 = serial path
+SECTIONS = False # SECTION_BATCH for the printers: one page.pdf per folder (serial path)
+LIGHT = None # LIGHT_RENDER for the printers: "weasyprint" or "xhtml2pdf" prints simple pages without Chromium
+SAMPLE_INTERVAL = 0.2 # seconds between RSS samples
+
+def process_rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+def tree_rss_mb():
+    """RSS of this process plus all of its descendants in MB, or None when it can't be read here."""
+    try:
+        import psutil
+        me = psutil.Process()
+        total = me.memory_info().rss
+        for child in me.children(recursive=True):
+            try: total += child.memory_info().rss
+            except psutil.Error: pass
+        return total / 1024 / 1024
+    except ImportError:
+        pass
+    if not os.path.isdir("/proc"):
+        return None
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit(): continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                parents.setdefault(int(f.read().rsplit(")", 1)[1].split()[1]), []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            pass
+    pids, stack = [], [os.getpid()]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(parents.get(pid, []))
+    return sum(process_rss_mb(pid) for pid in pids)
+
+class PeakRss:
+    """Samples tree_rss_mb() in a background thread; peak_mb is the highest value seen."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_mb = None
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while True:
+            rss = tree_rss_mb()
+            if rss is not None: self.peak_mb = max(self.peak_mb or 0.0, rss)
+            if self.stop.wait(self.interval): return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+
+def overrides_for(module, variant, pages, base, site, workdir):
+    join = lambda name: os.path.join(workdir, name)
+    overrides = {"START_URL": base + site.start_path, "DISCOVERY_ENGINE": ENGINE, "INCREMENTAL": False,
+                 "OUTPUT_DIR": join("pdf"), "MERGED_FILENAME": join(f"{variant}_{pages}.pdf"), "MERGE_REPORT": join("merge_report.json"),
+                 "HIERARCHY_LOG": join("hierarchy.txt"), "DEBUG_JSON": join("sidebar_debug.json"), "RESOLVED_TREE": join("resolved_tree.json"),
+                 "MANIFEST": join("crawl_manifest.json"), "CRAWL_DB": join("crawl_state.db"), "SEARCH_DB": join("search.db"),
+                 "METRICS_FILE": join("crawl_metrics.jsonl"), "DISCOVERY_CACHE_FILE": join("discovery_cache.json")}
+    if hasattr(module, "CONCURRENCY"): overrides["CONCURRENCY"] = CONCURRENCY
+    if SECTIONS: overrides["SECTION_BATCH"] = True
+    if LIGHT: overrides["LIGHT_RENDER"] = LIGHT
+    return overrides
+
+def render(module, state, jobs):
+    jobs = module.print_light(jobs)
+    if hasattr(module, "crawl_async") and CONCURRENCY > 1 and not module.SECTION_BATCH:
+        asyncio.run(module.crawl_async(state, jobs))
+        return
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        pages = PageRecycler(browser, module.setup_context, module.RECYCLE_PAGES, module.RECYCLE_HEAP_MB)
+        module.render_jobs(pages, jobs)
+        module.retry_missing(pages, state.expected_pdfs)
+        pages.close()
+        browser.close()
+
+def discover(module):
+    # start_run() with a page of our own when discovery drives Chromium
+    if module.DISCOVERY_ENGINE != "browser":
+        return module.start_run(page=None)
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = module.open_page(browser)
+        try:
+            return module.start_run(page=page)
+        finally:
+            browser.close()
+
+def bench(variant, pages, discover_only=False):
+    site = SyntheticSite(variant, pages)
+    server, base = serve(site)
+    workdir = os.path.join(BENCH_DIR, f"{variant}_{pages}")
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    module = importlib.import_module(PRINTERS[variant])
+    result = {"variant": variant, "printer": PRINTERS[variant], "pages": len(site.pages), "engine": ENGINE,
+              "concurrency": CONCURRENCY if hasattr(module, "crawl_async") and not SECTIONS else 1, "sections": SECTIONS, "light": LIGHT}
+
+    try:
+        with applied(module, overrides_for(module, variant, pages, base, site, workdir)), \
+                open(os.path.join(workdir, "run.log"), "w", encoding="utf-8") as log, contextlib.redirect_stdout(log), PeakRss() as rss:
+            started = time.time()
+            state, jobs, manifest, previous = discover(module)
+            result["discovery_s"] = time.time() - started
+            result["planned"] = len(state.jobs)
+            # The first discovery record is the sidebar tree scrape (browser engine only)
+            scrapes = [r["stages"].get("scrape", 0.0) for r in module.METRICS.records if r["kind"] == "discover"]
+            result["tree_s"] = scrapes[0] if scrapes else None
+            if not discover_only:
+                started = time.time()
+                render(module, state, jobs)
+                result["render_s"] = time.time() - started
+                result["pages_per_s"] = len(jobs) / max(result["render_s"], 1e-9)
+                result["failed"] = sum(1 for path in state.expected_pdfs if not os.path.exists(path) or os.path.getsize(path) < 1000)
+
+                started = time.time()
+                if module.SEARCH_INDEX:
+                    module.SEARCH_INDEX.finish(state.expected_pdfs.values())
+                module.merge_output(state)
+                result["merge_s"] = time.time() - started
+    finally:
+        server.shutdown()
+        server.server_close()
+    result["peak_rss_mb"] = rss.peak_mb
+    return result
+
+def fmt(value, width=0, digits=1, unit=""):
+    text = "-" if value is None else f"{value:.{digits}f}{unit}"
+    return f"{text:>{width}}"
+
+def print_table(results):
+    print(f"\n{'variant':<10}{'printer':<20}{'pages':>7}{'planned':>9}{'discovery':>11}{'tree':>8}{'render':>9}{'pages/s':>9}{'merge':>8}{'peak RSS':>10}")
+    for r in results:
+        print(f"{r['variant']:<10}{r['printer']:<20}{r['pages']:>7}{r['planned']:>9}{fmt(r['discovery_s'], 11, unit='s')}{fmt(r.get('tree_s'), 8, 2, 's')}"
+              f"{fmt(r.get('render_s'), 9, unit='s')}{fmt(r.get('pages_per_s'), 9, 2)}{fmt(r.get('merge_s'), 8, unit='s')}"
+              f"{fmt(r['peak_rss_mb'], 10, 0, ' MB')}")
+
+def run_benchmarks(sizes, variants, discover_only=False):
+    results = []
+    for pages in sizes:
+        for variant in variants:
+            print(f"🧪 {variant} ({PRINTERS[variant]}), {pages} pages, {ENGINE} discovery...", flush=True)
+            result = bench(variant, pages, discover_only)
+            print(f"   discovery {result['discovery_s']:.1f}s"
+                  + ("" if discover_only else f", {result['pages_per_s']:.2f} pages/s, merge {result['merge_s']:.1f}s")
+                  + f", peak RSS {fmt(result['peak_rss_mb'], digits=0, unit=' MB')}", flush=True)
+            results.append(result)
+
+    print_table(results)
+    with open(RESULTS_JSON, "w", encoding="utf-8") as f:
+        json.dump({"run": time.strftime("%Y-%m-%d %H:%M:%S"), "discover_only": discover_only, "results": results}, f, indent=2)
+    print(f"\n💾 Results saved to {RESULTS_JSON}")
+    return results
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {"--sizes": ",".join(map(str, SIZES)), "--variants": ",".join(VARIANTS), "--engine": ENGINE,
+               "--concurrency": str(CONCURRENCY), "--light": ""}
+    for name in options:
+        if name in args:
+            options[name] = args[args.index(name) + 1]
+    ENGINE = options["--engine"]
+    CONCURRENCY = int(options["--concurrency"])
+    SECTIONS = "--sections" in args
+    LIGHT = options["--light"] or None
+    run_benchmarks([int(size) for size in options["--sizes"].split(",")], options["--variants"].split(","),
+                   discover_only="--discover-only" in args)
@@ -0,0 +1,258 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+# ------------------------------------------------------------------
+# RECYCLING BROWSER CONTEXTS
+# ------------------------------------------------------------------
+# A renderer that has printed hundreds of pages keeps growing (detached DOM,
+# JS heap, image caches), gets slower and eventually crashes. Every render
+# page here lives in its own browser context, and a context is thrown away
+# and replaced when:
+#   - it has printed max_pages pages, or
+#   - its JS heap (CDP Performance.getMetrics, sampled after every page) is
+#     above max_heap_mb, or
+#   - its page crashed or was closed.
+# The page-count replacement is warmed up ahead of time: the new context is
+# opened while the old one prints its last page (in a background task for
+# the async pool), so no render waits on a context start. The old context is
+# closed after it is swapped out.
+#
+# setup(ctx) installs the route handlers (archive, resource policy) on every
+# new context, in the same order open_page uses on a page.
+#
+# The async pool never loses a position: when a replacement context can't be
+# opened (twice), an empty slot goes back on the queue and the next page()
+# that takes it opens the context then. If that fails too, the empty slot is
+# queued again and the error goes to that render.
+
+class Slot:
+    """One context + page in the pool, with its render count and last memory sample."""
+
+    __slots__ = ("index", "generation", "ctx", "page", "cdp", "pages", "heap_mb", "nodes", "peak_heap_mb")
+
+    def __init__(self, index, generation, ctx, page, cdp):
+        self.index = index # position in the pool (stable across replacements)
+        self.generation = generation # how many contexts this position has used before
+        self.ctx = ctx
+        self.page = page
+        self.cdp = cdp
+        self.pages = 0
+        self.heap_mb = 0.0
+        self.nodes = 0
+        self.peak_heap_mb = 0.0
+
+    def record(self, metrics):
+        values = {m["name"]: m["value"] for m in metrics["metrics"]}
+        self.heap_mb = values.get("JSHeapUsedSize", 0) / 1024 / 1024
+        self.nodes = int(values.get("Nodes", 0))
+        self.peak_heap_mb = max(self.peak_heap_mb, self.heap_mb)
+
+class RecyclingStats:
+    """Counters and per-position memory figures shared by the sync and async pools."""
+
+    def __init__(self, max_pages, max_heap_mb):
+        self.max_pages = max_pages # 0 = never recycle on page count
+        self.max_heap_mb = max_heap_mb # 0 = never recycle on memory
+        self.stats = {"opened": 0, "pages": 0, "recycled": {"pages": 0, "memory": 0, "crashed": 0},
+                      "peak_heap_mb": 0.0, "peak_nodes": 0, "slots": {}}
+
+    def due(self, slot, sampled):
+        """Why slot has to be replaced now, or None."""
+        if not sampled or slot.page.is_closed():
+            return "crashed"
+        if self.max_heap_mb and slot.heap_mb > self.max_heap_mb:
+            return "memory"
+        if self.max_pages and slot.pages >= self.max_pages:
+            return "pages"
+        return None
+
+    def warm_now(self, slot):
+        # Open the page-count replacement while this context prints its last page
+        return bool(self.max_pages) and slot.pages == self.max_pages - 1
+
+    def account(self, slot, reason=None):
+        self.stats["pages"] += 1
+        self.stats["peak_heap_mb"] = max(self.stats["peak_heap_mb"], slot.heap_mb)
+        self.stats["peak_nodes"] = max(self.stats["peak_nodes"], slot.nodes)
+        if reason: self.stats["recycled"][reason] += 1
+        entry = self.stats["slots"].setdefault(slot.index, {"contexts": 0, "pages": 0, "peak_heap_mb": 0.0})
+        entry.update(generation=slot.generation, current_pages=slot.pages, heap_mb=round(slot.heap_mb, 1), nodes=slot.nodes)
+        entry["pages"] += 1
+        entry["peak_heap_mb"] = round(max(entry["peak_heap_mb"], slot.heap_mb), 1)
+
+    def opened(self, slot):
+        self.stats["opened"] += 1
+        self.stats["slots"].setdefault(slot.index, {"contexts": 0, "pages": 0, "peak_heap_mb": 0.0})["contexts"] += 1
+
+    # -- reporting --------------------------------------------------
+    def merge(self, stats):
+        """Fold in the stats of another pool (e.g. from a worker process); its positions are appended."""
+        for key in ("opened", "pages"):
+            self.stats[key] += stats[key]
+        for reason, count in stats["recycled"].items():
+            self.stats["recycled"][reason] += count
+        self.stats["peak_heap_mb"] = max(self.stats["peak_heap_mb"], stats["peak_heap_mb"])
+        self.stats["peak_nodes"] = max(self.stats["peak_nodes"], stats["peak_nodes"])
+        offset = len(self.stats["slots"])
+        for index, entry in stats["slots"].items():
+            self.stats["slots"][offset + int(index)] = entry
+
+    def report(self):
+        if not self.stats["pages"]: return
+        recycled = self.stats["recycled"]
+        print(f"\n🧹 Context pool: {self.stats['pages']} pages on {self.stats['opened']} contexts, recycled "
+              f"{recycled['pages']} after {self.max_pages} pages, {recycled['memory']} over {self.max_heap_mb} MB heap, "
+              f"{recycled['crashed']} crashed (peak heap {self.stats['peak_heap_mb']:.0f} MB, {self.stats['peak_nodes']} DOM nodes)")
+        for index, entry in sorted(self.stats["slots"].items()):
+            print(f"   context {index + 1}: {entry['pages']} pages on {entry['contexts']} contexts, now {entry.get('current_pages', 0)} pages "
+                  f"/ {entry.get('heap_mb', 0):.0f} MB heap / {entry.get('nodes', 0)} nodes, peak {entry['peak_heap_mb']:.0f} MB")
+
+class PageRecycler(RecyclingStats):
+    """Sync API: one render page at a time, replaced per the recycling rules (call done() after each page)."""
+
+    def __init__(self, browser, setup=None, max_pages=200, max_heap_mb=512):
+        super().__init__(max_pages, max_heap_mb)
+        self.browser = browser
+        self.setup = setup
+        self.slot = None
+        self.spare = None
+
+    def _open(self, generation=0):
+        ctx = self.browser.new_context()
+        if self.setup: self.setup(ctx)
+        page = ctx.new_page()
+        cdp = ctx.new_cdp_session(page)
+        cdp.send("Performance.enable")
+        slot = Slot(0, generation, ctx, page, cdp)
+        self.opened(slot)
+        return slot
+
+    @property
+    def page(self):
+        if self.slot is None:
+            self.slot = self._open()
+        return self.slot.page
+
+    def done(self):
+        """Count the page just printed and swap the context if it is due."""
+        slot = self.slot
+        slot.pages += 1
+        try:
+            slot.record(slot.cdp.send("Performance.getMetrics"))
+            sampled = True
+        except Exception:
+            sampled = False
+        reason = self.due(slot, sampled)
+        self.account(slot, reason)
+        if reason is None:
+            if self.warm_now(slot) and self.spare is None:
+                self.spare = self._open(slot.generation + 1)
+            return
+
+        self.slot, self.spare = self.spare or self._open(slot.generation + 1), None
+        try: slot.ctx.close()
+        except Exception: pass
+
+    def close(self):
+        for slot in (self.slot, self.spare):
+            if slot:
+                try: slot.ctx.close()
+                except Exception: pass
+        self.slot = self.spare = None
+
+class ContextPool(RecyclingStats):
+    """Async API: size contexts handed out with `async with pool.page() as pg`, each recycled on its own."""
+
+    def __init__(self, browser, size, setup=None, max_pages=200, max_heap_mb=512):
+        super().__init__(max_pages, max_heap_mb)
+        self.browser = browser
+        self.size = size
+        self.setup = setup
+        self.idle = asyncio.Queue()
+        self.spares = {} # position -> task opening its replacement
+        self.closing = set()
+
+    async def _open(self, index, generation=0):
+        ctx = await self.browser.new_context()
+        try:
+            if self.setup: await self.setup(ctx)
+            page = await ctx.new_page()
+            cdp = await ctx.new_cdp_session(page)
+            await cdp.send("Performance.enable")
+        except BaseException:
+            await self._close(ctx)
+            raise
+        slot = Slot(index, generation, ctx, page, cdp)
+        self.opened(slot)
+        return slot
+
+    async def open(self):
+        for slot in await asyncio.gather(*(self._open(n) for n in range(self.size))):
+            self.idle.put_nowait(slot)
+
+    @asynccontextmanager
+    async def page(self):
+        slot = await self.idle.get()
+        if slot.ctx is None: # its replacement failed to open, open it now
+            try:
+                slot = await self._open(slot.index, slot.generation)
+            except BaseException:
+                self.idle.put_nowait(slot)
+                raise
+        try:
+            yield slot.page
+        finally:
+            await self._release(slot)
+
+    async def _replace(self, slot, spare):
+        """Open slot's successor (spare is its warm-up task, if any); an empty slot when that fails twice."""
+        generation = slot.generation + 1
+        try:
+            return await spare if spare else await self._open(slot.index, generation)
+        except Exception:
+            pass
+        try:
+            return await self._open(slot.index, generation)
+        except Exception as e:
+            print(f"⚠️ Context {slot.index + 1}: replacement failed to open ({type(e).__name__}: {e}), retrying on next use")
+            return Slot(slot.index, generation, None, None, None)
+
+    async def _release(self, slot):
+        slot.pages += 1
+        try:
+            slot.record(await slot.cdp.send("Performance.getMetrics"))
+            sampled = True
+        except Exception:
+            sampled = False
+        reason = self.due(slot, sampled)
+        self.account(slot, reason)
+        if reason is None:
+            if self.warm_now(slot) and slot.index not in self.spares:
+                self.spares[slot.index] = asyncio.create_task(self._open(slot.index, slot.generation + 1))
+            self.idle.put_nowait(slot)
+            return
+
+        spare = self.spares.pop(slot.index, None)
+        try:
+            self.idle.put_nowait(await self._replace(slot, spare))
+        except BaseException: # cancelled while opening: keep the position for a later page()
+            self.idle.put_nowait(Slot(slot.index, slot.generation + 1, None, None, None))
+            raise
+        finally:
+            task = asyncio.create_task(self._close(slot.ctx))
+            self.closing.add(task)
+            task.add_done_callback(self.closing.discard)
+
+    async def _close(self, ctx):
+        if ctx is None: return
+        try: await ctx.close()
+        except Exception: pass
+
+    async def close(self):
+        await asyncio.gather(*self.closing)
+        for task in self.spares.values():
+            try: ctx = (await task).ctx
+            except Exception: continue
+            await self._close(ctx)
+        while not self.idle.empty():
+            await self._close(self.idle.get_nowait().ctx)
@@ -0,0 +1,135 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from static_sidebar import HttpPool, Element, parse_html
+
+# ------------------------------------------------------------------
+# INCREMENTAL CRAWL MANIFEST
+# ------------------------------------------------------------------
+# For every URL the manifest keeps the HTTP validators of the last render
+# (ETag, Last-Modified), a hash of the normalized main-content DOM, a render
+# key (title + print CSS + PDF options) and the PDF path relative to
+# OUTPUT_DIR. A page is re-printed only when:
+#   - it is new, or its render key changed, or its old PDF is gone
+#   - a conditional GET does not answer 304 AND the main-content hash differs
+# Everything else is copied over from the previous output.
+#
+# The previous OUTPUT_DIR is moved aside (OUTPUT_DIR + ".previous") instead
+# of deleted, so renumbered pages are found at their old path and pages that
+# left the sidebar drop out of the merge.
+
+HASH_ATTRS = ("href", "src", "alt") # attributes that change what gets printed
+NOISE_TAGS = {"SCRIPT", "STYLE", "NOSCRIPT", "TEMPLATE", "SVG"}
+
+def is_main(el):
+    # Same element as wait_policy.MAIN_CONTENT: main, div[role="main"], .column-17, .column-19
+    return (el.tag == "MAIN" or (el.tag == "DIV" and el.attrs.get("role") == "main")
+            or el.has_class("column-17") or el.has_class("column-19"))
+
+def main_content_hash(html):
+    """sha256 of the main content's tags, key attributes and whitespace-collapsed text."""
+    doc = parse_html(html)
+    main = doc.find(is_main) or doc
+    parts = []
+
+    def walk(node):
+        for n in node.nodes:
+            if isinstance(n, Element):
+                if n.tag in NOISE_TAGS: continue
+                attrs = " ".join(f'{a}="{n.attrs[a]}"' for a in HASH_ATTRS if a in n.attrs)
+                parts.append(f"<{n.tag} {attrs}>")
+                walk(n)
+            else:
+                text = re.sub(r"\s+", " ", n).strip()
+                if text: parts.append(text)
+
+    walk(main)
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+def render_key(title, *options):
+    return hashlib.sha256(json.dumps([title, *options], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+class CrawlManifest:
+    """Per-URL validators and content hashes from the last run, used to skip unchanged pages."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {} # url -> {etag, last_modified, content_hash, render_key, pdf}
+        self.pending = {} # url -> entry to commit once its PDF exists
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def stash_output(output_dir):
+        """Move the previous output aside and return its path (None when there is none)."""
+        previous = output_dir.rstrip("/\\") + ".previous"
+        if os.path.exists(previous):
+            shutil.rmtree(previous, ignore_errors=True)
+        if not os.path.exists(output_dir):
+            return None
+        os.replace(output_dir, previous)
+        return previous
+
+    def check(self, pool, url, key, previous_dir):
+        """Return (unchanged, entry): entry holds the fresh validators/hash for the manifest."""
+        old = self.entries.get(url)
+        old_pdf = os.path.join(previous_dir, old["pdf"]) if old and previous_dir else None
+        reusable = bool(old_pdf) and old.get("render_key") == key and os.path.exists(old_pdf)
+
+        headers = {}
+        if reusable and old.get("etag"): headers["If-None-Match"] = old["etag"]
+        if reusable and old.get("last_modified"): headers["If-Modified-Since"] = old["last_modified"]
+        try:
+            resp = pool.request(url, headers=headers)
+        except Exception:
+            return False, None # unreachable: render it and let the browser report the error
+        if resp.status == 304 and reusable:
+            return True, dict(old)
+
+        entry = {"etag": resp.headers.get("etag"), "last_modified": resp.headers.get("last-modified"),
+                 "content_hash": main_content_hash(resp.text) if resp.status < 400 else None, "render_key": key}
+        return bool(reusable and entry["content_hash"] and entry["content_hash"] == old.get("content_hash")), entry
+
+    def reuse_unchanged(self, jobs, output_dir, previous_dir, options, workers=8):
+        """Copy unchanged pages over from previous_dir and return the jobs that still need printing."""
+        pool = HttpPool()
+
+        def check(job):
+            return self.check(pool, job['url'], render_key(job['title'], *options), previous_dir)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(check, jobs))
+
+        to_render = []
+        for job, (unchanged, entry) in zip(jobs, results):
+            pdf = os.path.relpath(job['path'], output_dir)
+            if unchanged:
+                shutil.copy2(os.path.join(previous_dir, self.entries[job['url']]["pdf"]), job['path'])
+                self.entries[job['url']] = dict(entry, pdf=pdf)
+            else:
+                to_render.append(job)
+                if entry: self.pending[job['url']] = dict(entry, pdf=pdf)
+        print(f"♻️ Incremental: {len(jobs) - len(to_render)} unchanged pages reused, {len(to_render)} to print "
+              f"({pool.stats['requests']} checks over {pool.stats['connections']} connections)")
+        pool.close()
+        return to_render
+
+    def commit(self, output_dir, previous_dir=None):
+        """Record pages printed this run (those whose PDF now exists), save, drop the old output."""
+        for url, entry in self.pending.items():
+            if os.path.exists(os.path.join(output_dir, entry["pdf"])):
+                self.entries[url] = entry
+        self.pending = {}
+        self.save()
+        if previous_dir:
+            shutil.rmtree(previous_dir, ignore_errors=True)
@@ -0,0 +1,167 @@
+import os
+import csv
+import math
+import json
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+
+# ------------------------------------------------------------------
+# PER-PAGE TIMING
+# ------------------------------------------------------------------
+# Every unit of work is a record with a kind ("render", "discover", "section",
+# "merge") and the wall time of each stage inside it:
+#   render:   navigate, details, header, css, index, pdf (capture instead of
+#             pdf when the page goes into a section print)
+#   section:  assemble, css, pdf, split (one print job for a folder's pages)
+#   render records of the light renderer only have fetch and pdf; async renders
+#   behind a host_limiter also have throttle (waiting for a slot on the host)
+#   discover: navigate, scrape (the lazy-children / sidebar evaluate)
+#   merge:    merge
+# Records are appended to the metrics file as they finish (JSONL, or CSV
+# when the path ends in .csv), so a crawl that dies still leaves its
+# timings. report() prints percentiles per stage, the slowest pages and the
+# render throughput; with a trace path it also writes a Chrome trace
+# (chrome://tracing or https://ui.perfetto.dev), one lane per concurrent
+# render task.
+#
+#   with METRICS.record("render", url, path) as timing:
+#       with timing.stage("navigate"): ...
+
+STAGES = ("fetch", "throttle", "navigate", "details", "header", "css", "index", "capture", "assemble", "pdf", "split", "scrape", "merge")
+CSV_COLUMNS = ("kind", "url", "path", "ok", "error", "start", "total") + STAGES
+
+def percentile(values, q):
+    # Nearest rank on an already sorted list
+    if not values: return 0.0
+    return values[min(len(values), max(1, math.ceil(q / 100 * len(values)))) - 1]
+
+class Timing:
+    """One record being timed: stage durations in seconds, in the order they ran."""
+
+    def __init__(self, kind, url=None, path=None, lane=0, **extra):
+        self.data = {"kind": kind, "url": url, "path": path, "ok": True, "error": None, "pid": os.getpid(),
+                     "lane": lane, "start": time.time(), "total": 0.0, "stages": {}, **extra}
+        self.spans = [] # (stage, start, duration) for the trace
+
+    @contextmanager
+    def stage(self, name):
+        started = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - started
+            self.data["stages"][name] = self.data["stages"].get(name, 0.0) + duration
+            self.spans.append((name, started, duration))
+
+class CrawlMetrics:
+    """Collects Timing records, streams them to a JSONL/CSV file and summarizes them."""
+
+    def __init__(self, path, trace_path=None, slowest=10):
+        self.path = path
+        self.trace_path = trace_path # None = no Chrome trace
+        self.slowest = slowest
+        self.records = []
+        self.spans = [] # (record index, stage, start, duration)
+        self.lanes = {}
+        self.lock = threading.Lock()
+
+    def reset(self):
+        """Start a fresh metrics file (a resumed run keeps appending to the old one)."""
+        self.records, self.spans, self.lanes = [], [], {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _lane(self):
+        # Concurrent async tasks (or threads) each get their own trace lane
+        try: key = id(asyncio.current_task())
+        except RuntimeError: key = threading.get_ident()
+        with self.lock:
+            return self.lanes.setdefault(key, len(self.lanes))
+
+    @contextmanager
+    def record(self, kind, url=None, path=None, **extra):
+        timing = Timing(kind, url, path, self._lane(), **extra)
+        try:
+            yield timing
+        except BaseException as e: # also a watchdog cancellation
+            timing.data["ok"] = False
+            timing.data["error"] = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            timing.data["total"] = time.time() - timing.data["start"]
+            self.add(timing.data, timing.spans)
+
+    def add(self, data, spans=()):
+        with self.lock:
+            index = len(self.records)
+            self.records.append(data)
+            self.spans.extend((index, *span) for span in spans)
+            self._write(data)
+
+    def _write(self, data):
+        is_csv = self.path.endswith(".csv")
+        new = not os.path.exists(self.path)
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            if is_csv:
+                writer = csv.writer(f)
+                if new: writer.writerow(CSV_COLUMNS)
+                row = {**data, **{k: round(v, 4) for k, v in data["stages"].items()}, "total": round(data["total"], 4)}
+                writer.writerow([row.get(column, "") for column in CSV_COLUMNS])
+            else:
+                f.write(json.dumps(data) + "\n")
+
+    # -- worker processes -------------------------------------------
+    def export(self):
+        return {"records": self.records, "spans": self.spans}
+
+    def merge(self, stats):
+        """Fold in the records of a worker process (already written to the file by the worker)."""
+        offset = len(self.records)
+        self.records.extend(stats["records"])
+        self.spans.extend((index + offset, *span) for index, *span in stats["spans"])
+
+    # -- reporting --------------------------------------------------
+    def write_trace(self):
+        events = []
+        for n, data in enumerate(self.records):
+            events.append({"name": os.path.basename(data["path"] or data["url"] or data["kind"]), "cat": data["kind"], "ph": "X",
+                           "ts": data["start"] * 1e6, "dur": data["total"] * 1e6, "pid": data["pid"], "tid": data["lane"],
+                           "args": {"url": data["url"], "path": data["path"], "ok": data["ok"], "error": data["error"]}})
+        for n, name, started, duration in self.spans:
+            data = self.records[n]
+            events.append({"name": name, "cat": data["kind"], "ph": "X", "ts": started * 1e6, "dur": duration * 1e6,
+                           "pid": data["pid"], "tid": data["lane"]})
+        with open(self.trace_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"   Chrome trace: {self.trace_path} ({len(events)} events)")
+
+    def report(self):
+        renders = [r for r in self.records if r["kind"] == "render"]
+        if not self.records: return
+        print(f"\n📊 Timing ({self.path}):")
+        if renders:
+            first = min(r["start"] for r in renders)
+            last = max(r["start"] + r["total"] for r in renders)
+            minutes = max(last - first, 1e-9) / 60
+            failed = sum(not r["ok"] for r in renders)
+            print(f"   {len(renders)} pages rendered in {minutes:.1f} min ({len(renders) / minutes:.1f} pages/min), {failed} failed")
+
+        print(f"   {'stage':<18}{'count':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'sum':>10}")
+        for kind in ("render", "discover", "section", "merge"):
+            group = [r for r in self.records if r["kind"] == kind]
+            if not group: continue
+            names = [s for s in STAGES if any(s in r["stages"] for r in group)]
+            for name in names + ["total"]:
+                values = sorted(r["total"] if name == "total" else r["stages"][name] for r in group if name == "total" or name in r["stages"])
+                print(f"   {kind + '.' + name:<18}{len(values):>7}{percentile(values, 50):>8.2f}s{percentile(values, 90):>8.2f}s"
+                      f"{percentile(values, 99):>8.2f}s{values[-1]:>8.2f}s{sum(values):>9.0f}s")
+
+        if renders:
+            print("   Slowest pages:")
+            for r in sorted(renders, key=lambda r: r["total"], reverse=True)[:self.slowest]:
+                worst = max(r["stages"].items(), key=lambda kv: kv[1], default=("-", 0.0))
+                print(f"   {r['total']:7.2f}s  {r['path'] or r['url']}  ({worst[0]} {worst[1]:.2f}s{'' if r['ok'] else ', failed'})")
+        if self.trace_path:
+            self.write_trace()
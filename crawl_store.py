@@ -0,0 +1,117 @@
+import os
+import time
+import sqlite3
+
+# ------------------------------------------------------------------
+# DURABLE CRAWL STATE (SQLite, WAL mode)
+# ------------------------------------------------------------------
+# The planned work list is written once, right after planning: every job
+# with its merge-order index, numbered path, URL and title, plus the folders
+# and hierarchy log lines. Each render then flips its job to "done" or
+# "failed" in its own small transaction, so a Chromium crash or Ctrl-C loses
+# at most the page being printed.
+#
+# --resume reloads the stored plan instead of discovering/planning again, so
+# indices and paths are exactly the ones of the interrupted run, and only
+# jobs that are not done (or whose PDF is missing) are printed.
+#
+# WAL lets the sharded workers (one connection per process) write status
+# updates concurrently with the parent reading.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY,      -- merge order
+    path TEXT UNIQUE NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending', -- pending | done | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS folders (seq INTEGER PRIMARY KEY, path TEXT NOT NULL, title TEXT);
+CREATE TABLE IF NOT EXISTS hierarchy (seq INTEGER PRIMARY KEY, level INTEGER, line TEXT, path TEXT);
+"""
+
+class CrawlStore:
+    """Planned jobs and their completion status, persisted as the crawl runs."""
+
+    def __init__(self, path):
+        self.path = path
+        self._db = None
+        self._pid = None
+
+    @property
+    def db(self):
+        # One connection per process (spawned shard workers open their own)
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._db
+
+    def close(self):
+        if self._db is not None and self._pid == os.getpid():
+            self._db.close()
+        self._db = None
+
+    # -- plan -------------------------------------------------------
+    def save_plan(self, state, **meta):
+        """Replace the stored plan with a freshly planned CrawlState."""
+        db = self.db
+        with db:
+            db.execute("BEGIN")
+            for table in ("jobs", "folders", "hierarchy", "meta"):
+                db.execute(f"DELETE FROM {table}")
+            db.executemany("INSERT INTO jobs (seq, path, url, title) VALUES (?, ?, ?, ?)",
+                           [(n, job['path'], job['url'], job['title']) for n, job in enumerate(state.jobs)])
+            db.executemany("INSERT INTO folders (seq, path, title) VALUES (?, ?, ?)",
+                           [(n, path, state.titles.get(path)) for n, path in enumerate(state.folders)])
+            db.executemany("INSERT INTO hierarchy (seq, level, line, path) VALUES (?, ?, ?, ?)",
+                           [(n, *entry) for n, entry in enumerate(getattr(state, "hierarchy", []))])
+            meta = dict(meta, planned=str(time.time()))
+            db.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", list(meta.items()))
+
+    def has_plan(self):
+        return self.db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] > 0
+
+    def load_plan(self, state):
+        """Fill an empty CrawlState with the stored plan (same paths, same order)."""
+        for path, url, title in self.db.execute("SELECT path, url, title FROM jobs ORDER BY seq"):
+            state.add_job(path, url, title)
+        for path, title in self.db.execute("SELECT path, title FROM folders ORDER BY seq"):
+            state.add_folder(path, title)
+        if hasattr(state, "hierarchy"):
+            state.hierarchy = [tuple(row) for row in self.db.execute("SELECT level, line, path FROM hierarchy ORDER BY seq")]
+        state.visited = {url.split('#')[0] for url in state.expected_pdfs.values()}
+        return state
+
+    def folder_titles(self):
+        return dict(self.db.execute("SELECT path, title FROM folders"))
+
+    def meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # -- progress ---------------------------------------------------
+    def mark(self, path, status, error=None):
+        with self.db as db:
+            db.execute("UPDATE jobs SET status = ?, error = ?, attempts = attempts + 1, updated = ? WHERE path = ?",
+                       (status, str(error)[:500] if error else None, time.time(), path))
+
+    def mark_many(self, paths, status):
+        with self.db as db:
+            db.executemany("UPDATE jobs SET status = ?, updated = ? WHERE path = ?",
+                           [(status, time.time(), path) for path in paths])
+
+    def incomplete(self, state, min_size=1000):
+        """Jobs (in merge order) not marked done, or done but with a missing/truncated PDF."""
+        done = {row[0] for row in self.db.execute("SELECT path FROM jobs WHERE status = 'done'")}
+        return [job for job in state.jobs
+                if job['path'] not in done or not os.path.exists(job['path']) or os.path.getsize(job['path']) < min_size]
+
+    def counts(self):
+        return dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
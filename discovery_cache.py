@@ -0,0 +1,94 @@
+import os
+import copy
+import json
+import time
+import hashlib
+
+# ------------------------------------------------------------------
+# LAZY-CHILDREN DISCOVERY CACHE
+# ------------------------------------------------------------------
+# Opening a lazy folder costs a full navigation (browser) or GET (static)
+# just to scrape its children. The cache keeps, per landing URL, the children
+# the last scrape returned plus a fingerprint of the sidebar list the folder
+# link was found in (titles, URLs and lazy flags of its siblings, not their
+# children). An entry is reused while:
+#   - the parent list hashes the same (a page added, removed, renamed or
+#     moved next to the folder means a fresh scrape), and
+#   - it is younger than max_age seconds (new pages *inside* a folder don't
+#     show in its parent list, so entries also expire)
+# Lookups are served from memory within a run; save() writes the entries to
+# a JSON file for the next one.
+#
+# Only trustworthy scrapes are stored: an empty result (the sidebar may not
+# have been built yet) or one taken after the readiness wait fell back to the
+# load state is used for this run but scraped again next time.
+
+FINGERPRINT_KEYS = ("type", "title", "url", "is_collapsed", "needs_expansion")
+
+def list_fingerprint(items):
+    """sha256 of a sidebar list's own structure (children are left out, the walk fills those in)."""
+    rows = [[item.get(key) for key in FINGERPRINT_KEYS] for item in items]
+    return hashlib.sha256(json.dumps(rows).encode("utf-8")).hexdigest()[:16]
+
+class DiscoveryCache:
+    """Scraped lazy-folder children by landing URL, valid while the parent list is unchanged."""
+
+    def __init__(self, path, max_age=7 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self.entries = None # url -> {fingerprint, children, scraped}; loaded on first use
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "uncached": 0}
+
+    def _load(self):
+        if self.entries is None:
+            self.entries = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        self.entries = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Ignoring unreadable discovery cache {self.path}: {e}")
+        return self.entries
+
+    def get(self, url, fingerprint):
+        entry = self._load().get(url.split('#')[0])
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        if entry["fingerprint"] != fingerprint or (self.max_age and time.time() - entry["scraped"] > self.max_age):
+            self.stats["stale"] += 1
+            return None
+        self.stats["hits"] += 1
+        return copy.deepcopy(entry["children"]) # the walk attaches grandchildren to these dicts
+
+    def put(self, url, fingerprint, children):
+        self._load()[url.split('#')[0]] = {"fingerprint": fingerprint, "children": copy.deepcopy(children), "scraped": time.time()}
+
+    def children(self, url, siblings, scrape, trusted=None):
+        """Cached children of the lazy folder at url (found in the list siblings), else scrape(url).
+
+        trusted() is asked after a scrape; False keeps that result out of the cache.
+        """
+        fingerprint = list_fingerprint(siblings)
+        children = self.get(url, fingerprint)
+        if children is None:
+            children = scrape(url)
+            if children and (trusted is None or trusted()):
+                self.put(url, fingerprint, children)
+            else:
+                self.stats["uncached"] += 1
+        return children
+
+    def save(self):
+        if self.entries is None or not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+    def report(self):
+        s = self.stats
+        if s["hits"] or s["misses"] or s["stale"]:
+            print(f"💾 Discovery cache: {s['hits']} folders reused, {s['misses'] + s['stale']} scraped "
+                  f"({s['stale']} stale, {s['uncached']} empty or unsettled, not cached) -> {self.path}")
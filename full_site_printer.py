@@ -3,9 +3,28 @@ import re
 import sys
 import json
 import time
+import shutil
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import unquote
 from playwright.sync_api import sync_playwright
-from pypdf import PdfWriter
+from playwright.async_api import async_playwright
+from pdf_merge import merge_pdfs
+from markdown_export import export_markdown
+from resource_policy import ResourcePolicy
+from crawl_manifest import CrawlManifest
+from crawl_store import CrawlStore
+from discovery_cache import DiscoveryCache
+from static_sidebar import StaticSidebar, tree_from_rows
+from web_archive import WebArchive
+from crawl_metrics import CrawlMetrics
+from context_pool import PageRecycler, ContextPool, RecyclingStats
+from search_index import SearchIndex
+from light_render import render_light_jobs
+from section_render import CAPTURE_JS, ASSEMBLE_JS, SECTION_FILE, section_batches, split_section
+from host_limiter import HostLimiter, backoff
+from wait_policy import WaitPolicy, MAIN_CONTENT, H1_HYDRATED, CALCITE_TREE_HYDRATED, ACCORDION_NAV_POPULATED
 
 # Force UTF-8
 sys.stdout.reconfigure(encoding='utf-8')
@@ -14,6 +33,104 @@ sys.stdout.reconfigure(encoding='utf-8')
 START_URL = "https://esri.github.io/arcgis-cookbook/"
 OUTPUT_DIR = "Outputs/06ArcGIS Enterprise In The Cloud/ArcGIS Cookbook"
 MERGED_FILENAME = "Outputs/06ArcGIS Enterprise In The Cloud/ArcGIS Cookbook.pdf"
+MERGE_WORKERS = 4 # processes copying merge fragments in parallel; 0 or 1 = single process
+OPTIMIZE_PDF = True # after merging, share identical font/image streams and compress unfiltered streams
+MERGE_REPORT = "merge_report.json" # inputs skipped by the merge, plus time / memory figures
+HIERARCHY_LOG = "full_hierarchy.txt"
+DEBUG_JSON = "sidebar_debug.json"
+RESOLVED_TREE = "resolved_tree.json" # sidebar with every lazy folder expanded (discovery output)
+
+# Async render: number of pages rendered at the same time (each in its own browser context).
+# 1 = classic serial render on a single page.
+CONCURRENCY = 4
+
+# Host scheduling for the async render (see host_limiter.py): navigations per host are paced by a
+# token bucket (4/s) and an in-flight limit that grows while pages load fast and halves on errors,
+# timeouts and 429/503 answers. A failed page goes back into the queue after an exponential backoff,
+# up to PAGE_ATTEMPTS tries; the watchdog cancels a page with no PDF PAGE_DEADLINE seconds after its host slot was granted.
+# LIMITER = None: no pacing.
+LIMITER = HostLimiter(rate=4.0, start=CONCURRENCY, max_concurrency=CONCURRENCY) # more slots than workers can't be used
+PAGE_ATTEMPTS = 3
+PAGE_DEADLINE = 120
+
+# Sharded render: top-level sidebar groups are split across this many worker processes,
+# each with its own Chromium. 0 or 1 = off (takes precedence over CONCURRENCY when on).
+SHARD_WORKERS = 0
+
+# Section rendering (see section_render.py): print the pages of each folder with one page.pdf
+# call, SECTION_BATCH_PAGES pages at a time, and cut the result back into per-page PDFs.
+# False = one print job per page. Takes precedence over CONCURRENCY (serial and sharded render only).
+SECTION_BATCH = False
+SECTION_BATCH_PAGES = 50
+
+# Lightweight rendering (see light_render.py): pages without complex layout are fetched over
+# HTTP and printed by a pure-Python HTML-to-PDF engine ("weasyprint" or "xhtml2pdf", must be
+# installed) in LIGHT_RENDER_WORKERS processes before Chromium starts; Chromium prints the rest.
+# Live runs only (not with --record / --replay). None = Chromium prints every page.
+LIGHT_RENDER = None
+LIGHT_RENDER_WORKERS = 4
+
+# Request interception: block consent/analytics/feedback hosts and fonts/media so pages
+# stop waiting on them (see resource_policy.py). None = load everything.
+RESOURCE_POLICY = ResourcePolicy.esri_docs()
+
+# Timing (see crawl_metrics.py): per-page stage timings (navigate, details, header, css, index,
+# pdf; discovery scrapes; merge) streamed to METRICS_FILE (.jsonl or .csv), with a percentile
+# summary at the end of the run. TRACE_FILE = a Chrome trace JSON path, None = no trace.
+METRICS_FILE = "crawl_metrics.jsonl"
+TRACE_FILE = None
+METRICS = CrawlMetrics(METRICS_FILE, TRACE_FILE)
+
+# Context recycling (see context_pool.py): every render page gets a fresh browser context after
+# RECYCLE_PAGES pages, or as soon as its JS heap passes RECYCLE_HEAP_MB. 0 = no limit.
+RECYCLE_PAGES = 200
+RECYCLE_HEAP_MB = 512
+
+# Incremental crawl (see crawl_manifest.py): keep the previous output and only re-print pages
+# whose content, title or print settings changed since the last run. --incremental overrides this.
+INCREMENTAL = False
+MANIFEST = "crawl_manifest.json"
+
+# Durable crawl state (see crawl_store.py): the planned work list and each page's status are
+# written to this SQLite file as the crawl runs. --resume continues an interrupted run from it.
+CRAWL_DB = "crawl_state.db"
+STORE = CrawlStore(CRAWL_DB)
+
+# Record/replay archive (see web_archive.py). "record" saves every response under ARCHIVE_DIR
+# while crawling; "replay" serves pages from it with no network, so changing CSS_INJECT or
+# PDF_OPTIONS only costs a re-render. None = live. --record / --replay override this.
+ARCHIVE_DIR = "site_archive"
+ARCHIVE = WebArchive(ARCHIVE_DIR, mode=None)
+
+# Page readiness (see wait_policy.py): after domcontentloaded, wait for these DOM signals
+# instead of networkidle. networkidle is only the fallback when a signal never shows up.
+WAIT_POLICY = WaitPolicy({"main content": MAIN_CONTENT, "h1": H1_HYDRATED,
+                          "calcite-tree": CALCITE_TREE_HYDRATED, "accordion nav": ACCORDION_NAV_POPULATED})
+SIDEBAR_WAIT = WaitPolicy({"calcite-tree": CALCITE_TREE_HYDRATED, "accordion nav": ACCORDION_NAV_POPULATED})
+
+# Discovery cache (see discovery_cache.py): the children each lazy folder's scrape returned,
+# reused on later runs (no navigation) while the sidebar list the folder sits in is unchanged
+# and the entry is younger than a week. None = always scrape.
+DISCOVERY_CACHE_FILE = "discovery_cache.json"
+DISCOVERY_CACHE = DiscoveryCache(DISCOVERY_CACHE_FILE)
+
+# Sidebar discovery engine: "browser" (Chromium) or "static" (plain HTTP + Python port of
+# parseNode, see static_sidebar.py). Rendering always uses Chromium.
+DISCOVERY_ENGINE = "browser"
+
+# Markdown export (see markdown_export.py, --markdown): the planned pages as .md files in the
+# same numbered tree, plus heading-aware chunks with their hierarchy path in one JSONL file.
+# Fetched over HTTP (or from ARCHIVE_DIR with --replay) and converted without Chromium.
+MARKDOWN_DIR = "Outputs/06ArcGIS Enterprise In The Cloud/ArcGIS Cookbook (Markdown)"
+CHUNKS_JSONL = "Outputs/06ArcGIS Enterprise In The Cloud/ArcGIS Cookbook.jsonl"
+MARKDOWN_WORKERS = 8
+
+# Full-text search (see search_index.py): the text of every printed page goes into an FTS5
+# index shared by all printers (site = OUTPUT_DIR name), captured from the loaded page right
+# before page.pdf. None = off. Query it with: python search_index.py "some words"
+CONTENT_SELECTORS = ["main", ".column-17"] # same lookup order as HEADER_INJECT_JS
+SEARCH_DB = "docs_search.db"
+SEARCH_INDEX = SearchIndex(SEARCH_DB, site=os.path.basename(OUTPUT_DIR), content_selectors=CONTENT_SELECTORS)
 
 # Aggressive CSS to reveal everything and clean print
 CSS_INJECT = """
@@ -44,394 +161,900 @@ aside.js-accordion, .column-5, .share-buttons, .feedback-container, .shell-panel
 body { background-color: white !important; -webkit-print-color-adjust: exact; }
 """
 
+PDF_OPTIONS = {"format": "A4", "margin": {"top":"1cm","bottom":"1cm","left":"1cm","right":"1cm"}}
+
+# ------------------------------------------------------------------
+# IN-PAGE SCRIPTS
+# ------------------------------------------------------------------
+# HYBRID TREE PARSER
+# Returns a flat node table, one [parent, kind, title, url, flags] row per item
+# in document order, nested by static_sidebar.tree_from_rows (see there for
+# the row kinds). One pass over the sidebar: the first .accordion-title / h3 /
+# h4 / .accordion-content / calcite-tree under every element is indexed
+# bottom-up once instead of a querySelector per child per level, and rows are
+# appended instead of concatenating item lists.
+TREE_PARSER_JS = """() => {
+    const COLLAPSED = 1;
+    const FIRST = [['title', el => el.classList.contains('accordion-title')], ['h3', el => el.tagName === 'H3'],
+                   ['h4', el => el.tagName === 'H4'], ['content', el => el.classList.contains('accordion-content')],
+                   ['tree', el => el.tagName === 'CALCITE-TREE']];
+    let first = new Map();
+    function index(el) {
+        let found = {};
+        for (let child of el.children) {
+            let sub = index(child);
+            for (let [key, test] of FIRST) {
+                if (found[key]) continue;
+                if (test(child)) found[key] = child;
+                else if (sub[key]) found[key] = sub[key];
+            }
+        }
+        first.set(el, found);
+        return found;
+    }
+
+    let rows = [];
+    let kept = []; // per row: direct children that survive the section title filter
+    function counts(parent, title) {
+        return parent >= 0 && !(rows[parent][1] === 'section' && rows[parent][2] === title);
+    }
+    function push(parent, kind, title, url, flags) {
+        rows.push([parent, kind, title, url || '', flags || 0]);
+        kept.push(0);
+        if (counts(parent, title)) kept[parent]++;
+        return rows.length - 1;
+    }
+    function truncate(mark) {
+        // Undo a tentative group and everything emitted under it
+        if (counts(rows[mark][0], rows[mark][2])) kept[rows[mark][0]]--;
+        rows.length = mark;
+        kept.length = mark;
+    }
+    function linkFlags(a) {
+        return (a.hasAttribute('data-collapsed') || a.classList.contains('icon-ui-right')) ? COLLAPSED : 0;
+    }
+    function text(el) {
+        return el.innerText.trim() || el.textContent.trim();
+    }
+
+    function walk(node, parent) {
+        for (let child of node.children) {
+            // SKIP Headers
+            if (child.classList.contains('accordion-title') || ['H3','H4'].includes(child.tagName)) continue;
+
+            // CASE 1: GROUP (Accordion/Header Container or Calcite Group)
+            let found = first.get(child);
+            let headerEl = found.title || found.h3 || found.h4;
+            let isSection = child.classList.contains('accordion-section');
+            let isCalciteGroup = child.tagName === 'CALCITE-TREE-ITEM' && child.hasAttribute('has-children');
+            if (isSection || headerEl || isCalciteGroup) {
+                let groupTitle = "";
+                let landing = null;
+                if (isCalciteGroup) {
+                    // Direct text of the Calcite Tree group
+                    for (let node of child.childNodes) {
+                        if (node.nodeType === Node.TEXT_NODE) groupTitle += node.textContent;
+                    }
+                    groupTitle = groupTitle.trim();
+                    if (!groupTitle) {
+                        // Titled by its own link: a folder with a landing page
+                        landing = child.querySelector(':scope > a');
+                        if (landing) groupTitle = text(landing);
+                    }
+                } else {
+                    groupTitle = text(headerEl || child);
+                }
+                let gid = landing ? push(parent, 'group', groupTitle, landing.href) : push(parent, 'section', groupTitle);
+                walk(found.content || found.tree || child, gid);
+                if (kept[gid] > 0 || isSection || isCalciteGroup) continue;
+                truncate(gid);
+            }
+
+            // CASE 2: LI WRAPPER OR CALCITE LEAF
+            if (child.tagName === 'LI' || (child.tagName === 'CALCITE-TREE-ITEM' && !child.hasAttribute('has-children'))) {
+                let link = child.querySelector(':scope > a');
+                if (!link) {
+                    walk(child, parent);
+                    continue;
+                }
+                let gid = push(parent, 'group', text(link), link.href);
+                for (let c of child.children) {
+                    if (c !== link) walk(c, gid);
+                }
+                if (kept[gid] === 0) {
+                    // No children: a link, maybe with a collapsed hint
+                    rows[gid][1] = 'link';
+                    rows[gid][4] = linkFlags(link);
+                }
+                continue;
+            }
+
+            // CASE 3: FLATTEN WRAPPERS
+            if (['NAV','DIV','UL','CALCITE-TREE'].includes(child.tagName)) {
+                walk(child, parent);
+                continue;
+            }
+
+            // CASE 4: LOOSE LINK
+            if (child.tagName === 'A') {
+                push(parent, 'link', child.innerText.trim(), child.href, linkFlags(child));
+            }
+        }
+    }
+
+    let root = document.querySelector('aside.js-accordion') || document.querySelector('.shell-panel .toc calcite-tree') || document.querySelector('calcite-tree');
+    if (!root) return [];
+    index(root);
+    walk(root, -1);
+    return rows;
+}"""
+
+# SCRAPE ACTIVE CHILDREN (LAZY LOAD)
+# Children of the active link are found from the DOM alone: the links after it
+# in its section that sit deeper (aria-level, else the number of ul / ol /
+# role=group lists around them). Geometry (indentation) is only measured when
+# the structure can't tell, i.e. a flat list with no nested container.
+ACTIVE_CHILDREN_JS = """() => {
+    let items = [];
+    function linkItem(a) {
+        let isCollapsed = a.hasAttribute('data-collapsed') || a.classList.contains('icon-ui-right');
+        return { type: 'link', title: a.innerText.trim(), url: a.href, is_collapsed: isCollapsed };
+    }
+    
+    // 1. Try to find if active item is now a HEADER (Accordion Title)
+    // In some views, clicking a link promotes it to a section header.
+    let activeHeader = document.querySelector('.accordion-title.is-active, .accordion-section.is-active > .accordion-title');
+    if (activeHeader) {
+        let section = activeHeader.closest('.accordion-section');
+        let content = section.querySelector('.accordion-content');
+        if (content) {
+            content.querySelectorAll('a').forEach(a => items.push(linkItem(a)));
+            return items;
+        }
+    }
+
+    // 2. Standard Link: links nested under it
+    // FIX: Select the DEEPEST active link, not just the first one.
+    let allActive = document.querySelectorAll('aside.js-accordion a.is-active');
+    let activeLink = allActive[allActive.length - 1]; // Last one is deepest
+    
+    if (!activeLink) return [];
+
+    // Links after the active one, in document order, without leaving its section
+    let scope = activeLink.closest('.accordion-section') || activeLink.closest('aside.js-accordion');
+    let walker = document.createTreeWalker(scope, NodeFilter.SHOW_ELEMENT,
+        { acceptNode: n => n.tagName === 'A' ? NodeFilter.FILTER_ACCEPT : NodeFilter.FILTER_SKIP });
+
+    function depth(a) {
+        let holder = a.closest('[aria-level]');
+        if (holder && scope.contains(holder)) return Number(holder.getAttribute('aria-level'));
+        let n = 0;
+        for (let el = a.parentElement; el && el !== scope; el = el.parentElement) {
+            if (el.tagName === 'UL' || el.tagName === 'OL' || el.getAttribute('role') === 'group') n++;
+        }
+        return n;
+    }
+    function hidden(a) {
+        return !!a.closest('[hidden], [aria-hidden="true"], [style*="display: none"], [style*="display:none"]');
+    }
+
+    let activeDepth = depth(activeLink);
+    walker.currentNode = activeLink;
+    for (let link = walker.nextNode(); link; link = walker.nextNode()) {
+        if (hidden(link)) continue;
+        // Returned to same level or higher -> Stop
+        if (depth(link) <= activeDepth) break;
+        items.push(linkItem(link));
+    }
+
+    // Ambiguous structure: no list of its own next to the active link, so
+    // children can only be told apart by their indentation
+    let li = activeLink.closest('li');
+    let hasNestedList = li && scope.contains(li) && li.querySelector('ul, ol, [role="group"]');
+    if (items.length === 0 && !hasNestedList) {
+        let activeLeft = activeLink.getBoundingClientRect().left;
+        walker.currentNode = activeLink;
+        for (let link = walker.nextNode(); link; link = walker.nextNode()) {
+            // Skip if hidden
+            if (link.offsetParent === null) continue;
+            // HEURISTIC: Indentation > Active Link Indentation (+ margin)
+            if (link.getBoundingClientRect().left > activeLeft + 2) items.push(linkItem(link)); // At least 2px indented
+            else break;
+        }
+    }
+    
+    // 3. Fallback: Check for immediate sibling container (Link + Nav pattern)
+    // This catches the case where indentation might be subtle but DOM is structurally clear
+    if (items.length === 0) {
+         let siblingNav = activeLink.nextElementSibling;
+         if (siblingNav && ['NAV','UL','DIV'].includes(siblingNav.tagName)) {
+             siblingNav.querySelectorAll('a').forEach(a => items.push(linkItem(a)));
+         }
+    }
+    
+    return items;
+}"""
+
+# INJECT HEADER (Breadcrumbs + Title)
+HEADER_INJECT_JS = """(title) => {
+    let content = document.querySelector('main') || document.querySelector('.column-17') || document.body;
+    
+    // 1. Prepare Content Elements
+    let targetH1 = document.querySelector('header.trailer-1 h1') || document.querySelector('h1');
+    let breadcrumbs = document.querySelector('nav.breadcrumbs');
+
+    // 2. Insert TITLE (Prepend first, so it ends up below breadcrumbs)
+    if (targetH1) {
+        // Clone and clean up style
+        let newH1 = targetH1.cloneNode(true);
+        newH1.style.cssText = 'display: block !important; font-size: 24pt !important; font-weight: bold !important; margin-bottom: 20px !important; color: #000 !important; page-break-after: avoid !important; visibility: visible !important; opacity: 1 !important;';
+        content.prepend(newH1);
+    } else {
+        // Fallback Title
+        let h1 = document.createElement('h1');
+        h1.innerText = title;
+        h1.style.cssText = 'display: block !important; font-size: 24pt !important; font-weight: bold !important; margin-bottom: 20px !important; color: #000 !important; page-break-after: avoid !important;';
+        content.prepend(h1);
+    }
+
+    // 3. Insert BREADCRUMBS (Prepend last, so it stays at very top)
+    if (breadcrumbs) {
+        let newBC = breadcrumbs.cloneNode(true);
+        newBC.classList.add('injected-breadcrumb');
+        newBC.style.cssText = 'display: block !important; font-size: 10pt !important; color: #666 !important; margin-bottom: 10px !important; visibility: visible !important; opacity: 1 !important;';
+        content.prepend(newBC);
+    }
+}"""
+
 def clean_filename(name):
     name = unquote(name)
     name = re.sub(r'[\\/*?:"<>|]', "", name)
     name = name.replace(" ", "_").strip()
     return name[:80]
 
-def merge_pdfs(root_dir, output_file):
-    entries = []
-    for root, dirs, files in os.walk(root_dir):
-        for f in files:
-            if f.endswith(".pdf"):
-                entries.append(os.path.join(root, f))
-    entries.sort()
-    
-    if not entries: return
-    print(f"\n📦 Merging {len(entries)} pages into {output_file}...")
-    
-    merger = PdfWriter()
-    for p in entries:
-        try: merger.append(p)
-        except: pass
-        
-    with open(output_file, "wb") as f_out:
-        merger.write(f_out)
-    print(f"✅ Created Combined PDF: {output_file}")
-
-def run():
-    if os.path.exists(OUTPUT_DIR):
-        import shutil
+class CrawlState:
+    """Everything the planner knows about the output: pages, dedup and hierarchy."""
+
+    def __init__(self, log_path=None):
+        self.visited = set()
+        self.expected_pdfs = {} # path -> url
+        self.jobs = [] # flat render work list, in merge order
+        self.folders = []
+        self.titles = {} # folder path -> sidebar title (merged PDF bookmarks)
+        self.hierarchy = [] # (level, line, path) in crawl order
+        self.log_path = log_path # also appended live when set
+
+    def log(self, level, line, path=None):
+        self.hierarchy.append((level, line, path))
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(f"{'  '*level}{line}\n")
+
+    def add_job(self, path, url, title):
+        self.expected_pdfs[path] = url
+        self.jobs.append({"path": path, "url": url, "title": title})
+
+    def add_folder(self, path, title):
+        self.folders.append(path)
+        self.titles[path] = title
+
+def prepare_output():
+    # Incremental runs move the last output aside instead of deleting it (PDFs are reused from there)
+    previous = None
+    if INCREMENTAL:
+        previous = CrawlManifest.stash_output(OUTPUT_DIR)
+    elif os.path.exists(OUTPUT_DIR):
         try: shutil.rmtree(OUTPUT_DIR)
         except: pass
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
+
     # Init Hierarchy Log
-    with open("full_hierarchy.txt", "w", encoding="utf-8") as f:
+    with open(HIERARCHY_LOG, "w", encoding="utf-8") as f:
         f.write("🌳 Full Detected Hierarchy\n==========================\n")
+    return previous
+
+def incremental_jobs(state, previous):
+    """Incremental mode: copy unchanged PDFs from the previous output, return (manifest, jobs left to print)."""
+    if not INCREMENTAL:
+        return None, state.jobs
+    manifest = CrawlManifest(MANIFEST)
+    return manifest, manifest.reuse_unchanged(state.jobs, OUTPUT_DIR, previous, (CSS_INJECT, PDF_OPTIONS))
+
+def merge_output(state):
+    # Work-list order and sidebar titles give the merged PDF its bookmark tree
+    with METRICS.record("merge", path=MERGED_FILENAME) as timing:
+        with timing.stage("merge"):
+            merge_pdfs(OUTPUT_DIR, MERGED_FILENAME, MERGE_REPORT, entries=[(job['path'], job['title']) for job in state.jobs],
+                       titles=state.titles, workers=MERGE_WORKERS, optimize=OPTIMIZE_PDF)
+    METRICS.report()
+
+def start_run(from_tree=False, resume=False, page=None):
+    """Output folder + work list for a render run: (state, jobs left to print, manifest, previous output)."""
+    if resume and STORE.has_plan():
+        state = STORE.load_plan(CrawlState())
+        for folder in state.folders:
+            os.makedirs(folder, exist_ok=True)
+        jobs = STORE.incomplete(state)
+        print(f"⏯️ Resuming from {CRAWL_DB}: {len(state.jobs) - len(jobs)} of {len(state.jobs)} pages already printed, {len(jobs)} to go")
+        if SEARCH_INDEX: SEARCH_INDEX.set_plan(OUTPUT_DIR, state.titles)
+        return state, jobs, None, None
+    if resume:
+        print(f"⚠️ No saved plan in {CRAWL_DB}, starting a fresh run")
+
+    previous = prepare_output()
+    METRICS.reset()
+    state = build_work_list(from_tree, page)
+    STORE.save_plan(state)
+    manifest, jobs = incremental_jobs(state, previous)
+    left = {job['path'] for job in jobs}
+    STORE.mark_many([job['path'] for job in state.jobs if job['path'] not in left], "done")
+    if SEARCH_INDEX: SEARCH_INDEX.set_plan(OUTPUT_DIR, state.titles)
+    return state, jobs, manifest, previous
+
+def save_tree(tree):
+    # Save Debug JSON
+    with open(DEBUG_JSON, "w", encoding="utf-8") as f:
+        json.dump(tree, f, indent=2)
+
+    # ------------------------------------------------------------------
+    # PRINT STRUCTURE PREVIEW
+    # ------------------------------------------------------------------
+    print("\n🌳 Detected Hierarchy (Preview):")
+
+    def print_preview(items, indent=0):
+        idx = 1
+        for item in items:
+            prefix = f"{idx:03d}" if indent > 0 else "---"
+            if item['type'] == 'group':
+                print(f"{'  '*indent}📂 [{prefix}] {item['title']}")
+                print_preview(item['children'], indent + 1)
+            else:
+                print(f"{'  '*indent}📄 [{prefix}] {item['title']}")
+            idx += 1
+
+    print_preview(tree)
+
+def find_missing(expected_pdfs):
+    missing = []
+    for path, url in expected_pdfs.items():
+        if not os.path.exists(path) or os.path.getsize(path) < 1000: # <1KB is suspicious
+            missing.append((path, url))
+    return missing
+
+def title_from_path(path):
+    # Determine title from path or fallback
+    fname = os.path.basename(path).replace(".pdf", "")
+    return " ".join(fname.split("_")[1:])
+
+def open_page(browser):
+    page = browser.new_page()
+    ARCHIVE.attach(page) # before the policy: the policy's handler runs first
+    if RESOURCE_POLICY: RESOURCE_POLICY.attach(page)
+    return page
+
+def setup_context(ctx):
+    # Render contexts get the same route handlers, in the same order, as open_page
+    ARCHIVE.attach(ctx)
+    if RESOURCE_POLICY: RESOURCE_POLICY.attach(ctx)
+
+async def setup_context_async(ctx):
+    await ARCHIVE.attach_async(ctx)
+    if RESOURCE_POLICY: await RESOURCE_POLICY.attach_async(ctx)
+
+def format_eta(started, done, total):
+    if not done: return "ETA --:--"
+    remaining = (time.time() - started) / done * (total - done)
+    return f"ETA {int(remaining // 60)}m{int(remaining % 60):02d}s"
+
+# ------------------------------------------------------------------
+# PHASE 1: DISCOVERY (no print CSS, no PDF)
+# ------------------------------------------------------------------
+class BrowserSidebar:
+    """Discovery source driving a Chromium page (static_sidebar.StaticSidebar is the HTTP one)."""
+
+    def __init__(self, page):
+        self.page = page
+        self.last_wait = "ready" # outcome of the last lazy_children() readiness wait
+
+    def tree(self, url):
+        with METRICS.record("discover", url) as timing:
+            try:
+                with timing.stage("navigate"): SIDEBAR_WAIT.goto(self.page, url)
+            except:
+                print("⚠️ Timeout loading page, proceeding with DOM parse anyway...")
+            with timing.stage("scrape"): return tree_from_rows(self.page.evaluate(TREE_PARSER_JS))
+
+    def lazy_children(self, url):
+        with METRICS.record("discover", url) as timing:
+            with timing.stage("navigate"): self.last_wait = SIDEBAR_WAIT.goto(self.page, url)
+            with timing.stage("scrape"): return self.page.evaluate(ACTIVE_CHILDREN_JS)
+
+def lazy_folder_children(sidebar, item, siblings):
+    if DISCOVERY_CACHE is None:
+        return sidebar.lazy_children(item['url'])
+    # A scrape after a readiness-wait fallback may have run before the sidebar was built: don't keep it
+    return DISCOVERY_CACHE.children(item['url'], siblings, sidebar.lazy_children, trusted=lambda: sidebar.last_wait != "fallback")
+
+def discover_items(sidebar, items, visited):
+    # Same walk order and `visited` rule as the crawl: a lazy folder is only
+    # opened the first time its landing URL shows up.
+    for item in items:
+        is_lazy_folder = (item['type'] == 'link') and item.get('is_collapsed', False)
+
+        if item['type'] == 'group' or is_lazy_folder:
+            if is_lazy_folder and 'url' in item and item['url'].split('#')[0] not in visited:
+                visited.add(item['url'].split('#')[0])
+                print(f"  🔍 Discovering: {item['title']}")
+                try:
+                    lazy_children = lazy_folder_children(sidebar, item, items)
+                    if lazy_children:
+                        print(f"  ✅ Found {len(lazy_children)} lazy children!")
+                        item['children'] = lazy_children
+                except Exception as e:
+                    print(f"  ❌ Error: {e}")
+
+            if 'children' in item:
+                discover_items(sidebar, item['children'], visited)
+
+        elif item['type'] == 'link':
+            visited.add(item['url'].split('#')[0])
+
+def discover_structure(sidebar):
+    print(f"🚀 Analyzing Site Structure from: {START_URL}")
+    tree = sidebar.tree(START_URL)
+    save_tree(tree)
+
+    print("\n🔭 Resolving lazy folders...")
+    discover_items(sidebar, tree, set())
+    if DISCOVERY_CACHE:
+        DISCOVERY_CACHE.save()
+        DISCOVERY_CACHE.report()
+    with open(RESOLVED_TREE, "w", encoding="utf-8") as f:
+        json.dump(tree, f, indent=2)
+    print(f"💾 Resolved tree saved to {RESOLVED_TREE}")
+    return tree
+
+def discover(page=None):
+    if DISCOVERY_ENGINE == "static":
+        sidebar = StaticSidebar("site")
+        tree = discover_structure(sidebar)
+        print(f"   HTTP: {sidebar.pool.stats['requests']} requests over {sidebar.pool.stats['connections']} connections")
+        return tree
+    if page is not None: # borrowed from a caller that already runs a browser (batch_printer)
+        return discover_structure(BrowserSidebar(page))
 
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        
-        print(f"🚀 Analyzing Site Structure from: {START_URL}")
+        page = open_page(browser)
+        tree = discover_structure(BrowserSidebar(page))
+        browser.close()
+    return tree
+
+# ------------------------------------------------------------------
+# PHASE 2: PLAN (resolved tree -> numbered work list)
+# ------------------------------------------------------------------
+def plan_items(items, parent_path, level, state):
+    # Every item (group, lazy folder, link, even a skipped duplicate) burns one index
+    for idx, item in enumerate(items, 1):
+        safe_title = clean_filename(item['title'])
+
+        # Check for LAZY DEEPENING condition
+        is_lazy_folder = (item['type'] == 'link') and item.get('is_collapsed', False)
+
+        if item['type'] == 'group' or is_lazy_folder:
+            # Unified Indexing for ALL levels (User Request)
+            folder_name = f"{idx:03d}_{safe_title}"
+
+            new_path = os.path.join(parent_path, folder_name)
+            state.add_folder(new_path, item['title'])
+
+            # LOG HIERARCHY
+            state.log(level, f"📂 {folder_name}")
+
+            # For Lazy Folders, index page
+            if is_lazy_folder and 'url' in item:
+                state.visited.add(item['url'].split('#')[0])
+                state.add_job(os.path.join(new_path, "000_Introduction.pdf"), item['url'], item['title'])
+
+            if 'children' in item:
+                plan_items(item['children'], new_path, level + 1, state)
+
+        elif item['type'] == 'link':
+            if item['url'].split('#')[0] in state.visited:
+                continue
+            state.visited.add(item['url'].split('#')[0])
+
+            pdf_name = f"{idx:03d}_{safe_title}.pdf"
+            pdf_path = os.path.join(parent_path, pdf_name)
+
+            # LOG HIERARCHY
+            state.log(level, f"📄 {pdf_name}", pdf_path)
+            state.add_job(pdf_path, item['url'], item['title'])
+
+def load_tree(from_tree=False, page=None):
+    if from_tree:
+        print(f"📂 Loading resolved tree from {RESOLVED_TREE}")
+        with open(RESOLVED_TREE, encoding="utf-8") as f:
+            return json.load(f)
+    return discover(page)
+
+def build_work_list(from_tree=False, page=None):
+    tree = load_tree(from_tree, page)
+    state = CrawlState(HIERARCHY_LOG)
+    plan_items(tree, OUTPUT_DIR, 0, state)
+    for folder in state.folders:
+        os.makedirs(folder, exist_ok=True)
+    print(f"\n📋 Work list: {len(state.jobs)} pages")
+    print("\n⚡ Starting Render...")
+    return state
+
+# ------------------------------------------------------------------
+# PHASE 3: RENDER (serial, single page)
+# ------------------------------------------------------------------
+def print_page(pg, url, path, title):
+    with METRICS.record("render", url, path) as timing:
+        with timing.stage("navigate"): WAIT_POLICY.goto(pg, url)
+        with timing.stage("details"): pg.evaluate("document.querySelectorAll('details').forEach(e => e.open = true)")
+        with timing.stage("header"): pg.evaluate(HEADER_INJECT_JS, title)
+        with timing.stage("css"): pg.add_style_tag(content=CSS_INJECT)
+        if SEARCH_INDEX:
+            with timing.stage("index"): SEARCH_INDEX.capture(pg, url, path, title)
+        with timing.stage("pdf"): pg.pdf(path=path, **PDF_OPTIONS)
+
+def capture_page(pg, url, path, title):
+    # print_page without the print job: the prepared content, for a section document
+    with METRICS.record("render", url, path) as timing:
+        with timing.stage("navigate"): WAIT_POLICY.goto(pg, url)
+        with timing.stage("details"): pg.evaluate("document.querySelectorAll('details').forEach(e => e.open = true)")
+        with timing.stage("header"): pg.evaluate(HEADER_INJECT_JS, title)
+        with timing.stage("css"): pg.add_style_tag(content=CSS_INJECT)
+        if SEARCH_INDEX:
+            with timing.stage("index"): SEARCH_INDEX.capture(pg, url, path, title)
+        with timing.stage("capture"): return pg.evaluate(CAPTURE_JS, CONTENT_SELECTORS)
+
+def print_section(pg, batch, parts):
+    """One page.pdf for a batch of captured pages (pg holds the last one), cut into their PDFs; False when it can't be cut."""
+    folder = os.path.dirname(batch[0]['path'])
+    section_pdf = os.path.join(folder, SECTION_FILE)
+    with METRICS.record("section", batch[0]['url'], folder, pages=len(batch)) as timing:
+        with timing.stage("assemble"): pg.evaluate(ASSEMBLE_JS, [CONTENT_SELECTORS, parts])
+        with timing.stage("css"): pg.add_style_tag(content=CSS_INJECT) # in case the last capture failed before its CSS
+        with timing.stage("pdf"): pg.pdf(path=section_pdf, **PDF_OPTIONS)
         try:
-            page.goto(START_URL, wait_until="networkidle", timeout=60000)
-        except:
-            print("⚠️ Timeout loading page, proceeding with DOM parse anyway...")
-        
-        # ------------------------------------------------------------------
-        # HYBRID TREE PARSER
-        # ------------------------------------------------------------------
-        tree = page.evaluate("""() => {
-            function parseNode(node, level) {
-                let items = [];
-                let children = Array.from(node.children);
-                
-                for (let i = 0; i < children.length; i++) {
-                    let child = children[i];
-                    
-                    // SKIP Headers
-                    if (child.classList.contains('accordion-title') || ['H3','H4'].includes(child.tagName)) continue;
-
-                    // CASE 1: GROUP (Accordion/Header Container or Calcite Group)
-                    let headerEl = child.querySelector('.accordion-title') || child.querySelector('h3') || child.querySelector('h4');
-                    let isCalciteGroup = child.tagName === 'CALCITE-TREE-ITEM' && child.hasAttribute('has-children');
-                    let isGroup = child.classList.contains('accordion-section') || headerEl || isCalciteGroup;
-                    
-                    if (isGroup) {
-                        let groupTitle = "";
-                        if (isCalciteGroup) {
-                            // Extract direct text for Calcite Tree group
-                            let textContent = "";
-                            for (let node of child.childNodes) {
-                                if (node.nodeType === Node.TEXT_NODE) textContent += node.textContent;
-                            }
-                            groupTitle = textContent.trim();
-                            if (!groupTitle) {
-                                let link = child.querySelector(':scope > a');
-                                if (link) groupTitle = link.innerText.trim() || link.textContent.trim();
-                            }
-                        } else {
-                            let titleEl = headerEl || child;
-                            groupTitle = titleEl.innerText.trim() || titleEl.textContent.trim();
-                        }
-                        
-                        let contentEl = child.querySelector('.accordion-content') || child.querySelector('calcite-tree');
-                        let container = contentEl ? contentEl : child;
-                        
-                        let subItems = parseNode(container, level + 1);
-                        subItems = subItems.filter(i => i.title !== groupTitle);
-                        
-                        if (subItems.length > 0 || child.classList.contains('accordion-section') || isCalciteGroup) {
-                             items.push({ type: 'group', title: groupTitle, children: subItems });
-                             continue;
-                        }
-                    }
-                    
-                    // CASE 2: LI WRAPPER OR CALCITE LEAF
-                    if (child.tagName === 'LI' || (child.tagName === 'CALCITE-TREE-ITEM' && !child.hasAttribute('has-children'))) {
-                        let link = child.querySelector(':scope > a');
-                        if (!link) {
-                            items = items.concat(parseNode(child, level)); 
-                            continue;
-                        }
-                        let title = link.innerText.trim() || link.textContent.trim();
-                        let url = link.href;
-                        let subContainer = Array.from(child.children).filter(c => c !== link);
-                        let subItems = [];
-                        subContainer.forEach(c => subItems = subItems.concat(parseNode(c, level + 1)));
-                        
-                        if (subItems.length > 0) {
-                            items.push({ type: 'group', title: title, url: url, children: subItems });
-                        } else {
-                            // Check for Collapsed Hint
-                            let isCollapsed = link.hasAttribute('data-collapsed') || link.classList.contains('icon-ui-right');
-                            items.push({ type: 'link', title: title, url: url, is_collapsed: isCollapsed });
-                        }
-                        continue;
-                    }
+            with timing.stage("split"): return split_section(section_pdf, [job['path'] for job in batch])
+        finally:
+            os.remove(section_pdf)
 
-                    // CASE 3: FLATTEN WRAPPERS
-                    if (['NAV','DIV','UL','CALCITE-TREE'].includes(child.tagName)) {
-                        items = items.concat(parseNode(child, level));
-                        continue;
-                    }
-                    
-                    // CASE 4: LOOSE LINK
-                    if (child.tagName === 'A') {
-                         let isCollapsed = child.hasAttribute('data-collapsed') || child.classList.contains('icon-ui-right');
-                         items.push({ type: 'link', title: child.innerText.trim(), url: child.href, is_collapsed: isCollapsed });
-                    }
-                }
-                return items;
-            }
-            
-            let root = document.querySelector('aside.js-accordion') || document.querySelector('.shell-panel .toc calcite-tree') || document.querySelector('calcite-tree');
-            if (!root) return [];
-            return parseNode(root, 0);
-        }""")
-        
-        # Save Debug JSON
-        with open("sidebar_debug.json", "w", encoding="utf-8") as f:
-            json.dump(tree, f, indent=2)
-        
-        # ------------------------------------------------------------------
-        # HELPER: SCRAPE ACTIVE CHILDREN (LAZY LOAD)
-        # ------------------------------------------------------------------
-
-        def get_active_children(pg):
-            return pg.evaluate("""() => {
-                let items = [];
-                
-                // 1. Try to find if active item is now a HEADER (Accordion Title)
-                // In some views, clicking a link promotes it to a section header.
-                let activeHeader = document.querySelector('.accordion-title.is-active, .accordion-section.is-active > .accordion-title');
-                if (activeHeader) {
-                    let section = activeHeader.closest('.accordion-section');
-                    let content = section.querySelector('.accordion-content');
-                    if (content) {
-                        content.querySelectorAll('a').forEach(a => {
-                             let isCollapsed = a.hasAttribute('data-collapsed') || a.classList.contains('icon-ui-right');
-                             items.push({ type: 'link', title: a.innerText.trim(), url: a.href, is_collapsed: isCollapsed });
-                        });
-                        return items;
-                    }
-                }
+def render_pages(pages, jobs):
+    started = time.time()
+    for n, job in enumerate(jobs, 1):
+        print(f"  ⚡ [{n}/{len(jobs)}] '{job['title']}' -> {os.path.relpath(job['path'], OUTPUT_DIR)}  ({format_eta(started, n - 1, len(jobs))})")
+        try:
+            print_page(pages.page, job['url'], job['path'], job['title'])
+            STORE.mark(job['path'], "done")
+        except Exception as e:
+             STORE.mark(job['path'], "failed", e)
+             print(f"  ❌ Error: {e}")
+        finally:
+            pages.done()
+
+def render_sections(pages, jobs):
+    started = time.time()
+    done = 0
+    for batch in section_batches(jobs, SECTION_BATCH_PAGES):
+        folder = os.path.relpath(os.path.dirname(batch[0]['path']), OUTPUT_DIR)
+        print(f"  📚 [{done + 1}-{done + len(batch)}/{len(jobs)}] {folder}: {len(batch)} pages, one print job  ({format_eta(started, done, len(jobs))})")
+        captured, parts = [], []
+        for job in batch:
+            try:
+                parts.append(capture_page(pages.page, job['url'], job['path'], job['title']))
+                captured.append(job)
+            except Exception as e:
+                STORE.mark(job['path'], "failed", e)
+                print(f"  ❌ Error ({job['title']}): {e}")
+        done += len(batch)
+        if not captured:
+            continue
+
+        printed = False
+        try:
+            printed = print_section(pages.page, captured, parts)
+            if not printed: print("  ⚠️ No section anchors in the PDF, printing these pages one by one")
+        except Exception as e:
+            print(f"  ⚠️ Section print failed ({e}), printing these pages one by one")
+        finally:
+            pages.done()
+        if printed:
+            STORE.mark_many([job['path'] for job in captured], "done")
+        else:
+            render_pages(pages, captured)
+
+def render_jobs(pages, jobs):
+    if SECTION_BATCH:
+        render_sections(pages, jobs)
+    else:
+        render_pages(pages, jobs)
+
+def print_light(jobs):
+    """Print what LIGHT_RENDER can without Chromium; returns the jobs left for the browser."""
+    if not LIGHT_RENDER or not jobs or ARCHIVE.mode is not None:
+        return jobs
+    printed, left = render_light_jobs(jobs, "site", LIGHT_RENDER, PDF_OPTIONS, LIGHT_RENDER_WORKERS,
+                                      search_index=SEARCH_INDEX, metrics=METRICS)
+    STORE.mark_many([job['path'] for job in printed], "done")
+    return left
+
+def retry_missing(pages, expected_pdfs):
+    # ------------------------------------------------------------------
+    # VERIFICATION & RETRY
+    # ------------------------------------------------------------------
+    print("\n🕵️ Starting Integrity Check...")
+    missing = find_missing(expected_pdfs)
+
+    if missing:
+        print(f"⚠️ Found {len(missing)} missing or corrupted files. Retrying...")
+        for path, url in missing:
+            print(f"  🔄 Retrying: {os.path.basename(path)}")
+            try:
+                print_page(pages.page, url, path, title_from_path(path))
+                STORE.mark(path, "done")
+                print("     ✅ Recovered!")
+            except Exception as e:
+                STORE.mark(path, "failed", e)
+                print(f"     ❌ Retry Failed: {e}")
+            finally:
+                pages.done()
+    else:
+        print("✅ Integrity Check Passed: All files present.")
+
+def run(from_tree=False, resume=False):
+    state, jobs, manifest, previous = start_run(from_tree, resume)
+    jobs = print_light(jobs)
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        pages = PageRecycler(browser, setup_context, RECYCLE_PAGES, RECYCLE_HEAP_MB)
+        render_jobs(pages, jobs)
+        retry_missing(pages, state.expected_pdfs)
+        pages.close()
+        browser.close()
+
+    if manifest: manifest.commit(OUTPUT_DIR, previous)
+
+    WAIT_POLICY.report()
+    if RESOURCE_POLICY: RESOURCE_POLICY.report()
+    ARCHIVE.report()
+    pages.report()
+    if SEARCH_INDEX:
+        SEARCH_INDEX.finish(state.expected_pdfs.values())
+        SEARCH_INDEX.report()
+    merge_output(state)
+
+def discover_only():
+    tree = discover()
+    state = CrawlState()
+    plan_items(tree, OUTPUT_DIR, 0, state)
+    print(f"\n📋 {len(state.jobs)} pages to render. Run with --render-only to print them.")
+
+def markdown_only(from_tree=False):
+    # Same plan as a render run, rooted at MARKDOWN_DIR, exported instead of printed
+    tree = load_tree(from_tree)
+    state = CrawlState()
+    plan_items(tree, MARKDOWN_DIR, 0, state)
+    if os.path.exists(MARKDOWN_DIR):
+        shutil.rmtree(MARKDOWN_DIR, ignore_errors=True)
+    os.makedirs(MARKDOWN_DIR, exist_ok=True)
+    export_markdown(state.jobs, state.titles, MARKDOWN_DIR, CHUNKS_JSONL, variant="site", workers=MARKDOWN_WORKERS,
+                    archive=ARCHIVE_DIR if ARCHIVE.mode == "replay" else None)
+
+# ------------------------------------------------------------------
+# PHASE 3: RENDER (async page pool)
+# ------------------------------------------------------------------
+# The work list is already numbered and deduplicated, so pages can be
+# rendered in any order without changing indices, folders or merge order.
+
+async def navigate_async(pg, url, timing, lease):
+    with timing.stage("navigate"):
+        if lease is None: return await WAIT_POLICY.goto_async(pg, url)
+        async with lease: return await WAIT_POLICY.goto_async(pg, url)
+
+async def prepare_and_print_async(pg, url, path, title, timing, lease):
+    await navigate_async(pg, url, timing, lease)
+    with timing.stage("details"): await pg.evaluate("document.querySelectorAll('details').forEach(e => e.open = true)")
+    with timing.stage("header"): await pg.evaluate(HEADER_INJECT_JS, title)
+    with timing.stage("css"): await pg.add_style_tag(content=CSS_INJECT)
+    if SEARCH_INDEX:
+        with timing.stage("index"): await SEARCH_INDEX.capture_async(pg, url, path, title)
+    with timing.stage("pdf"): await pg.pdf(path=path, **PDF_OPTIONS)
+
+async def print_page_async(pg, url, path, title):
+    with METRICS.record("render", url, path) as timing:
+        lease = None
+        if LIMITER:
+            with timing.stage("throttle"): lease = await LIMITER.acquire(url)
+        # The watchdog only starts once the host gave a slot: queueing behind the limiter is not being stuck
+        try:
+            await asyncio.wait_for(prepare_and_print_async(pg, url, path, title, timing, lease), PAGE_DEADLINE)
+        except asyncio.TimeoutError:
+            try: await asyncio.wait_for(pg.close(), 10) # the pool replaces a closed page's context
+            except Exception: pass
+            raise TimeoutError(f"watchdog: no PDF after {PAGE_DEADLINE}s")
+        finally:
+            if lease: await lease.release() # no-op once the navigation released it
+
+async def render_jobs_async(pool, jobs):
+    # Fixed workers on a live queue: a failed page is put back after its backoff
+    # while the others keep printing, instead of waiting for the integrity check.
+    started = time.time()
+    done = 0
+    left = len(jobs)
+    queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+    for job in jobs:
+        queue.put_nowait((job, 0))
+
+    def finished():
+        nonlocal left
+        left -= 1
+        if left == 0:
+            for _ in range(CONCURRENCY):
+                queue.put_nowait(None)
+
+    async def worker():
+        nonlocal done
+        while (item := await queue.get()) is not None:
+            job, attempt = item
+            name = os.path.relpath(job['path'], OUTPUT_DIR)
+            try:
+                async with pool.page() as pg:
+                    await print_page_async(pg, job['url'], job['path'], job['title'])
+                STORE.mark(job['path'], "done")
+                done += 1
+                print(f"  ✅ [{done}/{len(jobs)}] {name}  ({format_eta(started, done, len(jobs))})")
+            except Exception as e:
+                if attempt + 1 < PAGE_ATTEMPTS:
+                    delay = getattr(e, "retry_after", None) or backoff(attempt)
+                    print(f"  🔁 {name}: {e}; retry {attempt + 2}/{PAGE_ATTEMPTS} in {delay:.0f}s")
+                    loop.call_later(delay, queue.put_nowait, (job, attempt + 1))
+                    continue
+                STORE.mark(job['path'], "failed", e)
+                done += 1
+                print(f"  ❌ Error ({name}): {e}")
+            finished()
+
+    if not jobs:
+        return
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+
+async def crawl_async(state, jobs):
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        pool = ContextPool(browser, CONCURRENCY, setup_context_async, RECYCLE_PAGES, RECYCLE_HEAP_MB)
+        await pool.open()
+        print(f"   Page pool: {CONCURRENCY} concurrent pages (fresh context every {RECYCLE_PAGES} pages or {RECYCLE_HEAP_MB} MB heap)")
+
+        await render_jobs_async(pool, jobs)
 
-                // 2. Standard Link: Check for Indented Siblings
-                // FIX: Select the DEEPEST active link, not just the first one.
-                let allActive = Array.from(document.querySelectorAll('aside.js-accordion a.is-active'));
-                let activeLink = allActive[allActive.length - 1]; // Last one is deepest
-                
-                if (!activeLink) return [];
-                
-                let activeRect = activeLink.getBoundingClientRect();
-                let activeLeft = activeRect.left;
-                
-                // Get all links in the sidebar
-                let allLinks = Array.from(document.querySelectorAll('aside.js-accordion a'));
-                let startIndex = allLinks.indexOf(activeLink);
-                
-                if (startIndex === -1) return [];
-                
-                // Scan forward
-                for (let i = startIndex + 1; i < allLinks.length; i++) {
-                    let link = allLinks[i];
-                    
-                    // Skip if hidden
-                    if (link.offsetParent === null) continue;
-                    
-                    let linkRect = link.getBoundingClientRect();
-                    
-                    // HEURISTIC: Indentation > Active Link Indentation (+ margin)
-                    // Or if it's in a strictly nested container (UL inside LI)
-                    
-                    let isNested = (linkRect.left > activeLeft + 2); // At least 2px indented
-                    let isSameGroup = (link.closest('.accordion-section') === activeLink.closest('.accordion-section'));
-                    
-                    // If we hit a new section, stop
-                    if (!isSameGroup) break;
-                    
-                    if (isNested) {
-                        let isCollapsed = link.hasAttribute('data-collapsed') || link.classList.contains('icon-ui-right');
-                        items.push({ type: 'link', title: link.innerText.trim(), url: link.href, is_collapsed: isCollapsed });
-                    } else {
-                        // Returned to same level or higher -> Stop
-                        break;
-                    }
-                }
-                
-                // 3. Fallback: Check for immediate sibling container (Link + Nav pattern)
-                // This catches the case where indentation might be subtle but DOM is structurally clear
-                if (items.length === 0) {
-                     let siblingNav = activeLink.nextElementSibling;
-                     if (siblingNav && ['NAV','UL','DIV'].includes(siblingNav.tagName)) {
-                         siblingNav.querySelectorAll('a').forEach(a => {
-                             let isCollapsed = a.hasAttribute('data-collapsed') || a.classList.contains('icon-ui-right');
-                             items.push({ type: 'link', title: a.innerText.trim(), url: a.href, is_collapsed: isCollapsed });
-                         });
-                     }
-                }
-                
-                return items;
-            }""")
-
-        # ------------------------------------------------------------------
-        # PRINT STRUCTURE PREVIEW
-        # ------------------------------------------------------------------
-        print("\n🌳 Detected Hierarchy (Preview):")
-        
-        def print_preview(items, indent=0):
-            idx = 1
-            for item in items:
-                prefix = f"{idx:03d}" if indent > 0 else "---" 
-                if item['type'] == 'group':
-                    print(f"{'  '*indent}📂 [{prefix}] {item['title']}")
-                    print_preview(item['children'], indent + 1)
-                else:
-                    print(f"{'  '*indent}📄 [{prefix}] {item['title']}")
-                idx += 1
-                
-        print_preview(tree)
-        print("\n⚡ Starting Hybrid Crawl...")
-
-        # ------------------------------------------------------------------
-        # CRAWLER
-        # ------------------------------------------------------------------
-        visited = set()
-
-        # ------------------------------------------------------------------
-        # INTEGRITY TRACKER
-        # ------------------------------------------------------------------
-        expected_pdfs = {} # path -> url
-        
-        def process_items(items, parent_path, level):
-            idx = 1
-            for item in items:
-                safe_title = clean_filename(item['title'])
-                
-                # Check for LAZY DEEPENING condition
-                is_lazy_folder = (item['type'] == 'link') and item.get('is_collapsed', False)
-                
-                if item['type'] == 'group' or is_lazy_folder:
-                    # Unified Indexing for ALL levels (User Request)
-                    folder_name = f"{idx:03d}_{safe_title}"
-                    idx += 1 
-                    
-                    new_path = os.path.join(parent_path, folder_name)
-                    os.makedirs(new_path, exist_ok=True)
-                    print(f"\n📂 Entering: {folder_name}")
-                    
-                    # LOG HIERARCHY
-                    with open("full_hierarchy.txt", "a", encoding="utf-8") as f:
-                        f.write(f"{'  '*level}📂 {folder_name}\n")
-                    
-                    # For Lazy Folders, index page
-                    if is_lazy_folder and 'url' in item:
-                        landing_url = item['url']
-                        pdf_name = f"000_Introduction.pdf"
-                        pdf_path = os.path.join(new_path, pdf_name)
-                        expected_pdfs[pdf_path] = landing_url
-                        
-                        if landing_url.split('#')[0] not in visited:
-                             visited.add(landing_url.split('#')[0])
-                             print(f"  ⚡ Printing Index: {pdf_name}")
-                             try:
-                                print_page(page, landing_url, pdf_path, item['title'])
-                                
-                                # SCRAPE CHILDREN NOW
-                                print(f"  🔍 Checking for hidden children...")
-                                lazy_children = get_active_children(page)
-                                if lazy_children:
-                                    print(f"  ✅ Found {len(lazy_children)} lazy children!")
-                                    process_items(lazy_children, new_path, level + 1)
-                                    
-                             except Exception as e:
-                                print(f"  ❌ Error: {e}")
-                    
-                    if 'children' in item:
-                        process_items(item['children'], new_path, level + 1)
-                    
-                elif item['type'] == 'link':
-                    if item['url'].split('#')[0] in visited:
-                        idx += 1
-                        continue
-                    visited.add(item['url'].split('#')[0])
-                    
-                    pdf_name = f"{idx:03d}_{safe_title}.pdf"
-                    idx += 1
-                    pdf_path = os.path.join(parent_path, pdf_name)
-                    expected_pdfs[pdf_path] = item['url']
-                    
-                    # LOG HIERARCHY
-                    with open("full_hierarchy.txt", "a", encoding="utf-8") as f:
-                        f.write(f"{'  '*level}📄 {pdf_name}\n")
-                    
-                    print(f"  ⚡ Printing: '{item['title']}' -> {pdf_name}")
-                    try:
-                        print_page(page, item['url'], pdf_path, item['title'])
-                    except Exception as e:
-                         print(f"  ❌ Error: {e}")
-
-        def print_page(pg, url, path, title):
-             pg.goto(url, wait_until="networkidle", timeout=60000)
-             pg.evaluate("document.querySelectorAll('details').forEach(e => e.open = true)")
-             # INJECT TITLE
-             # INJECT HEADER (Breadcrumbs + Title)
-             pg.evaluate(f"""() => {{
-                let title = {json.dumps(title)};
-                let content = document.querySelector('main') || document.querySelector('.column-17') || document.body;
-                
-                // 1. Prepare Content Elements
-                let targetH1 = document.querySelector('header.trailer-1 h1') || document.querySelector('h1');
-                let breadcrumbs = document.querySelector('nav.breadcrumbs');
-
-                // 2. Insert TITLE (Prepend first, so it ends up below breadcrumbs)
-                if (targetH1) {{
-                    // Clone and clean up style
-                    let newH1 = targetH1.cloneNode(true);
-                    newH1.style.cssText = 'display: block !important; font-size: 24pt !important; font-weight: bold !important; margin-bottom: 20px !important; color: #000 !important; page-break-after: avoid !important; visibility: visible !important; opacity: 1 !important;';
-                    content.prepend(newH1);
-                }} else {{
-                    // Fallback Title
-                    let h1 = document.createElement('h1');
-                    h1.innerText = title;
-                    h1.style.cssText = 'display: block !important; font-size: 24pt !important; font-weight: bold !important; margin-bottom: 20px !important; color: #000 !important; page-break-after: avoid !important;';
-                    content.prepend(h1);
-                }}
-
-                // 3. Insert BREADCRUMBS (Prepend last, so it stays at very top)
-                if (breadcrumbs) {{
-                    let newBC = breadcrumbs.cloneNode(true);
-                    newBC.classList.add('injected-breadcrumb');
-                    newBC.style.cssText = 'display: block !important; font-size: 10pt !important; color: #666 !important; margin-bottom: 10px !important; visibility: visible !important; opacity: 1 !important;';
-                    content.prepend(newBC);
-                }}
-             }}""")
-             pg.add_style_tag(content=CSS_INJECT)
-             pg.pdf(path=path, format="A4", margin={"top":"1cm","bottom":"1cm","left":"1cm","right":"1cm"})
-
-        process_items(tree, OUTPUT_DIR, 0)
-        
-        # ------------------------------------------------------------------
-        # VERIFICATION & RETRY
-        # ------------------------------------------------------------------
         print("\n🕵️ Starting Integrity Check...")
-        missing = []
-        for path, url in expected_pdfs.items():
-            if not os.path.exists(path) or os.path.getsize(path) < 1000: # <1KB is suspicious
-                missing.append((path, url))
-        
+        missing = find_missing(state.expected_pdfs)
         if missing:
             print(f"⚠️ Found {len(missing)} missing or corrupted files. Retrying...")
-            for path, url in missing:
-                print(f"  🔄 Retrying: {os.path.basename(path)}")
-                try:
-                    # Determine title from path or fallback
-                    fname = os.path.basename(path).replace(".pdf", "")
-                    title = " ".join(fname.split("_")[1:])
-                    print_page(page, url, path, title)
-                    print("     ✅ Recovered!")
-                except Exception as e:
-                    print(f"     ❌ Retry Failed: {e}")
+            await render_jobs_async(pool, [{"path": path, "url": url, "title": title_from_path(path)} for path, url in missing])
         else:
             print("✅ Integrity Check Passed: All files present.")
 
+        await pool.close()
+        await browser.close()
+    return pool
+
+def run_async(from_tree=False, resume=False):
+    state, jobs, manifest, previous = start_run(from_tree, resume)
+    jobs = print_light(jobs)
+    pool = asyncio.run(crawl_async(state, jobs))
+    if manifest: manifest.commit(OUTPUT_DIR, previous)
+    WAIT_POLICY.report()
+    if LIMITER: LIMITER.report()
+    if RESOURCE_POLICY: RESOURCE_POLICY.report()
+    ARCHIVE.report()
+    pool.report()
+    if SEARCH_INDEX:
+        SEARCH_INDEX.finish(state.expected_pdfs.values())
+        SEARCH_INDEX.report()
+    merge_output(state)
+
+# ------------------------------------------------------------------
+# PHASE 3: RENDER (one process + one Chromium per shard)
+# ------------------------------------------------------------------
+# Jobs are grouped by their top-level sidebar entry (the pre-numbered
+# NNN_ folder directly under OUTPUT_DIR) and whole groups are balanced
+# across workers, largest first onto the least loaded worker.
+
+def plan_shards(jobs, workers):
+    groups = {}
+    for job in jobs:
+        top = os.path.relpath(job['path'], OUTPUT_DIR).split(os.sep)[0]
+        groups.setdefault(top, []).append(job)
+
+    shards = [[] for _ in range(min(workers, len(groups)))]
+    loads = [0] * len(shards)
+    for top in sorted(groups, key=lambda g: len(groups[g]), reverse=True):
+        target = loads.index(min(loads))
+        shards[target].append(top)
+        loads[target] += len(groups[top])
+    return [[job for top in sorted(shard) for job in groups[top]] for shard in shards]
+
+def render_shard(jobs, archive_mode=None):
+    ARCHIVE.mode = archive_mode # spawned workers re-import the module, so the CLI override is passed in
+    if SEARCH_INDEX: SEARCH_INDEX.set_plan(OUTPUT_DIR, STORE.folder_titles())
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        pages = PageRecycler(browser, setup_context, RECYCLE_PAGES, RECYCLE_HEAP_MB)
+        render_jobs(pages, jobs)
+        retry_missing(pages, {job['path']: job['url'] for job in jobs})
+        pages.close()
         browser.close()
+    if SEARCH_INDEX: SEARCH_INDEX.finish()
+    return {"resources": RESOURCE_POLICY.stats if RESOURCE_POLICY else None, "waits": WAIT_POLICY.stats, "archive": ARCHIVE.stats,
+            "search": SEARCH_INDEX.stats if SEARCH_INDEX else None, "contexts": pages.stats, "metrics": METRICS.export()}
+
+def run_sharded(from_tree=False, resume=False):
+    state, jobs, manifest, previous = start_run(from_tree, resume)
+    jobs = print_light(jobs)
+
+    shards = plan_shards(jobs, SHARD_WORKERS)
+    print(f"🧩 Sharding {len(jobs)} pages across {len(shards)} worker processes")
+    for n, shard in enumerate(shards):
+        tops = sorted({os.path.relpath(job['path'], OUTPUT_DIR).split(os.sep)[0] for job in shard})
+        print(f"   Worker {n+1}: {len(shard)} pages in {', '.join(tops)}")
+
+    contexts = RecyclingStats(RECYCLE_PAGES, RECYCLE_HEAP_MB)
+    if shards: # an incremental run can have nothing left to print
+        with ProcessPoolExecutor(max_workers=len(shards), mp_context=multiprocessing.get_context("spawn")) as executor:
+            for stats in executor.map(render_shard, shards, [ARCHIVE.mode] * len(shards)):
+                if stats["resources"]: RESOURCE_POLICY.merge(stats["resources"])
+                WAIT_POLICY.merge(stats["waits"])
+                ARCHIVE.merge(stats["archive"])
+                if stats["search"]: SEARCH_INDEX.merge(stats["search"])
+                contexts.merge(stats["contexts"])
+                METRICS.merge(stats["metrics"])
+
+    missing = find_missing(state.expected_pdfs)
+    if missing:
+        print(f"⚠️ {len(missing)} pages still missing after shard retries:")
+        for path, url in missing:
+            print(f"   ❌ {path} <- {url}")
+
+    if manifest: manifest.commit(OUTPUT_DIR, previous)
 
-    merge_pdfs(OUTPUT_DIR, MERGED_FILENAME)
+    WAIT_POLICY.report()
+    if RESOURCE_POLICY: RESOURCE_POLICY.report()
+    ARCHIVE.report()
+    contexts.report()
+    if SEARCH_INDEX:
+        SEARCH_INDEX.finish(state.expected_pdfs.values())
+        SEARCH_INDEX.report()
+    merge_output(state)
 
 if __name__ == "__main__":
-    run()
+    # --discover-only: write RESOLVED_TREE and stop
+    # --render-only:   skip discovery and render from an existing RESOLVED_TREE
+    # --record:        save every response into ARCHIVE_DIR while crawling
+    # --replay:        serve every request from ARCHIVE_DIR, no network (use with --render-only)
+    if "--record" in sys.argv: ARCHIVE.mode = "record"
+    if "--replay" in sys.argv: ARCHIVE.mode = "replay"
+    # --incremental:   only re-print pages that changed since the last run (MANIFEST)
+    # --resume:        continue an interrupted run from CRAWL_DB (same plan, unfinished pages only)
+    # --markdown:      export Markdown + JSONL chunks to MARKDOWN_DIR / CHUNKS_JSONL instead of PDFs
+    if "--incremental" in sys.argv: INCREMENTAL = True
+    from_tree = "--render-only" in sys.argv
+    resume = "--resume" in sys.argv
+    if "--discover-only" in sys.argv:
+        discover_only()
+    elif "--markdown" in sys.argv:
+        markdown_only(from_tree)
+    elif SHARD_WORKERS > 1:
+        run_sharded(from_tree, resume)
+    elif CONCURRENCY > 1 and not SECTION_BATCH:
+        run_async(from_tree, resume)
+    else:
+        run(from_tree, resume)
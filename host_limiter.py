@@ -0,0 +1,174 @@
+import time
+import random
+import asyncio
+from urllib.parse import urlsplit
+from wait_policy import Throttled
+
+# ------------------------------------------------------------------
+# ADAPTIVE PER-HOST RATE LIMIT
+# ------------------------------------------------------------------
+# Render tasks take a lease on the page's host before navigating to it:
+#
+#   lease = await LIMITER.acquire(url)
+#   async with lease:
+#       await WAIT_POLICY.goto_async(pg, url)
+#
+# Time spent in acquire() is queueing, not a stuck page: the printers start
+# their PAGE_DEADLINE watchdog only once the lease is granted.
+#
+# Per host there is:
+#   - a token bucket: on average at most `rate` navigations start per second,
+#     with bursts of up to `burst`
+#   - an adaptive in-flight limit (AIMD). It grows by one after a limit's
+#     worth of navigations in a row came back within slow_latency while the
+#     limit was full. It halves (down to min_concurrency) on an error, a
+#     cancelled navigation (watchdog) or one slower than slow_latency, at most
+#     once per cooldown so that one burst of failures counts once.
+#   - throttling: a 429 / 503 answer (wait_policy.Throttled) pauses the host
+#     for its Retry-After (else backoff()) and, with the limit, also halves
+#     the token rate.
+#     The rate climbs back by rate_step per full window of successes.
+# report() prints the final limit, rate and counters per host.
+
+def backoff(attempt, base=2.0, cap=60.0):
+    """Seconds to wait before retry number attempt + 1: exponential with jitter, capped."""
+    return random.uniform(base / 2, min(cap, base * 2 ** attempt))
+
+class HostState:
+    """Token bucket, in-flight limit and counters of one host."""
+
+    def __init__(self, rate, burst, limit):
+        self.rate = rate
+        self.tokens = float(burst)
+        self.refilled = time.monotonic()
+        self.limit = limit
+        self.active = 0
+        self.streak = 0 # fast successes since the last change of limit
+        self.cut_at = 0.0 # monotonic time of the last decrease
+        self.paused_until = 0.0
+        self.cond = asyncio.Condition()
+        self.stats = {"navigations": 0, "errors": 0, "throttled": 0, "slow": 0, "waited": 0.0,
+                      "min_limit": limit, "max_limit": limit, "min_rate": rate}
+
+    def refill(self, now, burst):
+        self.tokens = min(float(burst), self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+
+class Lease:
+    """One navigation slot on a host; reports the outcome and frees the slot on exit."""
+
+    def __init__(self, limiter, host):
+        self.limiter = limiter
+        self.host = host
+        self.started = None
+        self.released = False
+
+    async def __aenter__(self):
+        self.started = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release(exc)
+        return False
+
+    async def release(self, exc=None):
+        """Free the slot once; a lease that never navigated leaves the host's counters alone."""
+        if self.released:
+            return
+        self.released = True
+        await self.limiter._release(self.host, exc, None if self.started is None else time.monotonic() - self.started)
+
+class HostLimiter:
+    """Paces navigations per host with a token bucket and an AIMD in-flight limit."""
+
+    def __init__(self, rate=4.0, burst=4, start=4, min_concurrency=1, max_concurrency=16,
+                 slow_latency=30.0, cooldown=5.0, min_rate=0.25, rate_step=0.25):
+        self.rate = rate
+        self.burst = burst
+        self.start = start
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.slow_latency = slow_latency
+        self.cooldown = cooldown
+        self.min_rate = min_rate
+        self.rate_step = rate_step
+        self.hosts = {} # netloc -> HostState
+        self.loop = None
+
+    def _host(self, url):
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop: # a new asyncio.run(): the hosts' conditions belong to the old loop
+            self.hosts, self.loop = {}, loop
+        name = urlsplit(url).netloc
+        if name not in self.hosts:
+            self.hosts[name] = HostState(self.rate, self.burst, self.start)
+        return self.hosts[name]
+
+    async def acquire(self, url):
+        """Wait for a free slot and a token on url's host; use the returned Lease around the navigation."""
+        host = self._host(url)
+        started = time.monotonic()
+        async with host.cond:
+            while True:
+                now = time.monotonic()
+                wait = None
+                if now < host.paused_until:
+                    wait = host.paused_until - now
+                elif host.active < host.limit:
+                    host.refill(now, self.burst)
+                    if host.tokens >= 1:
+                        host.tokens -= 1
+                        host.active += 1
+                        break
+                    wait = (1 - host.tokens) / host.rate
+                try: await asyncio.wait_for(host.cond.wait(), wait)
+                except asyncio.TimeoutError: pass
+        host.stats["waited"] += time.monotonic() - started
+        return Lease(self, host)
+
+    async def _release(self, host, exc, latency):
+        async with host.cond:
+            host.active -= 1
+            host.cond.notify_all()
+            if latency is None: # given up before navigating (e.g. cancelled while the page was set up)
+                return
+            host.stats["navigations"] += 1
+            if isinstance(exc, Throttled):
+                host.stats["throttled"] += 1
+                host.paused_until = max(host.paused_until, time.monotonic() + (exc.retry_after or backoff(0)))
+                self._decrease(host, throttled=True)
+            elif exc is not None:
+                host.stats["errors"] += 1
+                self._decrease(host)
+            elif latency > self.slow_latency:
+                host.stats["slow"] += 1
+                self._decrease(host)
+            else:
+                host.streak += 1
+                if host.streak >= host.limit:
+                    host.streak = 0
+                    host.rate = min(self.rate, host.rate + self.rate_step)
+                    if host.active + 1 >= host.limit and host.limit < self.max_concurrency: # only grow a limit that was full
+                        host.limit += 1
+                        host.stats["max_limit"] = max(host.stats["max_limit"], host.limit)
+            host.stats["min_rate"] = min(host.stats["min_rate"], host.rate)
+
+    def _decrease(self, host, throttled=False):
+        now = time.monotonic()
+        host.streak = 0
+        if now - host.cut_at < self.cooldown:
+            return
+        host.cut_at = now
+        host.limit = max(self.min_concurrency, min(host.limit, host.active + 1) // 2)
+        if throttled:
+            host.rate = max(self.min_rate, host.rate / 2)
+        host.stats["min_limit"] = min(host.stats["min_limit"], host.limit)
+
+    def report(self):
+        if not self.hosts: return
+        print("\n🚦 Host limiter:")
+        for name, host in sorted(self.hosts.items()):
+            s = host.stats
+            print(f"   {name}: {s['navigations']} navigations, {s['errors']} errors, {s['throttled']} throttled, {s['slow']} slow, "
+                  f"in-flight limit {host.limit} (range {s['min_limit']}-{s['max_limit']}), {host.rate:.2f}/s (low {s['min_rate']:.2f}/s), "
+                  f"{s['waited']:.0f}s waited for a slot (summed over pages)")
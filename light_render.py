@@ -0,0 +1,232 @@
+import os
+import time
+import html
+import multiprocessing
+import importlib.util
+from collections import Counter
+from urllib.parse import urljoin
+from concurrent.futures import ProcessPoolExecutor
+from static_sidebar import HttpPool, VOID_TAGS, parse_html, by_tag
+from markdown_export import CONTENT_ORDER, SKIP_TAGS, SKIP_CLASSES, find_h1, breadcrumb_trail
+
+# ------------------------------------------------------------------
+# LIGHTWEIGHT RENDERER (no Chromium)
+# ------------------------------------------------------------------
+# Most doc pages are static HTML: a main content container, breadcrumbs and
+# an H1. For those, a browser is not needed to print them. Each page is
+# fetched over HTTP in a worker process and the same elements print_page
+# works with are picked from the static HTML (as markdown_export does). They
+# are sanitized into a small print document (breadcrumbs, H1, content; only
+# structural tags and a few attributes, absolute links and images,
+# <details> open), and that document is printed by a pure-Python HTML-to-PDF
+# engine:
+#   weasyprint  better CSS support (pip install weasyprint)
+#   xhtml2pdf   pure Python on top of ReportLab (pip install xhtml2pdf)
+#
+# A page goes back to Chromium when its content needs a browser: little or
+# no static text (rendered by script), custom elements (calcite-*), SVG
+# figures, canvas, iframes or media, nested or very wide tables. Only what
+# would be printed counts: elements inside containers sanitize() drops
+# (buttons, nav, aria-hidden, ...) are ignored, and so are icons, i.e. SVGs
+# that are aria-hidden, have an "icon" class or are at most ICON_SIZE px
+# (width/height or viewBox), and <calcite-icon>. It also goes back when the
+# fetch or the engine fails, or when the PDF comes out too small for the
+# integrity check. The printers then render whatever is left as usual.
+
+ENGINES = ("weasyprint", "xhtml2pdf")
+BROWSER_TAGS = {"SVG", "CANVAS", "IFRAME", "VIDEO", "AUDIO", "OBJECT", "EMBED", "MATH"}
+ICON_TAGS = {"CALCITE-ICON"}
+ICON_SIZE = 48 # px; a larger SVG is a figure
+KEEP_ATTRS = ("href", "src", "alt", "title", "colspan", "rowspan", "start", "id")
+MIN_TEXT = 200 # characters of static content text; less usually means the page is built by script
+MAX_TABLE_COLUMNS = 8
+MIN_PDF_BYTES = 1000 # the printers' integrity check treats anything smaller as broken
+
+PRINT_CSS = """
+@page { size: %(size)s; margin: %(top)s %(right)s %(bottom)s %(left)s; }
+body { font-family: Helvetica, Arial, sans-serif; font-size: 10.5pt; line-height: 1.4; color: #000; }
+.breadcrumbs { font-size: 10pt; color: #666; margin-bottom: 10px; }
+h1 { font-size: 24pt; margin: 0 0 20px 0; page-break-after: avoid; }
+h2, h3, h4 { page-break-after: avoid; }
+pre { font-family: Courier, monospace; font-size: 9pt; white-space: pre-wrap; background: #f4f4f4; padding: 6px; }
+code { font-family: Courier, monospace; }
+table { border-collapse: collapse; width: 100%%; }
+th, td { border: 1px solid #ccc; padding: 3px 5px; vertical-align: top; }
+img { max-width: 100%%; }
+a { color: #0079c1; text-decoration: none; }
+"""
+
+def engine_available(engine):
+    return engine in ENGINES and importlib.util.find_spec(engine) is not None
+
+def page_css(pdf_options):
+    margin = pdf_options.get("margin", {})
+    return PRINT_CSS % {"size": pdf_options.get("format", "A4"), **{side: margin.get(side, "1cm") for side in ("top", "right", "bottom", "left")}}
+
+# ------------------------------------------------------------------
+# SANITIZE + CLASSIFY
+# ------------------------------------------------------------------
+def skip(el):
+    return el.tag in SKIP_TAGS or any(c in SKIP_CLASSES for c in el.classes) or el.attrs.get("aria-hidden") == "true"
+
+def svg_size(el):
+    """Largest of an SVG's width/height attributes (plain or px numbers), else of its viewBox; None if unknown."""
+    sizes = []
+    for name in ("width", "height"):
+        value = el.attrs.get(name, "").strip().lower()
+        value = value[:-2] if value.endswith("px") else value
+        try: sizes.append(float(value))
+        except ValueError: pass
+    if not sizes:
+        box = el.attrs.get("viewbox", "").replace(",", " ").split() # html.parser lower-cases attribute names
+        try: sizes = [float(box[2]), float(box[3])]
+        except (IndexError, ValueError): pass
+    return max(sizes) if sizes else None
+
+def is_icon(el):
+    if el.tag in ICON_TAGS:
+        return True
+    if el.tag != "SVG":
+        return False
+    size = svg_size(el)
+    return any("icon" in c.lower() for c in el.classes) or (size is not None and size <= ICON_SIZE)
+
+def printed_elements(el):
+    """el's descendants in document order, without entering subtrees sanitize() drops (their root is still yielded)."""
+    for child in el.children:
+        yield child
+        if not skip(child):
+            yield from printed_elements(child)
+
+def needs_browser(content, text):
+    """Why this content must be printed by Chromium, or None when the light engine can take it."""
+    if len(text) < MIN_TEXT:
+        return "little static text"
+    for el in printed_elements(content):
+        if el.tag in BROWSER_TAGS or "-" in el.tag:
+            if el.attrs.get("aria-hidden") == "true" or is_icon(el):
+                continue
+            return f"<{el.tag.lower()}>"
+        if el.tag == "TABLE" and not skip(el):
+            if el.find(by_tag("TABLE")):
+                return "nested table"
+            rows = el.find_all(by_tag("TR"))
+            if rows and max(len([c for c in row.children if c.tag in ("TD", "TH")]) for row in rows) > MAX_TABLE_COLUMNS:
+                return "wide table"
+    return None
+
+def sanitize(el, base_url, out):
+    """Append el's children as clean HTML: structural tags, KEEP_ATTRS only, absolute URLs."""
+    for node in el.nodes:
+        if isinstance(node, str):
+            out.append(html.escape(node, quote=False))
+            continue
+        if skip(node):
+            continue
+        tag = node.tag.lower()
+        attrs = []
+        for name in KEEP_ATTRS:
+            if name in node.attrs:
+                value = urljoin(base_url, node.attrs[name]) if name in ("href", "src") else node.attrs[name]
+                attrs.append(f' {name}="{html.escape(value)}"')
+        if node.tag == "DETAILS":
+            attrs.append(" open")
+        out.append(f"<{tag}{''.join(attrs)}>")
+        if node.tag in VOID_TAGS:
+            continue
+        sanitize(node, base_url, out)
+        out.append(f"</{tag}>")
+    return out
+
+def print_document(source, url, title, variant, css):
+    """(document HTML, search-index page) for a page the light engine can print, or (None, reason)."""
+    doc = parse_html(source)
+    content = next((m for pred in CONTENT_ORDER[variant] for m in [doc.find(pred)] if m), None) or doc.find(by_tag("BODY")) or doc
+    text = content.inner_text()
+    reason = needs_browser(content, text)
+    if reason:
+        return None, reason
+
+    h1 = find_h1(doc, variant)
+    heading = h1.inner_text() if h1 else title
+    crumbs = breadcrumb_trail(doc)
+    body = "".join(sanitize(content, url, []))
+    parts = [f'<nav class="breadcrumbs">{html.escape(" > ".join(crumbs))}</nav>' if crumbs else ""]
+    if content.find(by_tag("H1")) is None: # HEADER_INJECT_JS puts the page's H1 on top of the content
+        parts.append(f"<h1>{html.escape(heading)}</h1>")
+    parts.append(body)
+    document = (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(heading)}</title>'
+                f'<style>{css}</style></head><body>{"".join(parts)}</body></html>')
+    return document, {"title": heading, "breadcrumbs": crumbs, "text": text}
+
+def html_to_pdf(document, path, engine, base_url):
+    if engine == "weasyprint":
+        from weasyprint import HTML
+        HTML(string=document, base_url=base_url).write_pdf(path)
+    elif engine == "xhtml2pdf":
+        from xhtml2pdf import pisa
+        with open(path, "wb") as f:
+            result = pisa.CreatePDF(document, dest=f, encoding="utf-8")
+        if result.err:
+            raise RuntimeError(f"xhtml2pdf reported {result.err} errors")
+    else:
+        raise ValueError(f"unknown light render engine {engine!r}")
+
+# ------------------------------------------------------------------
+# WORKERS
+# ------------------------------------------------------------------
+_pool = None
+
+def render_light(task):
+    """Fetch, sanitize and print one page; {"browser": reason} when Chromium has to do it (runs in a worker process)."""
+    global _pool
+    started = time.time()
+    stages = {}
+    try:
+        if _pool is None: _pool = HttpPool()
+        source, _ = _pool.get_text(task["url"])
+        stages["fetch"] = time.time() - started
+
+        mark = time.time()
+        document, page = print_document(source, task["url"], task["title"], task["variant"], task["css"])
+        if document is None:
+            return {"path": task["path"], "browser": page}
+        html_to_pdf(document, task["path"], task["engine"], task["url"])
+        stages["pdf"] = time.time() - mark
+        if os.path.getsize(task["path"]) < MIN_PDF_BYTES:
+            os.remove(task["path"])
+            return {"path": task["path"], "browser": "PDF too small"}
+    except Exception as e:
+        return {"path": task["path"], "browser": f"{type(e).__name__}: {e}"[:200]}
+    record = {"kind": "render", "url": task["url"], "path": task["path"], "ok": True, "error": None, "pid": os.getpid(),
+              "lane": 0, "start": started, "total": time.time() - started, "stages": stages, "engine": task["engine"]}
+    return {"path": task["path"], "page": page, "record": record}
+
+def render_light_jobs(jobs, variant, engine, pdf_options, workers=4, search_index=None, metrics=None):
+    """Print every job the light engine can take; returns (printed jobs, jobs left for Chromium)."""
+    if not engine_available(engine):
+        print(f"⚠️ Light renderer {engine!r} is not installed (pip install {engine}), Chromium prints every page")
+        return [], jobs
+    css = page_css(pdf_options)
+    tasks = [{"url": job['url'], "path": job['path'], "title": job['title'], "variant": variant, "engine": engine, "css": css}
+             for job in jobs]
+    print(f"\n🪶 Light rendering {len(tasks)} pages with {engine} ({workers} processes), Chromium takes the rest")
+
+    started = time.time()
+    printed, left, reasons = [], [], Counter()
+    with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn")) as executor:
+        for n, (job, result) in enumerate(zip(jobs, executor.map(render_light, tasks, chunksize=4)), 1):
+            if "browser" in result:
+                left.append(job)
+                reasons[result["browser"].split(":")[0]] += 1
+            else:
+                printed.append(job)
+                if search_index: search_index.add(job['url'], job['path'], job['title'], result["page"])
+                if metrics: metrics.add(result["record"])
+            if n % 50 == 0 or n == len(tasks):
+                print(f"  🪶 [{n}/{len(tasks)}] {len(printed)} printed, {len(left)} for Chromium ({(time.time() - started) / n:.2f}s per page)")
+
+    print(f"✅ Light renderer: {len(printed)} pages in {time.time() - started:.0f}s, {len(left)} left for Chromium")
+    for reason, count in reasons.most_common(8):
+        print(f"   {count:>6}  {reason}")
+    return printed, left
@@ -0,0 +1,305 @@
+import os
+import re
+import json
+import time
+import multiprocessing
+from urllib.parse import urljoin
+from concurrent.futures import ProcessPoolExecutor
+from static_sidebar import HttpPool, parse_html, by_class, by_tag
+from web_archive import WebArchive
+
+# ------------------------------------------------------------------
+# MARKDOWN / JSONL EXPORT (no Chromium, no PDF)
+# ------------------------------------------------------------------
+# Each page is fetched over HTTP (or from a recorded web_archive), and the
+# same elements print_page works with are picked from the static HTML: the
+# main content container, the breadcrumbs and the H1. The content is
+# converted to Markdown in a process pool. Every page is written as an .md
+# file mirroring the PDF folder tree, and cut into heading-aware chunks that
+# are streamed, in work-list order, to one JSONL file. Each chunk carries the
+# sidebar hierarchy path and the headings above it.
+
+# Same lookup order as HEADER_INJECT_JS in each printer
+CONTENT_ORDER = {
+    "site": [by_tag("MAIN"), by_class("column-17")],
+    "pro": [lambda el: el.tag == "DIV" and el.attrs.get("role") == "main", by_class("column-19"), by_class("column-17"), by_tag("MAIN")],
+}
+
+# Hidden by CSS_INJECT or not content (the H1 is re-added on top, like the injected header)
+SKIP_TAGS = {"SCRIPT", "STYLE", "NOSCRIPT", "TEMPLATE", "SVG", "BUTTON", "FORM", "INPUT", "SELECT", "IFRAME",
+             "HEADER", "FOOTER", "ASIDE", "NAV"}
+SKIP_CLASSES = {"share-buttons", "feedback-container", "column-5", "js-accordion", "injected-breadcrumb"}
+
+BLOCK_TAGS = {"P", "DIV", "SECTION", "ARTICLE", "MAIN", "H1", "H2", "H3", "H4", "H5", "H6", "UL", "OL", "LI",
+              "PRE", "TABLE", "BLOCKQUOTE", "HR", "DL", "DT", "DD", "FIGURE", "FIGCAPTION", "DETAILS", "SUMMARY",
+              "CALCITE-NOTICE", "CALCITE-BLOCK", "CALCITE-PANEL"}
+
+HEADING = re.compile(r"^(#{1,6}) (.*)")
+BR = "\x00"
+
+def collapse(text):
+    return re.sub(r"[ \t\r\n\f]+", " ", text)
+
+class MarkdownConverter:
+    """Static-DOM (static_sidebar.Element) to Markdown, block by block."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def skip(self, el):
+        return el.tag in SKIP_TAGS or any(c in SKIP_CLASSES for c in el.classes) or el.attrs.get("aria-hidden") == "true"
+
+    # -- blocks -----------------------------------------------------
+    def blocks(self, node):
+        out, run = [], []
+
+        def flush():
+            text = collapse("".join(run)).strip().replace(f" {BR}", BR).replace(f"{BR} ", BR).replace(BR, "  \n")
+            if text: out.append(text)
+            run.clear()
+
+        for n in node.nodes:
+            if isinstance(n, str):
+                run.append(n)
+            elif self.skip(n):
+                continue
+            elif n.tag in BLOCK_TAGS:
+                flush()
+                out.extend(self.block(n))
+            else:
+                run.append(self.inline(n))
+        flush()
+        return out
+
+    def block(self, el):
+        tag = el.tag
+        if tag[0] == "H" and tag[1:].isdigit():
+            text = collapse(self.inline_children(el)).strip()
+            return [f"{'#' * int(tag[1])} {text}"] if text else []
+        if tag in ("UL", "OL"):
+            return self.list_block(el, ordered=tag == "OL")
+        if tag == "PRE":
+            return [self.code_block(el)]
+        if tag == "TABLE":
+            return self.table_block(el)
+        if tag == "BLOCKQUOTE":
+            return ["\n".join(f"> {line}" if line else ">" for line in "\n\n".join(self.blocks(el)).split("\n"))]
+        if tag == "HR":
+            return ["---"]
+        if tag in ("DT", "SUMMARY"):
+            text = collapse(self.inline_children(el)).strip()
+            return [f"**{text}**"] if text else []
+        if tag == "FIGCAPTION":
+            text = collapse(self.inline_children(el)).strip()
+            return [f"*{text}*"] if text else []
+        return self.blocks(el)
+
+    def list_block(self, el, ordered):
+        lines = []
+        n = int(el.attrs.get("start", "1") or 1) if ordered else 0
+        for li in el.children:
+            if li.tag != "LI" or self.skip(li): continue
+            marker = f"{n}. " if ordered else "- "
+            n += 1
+            body = self.blocks(li) or [""]
+            pad = " " * len(marker)
+            item = "\n".join(body).split("\n")
+            lines.append(marker + item[0])
+            lines.extend(pad + line if line else "" for line in item[1:])
+        return ["\n".join(lines)] if lines else []
+
+    def code_block(self, el):
+        code = el.find(by_tag("CODE"))
+        classes = el.classes + (code.classes if code else [])
+        lang = next((c.split("-", 1)[1] for c in classes if c.startswith(("language-", "lang-"))), "")
+        text = el.text_content().strip("\n")
+        fence = "~~~" if "```" in text else "```"
+        return f"{fence}{lang}\n{text}\n{fence}"
+
+    def table_block(self, el):
+        rows = []
+        for tr in el.find_all(by_tag("TR")):
+            cells = [collapse(self.inline_children(c)).strip().replace("|", "\\|") for c in tr.children if c.tag in ("TH", "TD")]
+            if cells: rows.append(cells)
+        if not rows: return []
+        width = max(len(r) for r in rows)
+        rows = [r + [""] * (width - len(r)) for r in rows]
+        lines = ["| " + " | ".join(rows[0]) + " |", "|" + " --- |" * width]
+        lines += ["| " + " | ".join(r) + " |" for r in rows[1:]]
+        return ["\n".join(lines)]
+
+    # -- inline -----------------------------------------------------
+    def inline_children(self, el):
+        return "".join(n if isinstance(n, str) else ("" if self.skip(n) else self.inline(n)) for n in el.nodes)
+
+    def inline(self, el):
+        tag = el.tag
+        if tag == "BR":
+            return BR
+        if tag == "IMG":
+            src = el.attrs.get("src") or el.attrs.get("data-src")
+            return f"![{collapse(el.attrs.get('alt', '')).strip()}]({urljoin(self.base_url, src)})" if src else ""
+        if tag in ("CODE", "KBD", "SAMP", "TT"):
+            text = collapse(el.text_content()).strip()
+            return f"`{text}`" if text else ""
+        text = self.inline_children(el)
+        if tag == "A":
+            href = el.attrs.get("href", "")
+            label = collapse(text).strip()
+            if not label or not href or href.startswith(("#", "javascript:")):
+                return text
+            return f"[{label}]({urljoin(self.base_url, href)})"
+        if tag in ("STRONG", "B"):
+            return f"**{text.strip()}**" if text.strip() else text
+        if tag in ("EM", "I"):
+            return f"*{text.strip()}*" if text.strip() else text
+        return text
+
+    def convert(self, el):
+        return "\n\n".join(self.blocks(el))
+
+# ------------------------------------------------------------------
+# PAGE EXTRACTION + CHUNKING
+# ------------------------------------------------------------------
+def find_h1(doc, variant):
+    if variant == "site":
+        header = doc.find(lambda el: el.tag == "HEADER" and el.has_class("trailer-1"))
+        if header and header.find(by_tag("H1")): return header.find(by_tag("H1"))
+    return doc.find(by_tag("H1"))
+
+def breadcrumb_trail(doc):
+    nav = doc.find(lambda el: el.tag == "NAV" and el.has_class("breadcrumbs"))
+    if nav is None: return []
+    crumbs = nav.find_all(by_class("crumb")) or nav.find_all(by_tag("A"))
+    return [c.inner_text() for c in crumbs if c.inner_text()]
+
+def page_markdown(html, url, title, variant):
+    """(markdown, h1 text, breadcrumb list) for one page."""
+    doc = parse_html(html)
+    content = next((m for pred in CONTENT_ORDER[variant] for m in [doc.find(pred)] if m), None) or doc.find(by_tag("BODY")) or doc
+    h1 = find_h1(doc, variant)
+    heading = h1.inner_text() if h1 else title
+    crumbs = breadcrumb_trail(doc)
+
+    body = MarkdownConverter(url).convert(content)
+    first = body.split("\n", 1)[0]
+    parts = []
+    if crumbs: parts.append(" > ".join(crumbs))
+    if first != f"# {heading}": parts.append(f"# {heading}")
+    parts.append(body)
+    return "\n\n".join(p for p in parts if p), heading, crumbs
+
+def chunk_markdown(markdown, max_chars=4000):
+    """Split on headings (h1-h3); long sections are cut at paragraph boundaries.
+
+    Returns [(headings, text)] where headings is the heading path above the chunk.
+    """
+    sections, stack, current, has_body = [], [], [], False
+    for block in markdown.split("\n\n"):
+        m = HEADING.match(block)
+        if m and len(m.group(1)) <= 3:
+            # A heading with nothing under it (the H1 right before "## Overview")
+            # is carried into the next section instead of becoming a chunk
+            if has_body:
+                sections.append((list(stack), current))
+                current, has_body = [], False
+            level = len(m.group(1))
+            stack = [h for h in stack if h[0] < level] + [(level, m.group(2))]
+            current.append(block)
+        else:
+            current.append(block)
+            has_body = True
+    if current: sections.append((list(stack), current))
+
+    chunks = []
+    for stack, blocks in sections:
+        text = ""
+        for block in blocks:
+            if text and len(text) + len(block) + 2 > max_chars:
+                chunks.append(([h for _, h in stack], text))
+                text = ""
+            text = f"{text}\n\n{block}" if text else block
+        if text.strip(): chunks.append(([h for _, h in stack], text))
+    return chunks
+
+# ------------------------------------------------------------------
+# WORKERS
+# ------------------------------------------------------------------
+_pool = None
+_archive = None
+
+def export_page(job):
+    """Fetch, convert and write one page; returns its chunks (runs in a worker process)."""
+    global _pool, _archive
+    started = time.time()
+    try:
+        if job["archive"]:
+            if _archive is None: _archive = WebArchive(job["archive"], "replay")
+            hit = _archive.lookup(job["url"].split("#")[0])
+            if hit is None: raise LookupError("not in archive")
+            html = hit[2].decode("utf-8", errors="replace")
+        else:
+            if _pool is None: _pool = HttpPool()
+            html, _ = _pool.get_text(job["url"])
+
+        markdown, heading, crumbs = page_markdown(html, job["url"], job["title"], job["variant"])
+        os.makedirs(os.path.dirname(job["md_path"]), exist_ok=True)
+        with open(job["md_path"], "w", encoding="utf-8") as f:
+            f.write(markdown + "\n")
+
+        # Breadcrumbs go into each record, not into a chunk of their own
+        body = markdown[len(" > ".join(crumbs)):].lstrip("\n") if crumbs else markdown
+        chunks = [{"id": f"{job['rel']}#{n}", "url": job["url"], "title": heading, "breadcrumbs": crumbs,
+                   "hierarchy": job["hierarchy"], "headings": headings, "text": text, "chars": len(text)}
+                  for n, (headings, text) in enumerate(chunk_markdown(body, job["max_chars"]))]
+        return {"path": job["md_path"], "chunks": chunks, "html_bytes": len(html), "md_bytes": len(markdown.encode("utf-8")),
+                "seconds": time.time() - started}
+    except Exception as e:
+        return {"path": job["md_path"], "error": f"{type(e).__name__}: {e}", "chunks": []}
+
+def hierarchy_of(path, root_dir, titles, title):
+    """Sidebar titles of the folders above a job, then the job's own title.
+
+    A folder's 000_Introduction page is titled like the folder, so its title
+    isn't repeated.
+    """
+    trail, folder = [], os.path.dirname(path)
+    while os.path.normpath(folder) != os.path.normpath(root_dir) and folder:
+        trail.append(titles.get(folder) or os.path.basename(folder))
+        folder = os.path.dirname(folder)
+    if trail and trail[0] == title and os.path.basename(path).startswith("000_Introduction"):
+        return list(reversed(trail))
+    return list(reversed(trail)) + [title]
+
+def export_markdown(jobs, titles, root_dir, jsonl_path, variant="site", workers=8, archive=None, max_chars=4000):
+    """Export planned jobs (PDF paths under root_dir) as .md files + one JSONL of chunks."""
+    tasks = [{"url": job['url'], "title": job['title'], "md_path": job['path'][:-4] + ".md" if job['path'].endswith(".pdf") else job['path'] + ".md",
+              "rel": os.path.relpath(job['path'], root_dir), "hierarchy": hierarchy_of(job['path'], root_dir, titles, job['title']),
+              "variant": variant, "archive": archive, "max_chars": max_chars} for job in jobs]
+    print(f"\n📝 Exporting {len(tasks)} pages to Markdown ({workers} processes) -> {root_dir}, {jsonl_path}")
+
+    started = time.time()
+    stats = {"pages": 0, "chunks": 0, "html_bytes": 0, "md_bytes": 0, "errors": []}
+    with open(jsonl_path, "w", encoding="utf-8") as out, \
+         ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn")) as executor:
+        for n, result in enumerate(executor.map(export_page, tasks, chunksize=4), 1):
+            if "error" in result:
+                stats["errors"].append((result["path"], result["error"]))
+                print(f"  ❌ {os.path.relpath(result['path'], root_dir)}: {result['error']}")
+            else:
+                stats["pages"] += 1
+                stats["html_bytes"] += result["html_bytes"]
+                stats["md_bytes"] += result["md_bytes"]
+            for chunk in result["chunks"]:
+                out.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+            stats["chunks"] += len(result["chunks"])
+            if n % 50 == 0 or n == len(tasks):
+                elapsed = time.time() - started
+                print(f"  ✅ [{n}/{len(tasks)}] {elapsed / n:.2f}s per page")
+
+    elapsed = time.time() - started
+    print(f"✅ Markdown export: {stats['pages']} pages, {stats['chunks']} chunks in {elapsed:.0f}s "
+          f"({stats['md_bytes'] / 1024 / 1024:.1f} MB Markdown from {stats['html_bytes'] / 1024 / 1024:.1f} MB HTML)")
+    if stats["errors"]:
+        print(f"⚠️ {len(stats['errors'])} pages failed")
+    return stats
@@ -0,0 +1,576 @@
+import io
+import os
+import zlib
+import json
+import time
+import hashlib
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+from pypdf.generic import (ArrayObject, ByteStringObject, DictionaryObject, IndirectObject, NameObject, NumberObject,
+                           StreamObject, TextStringObject)
+
+# ------------------------------------------------------------------
+# STREAMING MERGE
+# ------------------------------------------------------------------
+# PdfWriter.append() keeps every merged page (and its fonts/images) in memory
+# until write(). This merger instead copies one input at a time straight to
+# disk: each page's object graph is renumbered and written as it is read,
+# then the input is released. Only the xref offsets (one int per object) and
+# the page references stay in memory, so peak memory is bounded by the
+# largest single input, not by the page count.
+#
+# Parallel mode (tree reduction): the inputs are cut into contiguous
+# fragments along top-level folders and each worker process copies one
+# fragment into a temporary file, numbering its objects from its own
+# disjoint range. Each range is as large as an upper bound on what its inputs
+# can produce (their xref /Size plus their named destinations, read in a
+# cheap first pass), so the ranges stay packed and the trailer /Size stays
+# close to the real object count. Because the ranges don't overlap, the
+# parent combines the fragments by plain byte copy (no re-parsing) and
+# writes one xref table with a subsection per fragment. A fragment that
+# outgrows its bound (a damaged xref) makes the merge redo itself serially.
+#
+# Objects 1 and 2 are the page tree root and the catalog; they are written
+# last together with the outline, once all pages are known. Every copied page
+# gets /Parent 1 0 R.
+#
+# Named destinations (in-page anchors and the links to them) survive the
+# merge: each input's /Dests and /Names /Dests entries are copied with a
+# per-input prefix ("p0007-intro"), the links of that input are rewritten to
+# the prefixed names, and all of them go into one /Names /Dests tree.
+
+PAGES_ROOT = 1
+CATALOG = 2
+FIRST_OBJECT = 3
+MAX_OBJECTS = 8388607 # PDF implementation limit on object numbers (ISO 32000-1, Annex C)
+NAME_TREE_LEAF = 512 # named destinations per leaf of the merged /Dests name tree
+
+def rss_mb():
+    """Current resident set size in MB, or None when it can't be read here."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def find_pdfs(root_dir):
+    entries = []
+    for root, dirs, files in os.walk(root_dir):
+        for f in files:
+            if f.endswith(".pdf"):
+                entries.append(os.path.join(root, f))
+    entries.sort()
+    return entries
+
+def dest_prefix(index):
+    return f"p{index:04d}-"
+
+def title_from_name(name):
+    # "003_Some_Page.pdf" -> "Some Page" (used when the crawl tree has no title)
+    parts = name[:-4].split("_") if name.endswith(".pdf") else name.split("_")
+    return " ".join(parts[1:] if parts[0].isdigit() else parts)
+
+class StreamingPdfWriter:
+    """Append-only PDF object writer: objects go to disk as soon as they are copied.
+
+    With dedupe=True, copied streams are written through write_shared() and
+    byte-identical ones (same dictionary and data) collapse into one object.
+    With compress=True, streams without a filter are Flate-compressed on copy.
+    """
+
+    def __init__(self, out, first_num=FIRST_OBJECT, limit=None, dedupe=False, compress=False):
+        self.out = out
+        self.first_num = first_num
+        self.next_num = first_num
+        self.limit = limit # first object number this writer may NOT use
+        self.offsets = {} # object number -> byte offset in self.out
+        self.dedupe = dedupe
+        self.compress = compress
+        self.shared = {} # sha256 of a serialized stream -> object number
+        self.stats = {"deduped": 0, "dedupe_bytes": 0, "compressed": 0, "compress_bytes": 0}
+
+    def allocate(self):
+        if self.limit and self.next_num >= self.limit:
+            raise OverflowError(f"more than {self.limit - self.first_num} objects in one merge fragment")
+        num = self.next_num
+        self.next_num += 1
+        return num
+
+    def write_object(self, num, obj):
+        self.offsets[num] = self.out.tell()
+        self.out.write(f"{num} 0 obj\n".encode())
+        obj.write_to_stream(self.out)
+        self.out.write(b"\nendobj\n")
+
+    def write_shared(self, obj):
+        """Write obj unless an identical object was already written; return its object number."""
+        buf = io.BytesIO()
+        obj.write_to_stream(buf)
+        data = buf.getvalue()
+        digest = hashlib.sha256(data).digest()
+        if digest in self.shared:
+            self.stats["deduped"] += 1
+            self.stats["dedupe_bytes"] += len(data)
+            return self.shared[digest]
+        num = self.allocate()
+        self.offsets[num] = self.out.tell()
+        self.out.write(f"{num} 0 obj\n".encode() + data + b"\nendobj\n")
+        self.shared[digest] = num
+        return num
+
+    def append(self, reader, prefix=""):
+        """Copy every page of an open PdfReader; returns (output page numbers, [(prefixed dest name, object number)])."""
+        copier = ObjectCopier(self, reader, prefix)
+        return copier.copy_pages(), copier.copy_dests()
+
+class ObjectCopier:
+    """Copies objects from one PdfReader into a StreamingPdfWriter, renumbering references.
+
+    With a prefix, named destinations used by links and GoTo actions are
+    renamed to prefix + name (see copy_dests()).
+    """
+
+    def __init__(self, writer, reader, prefix=None):
+        self.writer = writer
+        self.reader = reader
+        self.prefix = prefix
+        self.mapping = {} # (source idnum, generation) -> output object number
+        self.queue = [] # (source reference, output number) still to write
+        self.active = set() # streams being deduped (guards reference cycles)
+
+    def ref(self, src):
+        key = (src.idnum, src.generation)
+        if key not in self.mapping:
+            if self.writer.dedupe and key not in self.active:
+                obj = src.get_object()
+                if isinstance(obj, StreamObject):
+                    # Depth-first for streams: their references are final numbers before they
+                    # are hashed, so e.g. two identical images with identical /SMask collapse too
+                    self.active.add(key)
+                    num = self.writer.write_shared(self.copy(obj))
+                    self.active.discard(key)
+                    self.mapping.setdefault(key, num)
+                    return IndirectObject(num, 0, None)
+            self.mapping[key] = self.writer.allocate()
+            self.queue.append((src, self.mapping[key]))
+        return IndirectObject(self.mapping[key], 0, None)
+
+    def copy(self, obj, is_page=False):
+        if isinstance(obj, IndirectObject):
+            return self.ref(obj)
+        if isinstance(obj, StreamObject):
+            new = type(obj)()
+            new._data = obj._data # raw (still encoded) bytes, never decoded
+            for k, v in obj.items():
+                if k != "/Length": new[NameObject(k)] = self.copy(v)
+            if self.writer.compress and "/Filter" not in obj and obj.get("/Type") != "/Metadata" and len(new._data) > 64:
+                packed = zlib.compress(new._data, 6)
+                if len(packed) < len(new._data):
+                    self.writer.stats["compressed"] += 1
+                    self.writer.stats["compress_bytes"] += len(new._data) - len(packed)
+                    new._data = packed
+                    new[NameObject("/Filter")] = NameObject("/FlateDecode")
+            return new
+        if isinstance(obj, DictionaryObject):
+            is_page = is_page or obj.get("/Type") == "/Page"
+            new = DictionaryObject()
+            for k, v in obj.items():
+                if is_page and k == "/Parent":
+                    new[NameObject(k)] = IndirectObject(PAGES_ROOT, 0, None)
+                elif self.prefix is not None and (k == "/Dest" or (k == "/D" and obj.get("/S") == "/GoTo")) and is_dest_name(v):
+                    new[NameObject(k)] = TextStringObject(self.prefix + dest_name(v))
+                else:
+                    new[NameObject(k)] = self.copy(v)
+            return new
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self.copy(v) for v in obj)
+        return obj
+
+    def drain(self):
+        while self.queue:
+            src, num = self.queue.pop()
+            self.writer.write_object(num, self.copy(src.get_object()))
+
+    def copy_pages(self, release=False):
+        """Copy all pages; release=True drops the reader's object cache after each page (large inputs)."""
+        # Number all pages first so links/annotations between them resolve to the copies.
+        # Pages are copied from reader.pages, which carries inherited /Resources, /MediaBox etc.
+        pages = list(self.reader.pages)
+        page_nums = []
+        for page in pages:
+            num = self.writer.allocate()
+            if page.indirect_reference is not None:
+                self.mapping[(page.indirect_reference.idnum, page.indirect_reference.generation)] = num
+            page_nums.append(num)
+
+        for page, num in zip(pages, page_nums):
+            self.writer.write_object(num, self.copy(page, is_page=True))
+            self.drain()
+            if release:
+                self.reader.resolved_objects.clear()
+        return page_nums
+
+    def copy_dests(self):
+        """Copy the reader's named destinations that point into its pages; [(prefixed name, object number)]."""
+        catalog = self.reader.trailer["/Root"]
+        entries = []
+        if "/Dests" in catalog: # PDF 1.1 dictionary, keyed by name objects
+            entries.extend(catalog["/Dests"].get_object().items())
+        names = catalog.get("/Names")
+        if names is not None and "/Dests" in names.get_object():
+            entries.extend(name_tree_items(names.get_object()["/Dests"]))
+
+        dests = []
+        for name, value in entries:
+            target = value.get_object()
+            array = target.get("/D") if isinstance(target, DictionaryObject) else target
+            array = array.get_object() if array is not None else None
+            page = array[0] if isinstance(array, ArrayObject) and array else None
+            if not isinstance(page, IndirectObject) or (page.idnum, page.generation) not in self.mapping:
+                continue # not a destination in one of the copied pages
+            copied = self.copy(value)
+            if isinstance(copied, IndirectObject):
+                num = copied.idnum
+            else:
+                num = self.writer.allocate()
+                self.writer.write_object(num, copied)
+            dests.append(((self.prefix or "") + dest_name(name), num))
+        self.drain()
+        return dests
+
+def is_dest_name(value):
+    return isinstance(value, (NameObject, TextStringObject, ByteStringObject))
+
+def dest_name(value):
+    """Name of a named destination: name objects lose their slash, byte strings are decoded."""
+    if isinstance(value, NameObject):
+        return str(value)[1:]
+    if isinstance(value, ByteStringObject):
+        return bytes(value).decode("latin-1")
+    return str(value)
+
+def name_tree_items(node, depth=0):
+    """(key, value) pairs of a PDF name tree, in tree order."""
+    node = node.get_object()
+    if depth > 32: # guards against malformed, cyclic trees
+        return []
+    items = []
+    pairs = node.get("/Names", [])
+    items.extend(zip(pairs[0::2], pairs[1::2]))
+    for kid in node.get("/Kids", []):
+        items.extend(name_tree_items(kid, depth + 1))
+    return items
+
+def write_dest_tree(writer, dests):
+    """Write a /Dests name tree for [(name, object number)] and return its root object number."""
+    dests = sorted(dests, key=lambda d: d[0])
+    leaves = [dests[i:i + NAME_TREE_LEAF] for i in range(0, len(dests), NAME_TREE_LEAF)]
+    nums = []
+    for leaf in leaves:
+        node = DictionaryObject({NameObject("/Names"): ArrayObject(
+            item for name, num in leaf for item in (TextStringObject(name), IndirectObject(num, 0, None)))})
+        if len(leaves) > 1: # the root node has no /Limits
+            node[NameObject("/Limits")] = ArrayObject([TextStringObject(leaf[0][0]), TextStringObject(leaf[-1][0])])
+        nums.append(writer.allocate())
+        writer.write_object(nums[-1], node)
+    if len(nums) == 1:
+        return nums[0]
+    root = writer.allocate()
+    writer.write_object(root, DictionaryObject({NameObject("/Kids"): ArrayObject(IndirectObject(n, 0, None) for n in nums)}))
+    return root
+
+def object_bound(path):
+    """Most object numbers copying path can use: its xref /Size plus one per named destination; 0 if unreadable."""
+    try:
+        reader = PdfReader(path)
+        catalog = reader.trailer["/Root"]
+        dests = len(catalog["/Dests"].get_object()) if "/Dests" in catalog else 0
+        names = catalog.get("/Names")
+        if names is not None and "/Dests" in names.get_object():
+            dests += len(name_tree_items(names.get_object()["/Dests"]))
+        return int(reader.trailer["/Size"]) + dests
+    except Exception:
+        return 0
+
+def write_fragment(paths, fragment_path, first_num, limit=None, first_index=0):
+    """Copy the pages of `paths` into a headerless fragment file (a worker process in parallel mode).
+
+    first_index is the merge position of paths[0]; it numbers the inputs' destination prefixes.
+    """
+    result = {"pages": [], "dests": [], "skipped": [], "rss_peak_mb": rss_mb()}
+    with open(fragment_path, "wb") as out:
+        writer = StreamingPdfWriter(out, first_num, limit)
+        for index, path in enumerate(paths, first_index):
+            try:
+                reader = PdfReader(path)
+                if reader.is_encrypted:
+                    raise ValueError("encrypted")
+                if not len(reader.pages):
+                    raise ValueError("no pages")
+                pages, dests = writer.append(reader, dest_prefix(index))
+                result["pages"].append(pages)
+                result["dests"].extend(dests)
+            except OverflowError:
+                raise
+            except Exception as e:
+                result["pages"].append([])
+                result["skipped"].append({"path": path, "error": f"{type(e).__name__}: {e}"})
+            finally:
+                reader = None
+            rss = rss_mb()
+            if rss is not None: result["rss_peak_mb"] = max(result["rss_peak_mb"] or 0, rss)
+    result["offsets"] = writer.offsets
+    result["next_num"] = writer.next_num
+    return result
+
+def split_fragments(paths, root_dir, count):
+    """Cut the ordered inputs into about `count` contiguous runs, only between top-level folders."""
+    groups = []
+    for path in paths:
+        top = os.path.relpath(path, root_dir).split(os.sep)[0]
+        if groups and groups[-1][0] == top:
+            groups[-1][1].append(path)
+        else:
+            groups.append((top, [path]))
+
+    target = max(1, -(-len(paths) // count))
+    fragments = [[]]
+    for top, group in groups:
+        if fragments[-1] and len(fragments[-1]) + len(group) > target:
+            fragments.append([])
+        fragments[-1].extend(group)
+    return fragments
+
+# ------------------------------------------------------------------
+# OUTLINE (bookmarks from the crawl hierarchy)
+# ------------------------------------------------------------------
+def build_outline(entries, page_nums, root_dir, titles):
+    """Nested {title, page, children} nodes mirroring the output folders.
+
+    Folder titles come from `titles` (folder path -> sidebar title), page titles
+    from the entries. A folder's 000_ intro page is the folder's own bookmark.
+    """
+    root = {"children": [], "folders": {}}
+    for (path, title), nums in zip(entries, page_nums):
+        if not nums: continue
+        parts = os.path.relpath(path, root_dir).split(os.sep)
+        node, folder = root, root_dir
+        for part in parts[:-1]:
+            folder = os.path.join(folder, part)
+            if part not in node["folders"]:
+                child = {"title": titles.get(folder) or title_from_name(part), "page": nums[0], "children": [], "folders": {}}
+                node["folders"][part] = child
+                node["children"].append(child)
+            node = node["folders"][part]
+        if parts[-1].startswith("000_") and node is not root:
+            continue
+        node["children"].append({"title": title or title_from_name(parts[-1]), "page": nums[0], "children": [], "folders": {}})
+    return root["children"]
+
+def count_outline(nodes):
+    return sum(1 + count_outline(node["children"]) for node in nodes)
+
+def write_outline(writer, nodes):
+    """Write the outline items (collapsed) and return the /Outlines dictionary's object number."""
+    outlines = writer.allocate()
+    items = [] # (node, num, parent, prev, next, kids)
+
+    def number(level, parent):
+        nums = [writer.allocate() for _ in level]
+        for i, (node, num) in enumerate(zip(level, nums)):
+            prev = nums[i - 1] if i else None
+            nxt = nums[i + 1] if i + 1 < len(nums) else None
+            items.append((node, num, parent, prev, nxt, number(node["children"], num)))
+        return nums
+
+    top = number(nodes, outlines)
+    for node, num, parent, prev, nxt, kids in items:
+        item = DictionaryObject({
+            NameObject("/Title"): TextStringObject(node["title"]),
+            NameObject("/Parent"): IndirectObject(parent, 0, None),
+            NameObject("/Dest"): ArrayObject([IndirectObject(node["page"], 0, None), NameObject("/Fit")]),
+        })
+        if prev: item[NameObject("/Prev")] = IndirectObject(prev, 0, None)
+        if nxt: item[NameObject("/Next")] = IndirectObject(nxt, 0, None)
+        if kids:
+            item[NameObject("/First")] = IndirectObject(kids[0], 0, None)
+            item[NameObject("/Last")] = IndirectObject(kids[-1], 0, None)
+            item[NameObject("/Count")] = NumberObject(-len(kids)) # negative = closed
+        writer.write_object(num, item)
+
+    writer.write_object(outlines, DictionaryObject({
+        NameObject("/Type"): NameObject("/Outlines"),
+        NameObject("/First"): IndirectObject(top[0], 0, None),
+        NameObject("/Last"): IndirectObject(top[-1], 0, None),
+        NameObject("/Count"): NumberObject(len(top)),
+    }))
+    return outlines
+
+def finish_document(writer, kids, outlines=None, dests=None):
+    """Write the page tree root and the catalog (objects 1 and 2); dests is the /Dests name tree root."""
+    writer.write_object(PAGES_ROOT, DictionaryObject({
+        NameObject("/Type"): NameObject("/Pages"),
+        NameObject("/Kids"): ArrayObject(IndirectObject(n, 0, None) for n in kids),
+        NameObject("/Count"): NumberObject(len(kids))}))
+    catalog = DictionaryObject({NameObject("/Type"): NameObject("/Catalog"),
+                                NameObject("/Pages"): IndirectObject(PAGES_ROOT, 0, None)})
+    if outlines:
+        catalog[NameObject("/Outlines")] = IndirectObject(outlines, 0, None)
+        catalog[NameObject("/PageMode")] = NameObject("/UseOutlines")
+    if dests:
+        catalog[NameObject("/Names")] = DictionaryObject({NameObject("/Dests"): IndirectObject(dests, 0, None)})
+    writer.write_object(CATALOG, catalog)
+
+def write_xref(out, offsets):
+    """Classic xref table with one subsection per run of consecutive object numbers."""
+    xref = out.tell()
+    nums = sorted(offsets)
+    runs = []
+    for num in nums:
+        if runs and num == runs[-1][-1] + 1:
+            runs[-1].append(num)
+        else:
+            runs.append([num])
+    out.write(b"xref\n0 1\n0000000000 65535 f \n")
+    for run in runs:
+        out.write(f"{run[0]} {len(run)}\n".encode())
+        out.write("".join(f"{offsets[num]:010d} 00000 n \n" for num in run).encode())
+    out.write(f"trailer\n<< /Size {nums[-1] + 1} /Root {CATALOG} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+# ------------------------------------------------------------------
+# POST-MERGE OPTIMIZATION (shared resources)
+# ------------------------------------------------------------------
+# Every page.pdf embeds its own copy of the same logos, icons and font
+# programs, and the per-input merge keeps them all. This pass re-copies the
+# merged file once through a writer that hashes every stream (after its
+# references are renumbered) and keeps a single object per distinct stream,
+# and Flate-compresses streams that have no filter. It streams page by page
+# and drops the reader's object cache as it goes, so memory stays bounded.
+
+def optimize_pdf(path):
+    """Rewrite path in place with duplicate streams shared and unfiltered streams compressed."""
+    started = time.time()
+    before = os.path.getsize(path)
+    tmp = path + ".optimizing"
+    reader = PdfReader(path)
+    with open(tmp, "wb") as out:
+        out.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+        writer = StreamingPdfWriter(out, dedupe=True, compress=True)
+        copier = ObjectCopier(writer, reader)
+        kids = copier.copy_pages(release=True)
+        outlines = reader.trailer["/Root"].get("/Outlines")
+        if outlines is not None:
+            outlines = copier.copy(outlines).idnum
+            copier.drain()
+        dests = copier.copy_dests() # already prefixed by the merge
+        finish_document(writer, kids, outlines, write_dest_tree(writer, dests) if dests else None)
+        write_xref(out, writer.offsets)
+    reader = None
+    os.replace(tmp, path)
+
+    after = os.path.getsize(path)
+    return dict(writer.stats, before_mb=round(before / 1024 / 1024, 2), after_mb=round(after / 1024 / 1024, 2),
+                saved_pct=round(100 * (before - after) / before, 1) if before else 0, seconds=round(time.time() - started, 2))
+
+# ------------------------------------------------------------------
+# MERGE
+# ------------------------------------------------------------------
+def merge_pdfs(root_dir, output_file, report_path=None, entries=None, titles=None, workers=0, optimize=False):
+    """Merge the page PDFs into output_file, with bookmarks that follow the folder tree.
+
+    entries: [(path, title)] in merge order (the crawl work list); defaults to
+    every PDF under root_dir sorted by path. titles: folder path -> sidebar title.
+    workers > 1 copies fragments in that many processes. optimize runs
+    optimize_pdf() on the result.
+    """
+    if entries is None:
+        entries = [(path, None) for path in find_pdfs(root_dir)]
+    entries = [(path, title) for path, title in entries if os.path.exists(path)]
+    if not entries: return None
+    print(f"\n📦 Merging {len(entries)} pages into {output_file}...")
+
+    started = time.time()
+    rss_start = rss_mb()
+    paths = [path for path, _ in entries]
+    fragments = split_fragments(paths, root_dir, workers * 2) if workers > 1 else [paths]
+    tmp_dir = tempfile.mkdtemp(prefix="merge_", dir=os.path.dirname(os.path.abspath(output_file)))
+    try:
+        firsts = [sum(len(frag) for frag in fragments[:n]) for n in range(len(fragments))]
+        results = None
+        if len(fragments) > 1:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                bounds = list(executor.map(object_bound, paths, chunksize=32))
+                starts = [FIRST_OBJECT]
+                for n, frag in enumerate(fragments):
+                    starts.append(starts[-1] + sum(bounds[firsts[n]:firsts[n] + len(frag)]) + 1)
+                tasks = [(frag, os.path.join(tmp_dir, f"{n:04d}.frag"), starts[n], starts[n + 1], firsts[n])
+                         for n, frag in enumerate(fragments)]
+                if starts[-1] < MAX_OBJECTS:
+                    try:
+                        results = list(executor.map(write_fragment, *zip(*tasks)))
+                    except OverflowError as e:
+                        print(f"⚠️ {e}, merging in one process instead")
+        if results is None:
+            fragments = [paths]
+            tasks = [(paths, os.path.join(tmp_dir, "0000.frag"), FIRST_OBJECT, None, 0)]
+            results = [write_fragment(*tasks[0])]
+
+        # Combine: header + fragments byte for byte, then outline, page tree, catalog and xref
+        with open(output_file, "wb") as out:
+            out.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+            offsets = {}
+            for task, result in zip(tasks, results):
+                base = out.tell()
+                with open(task[1], "rb") as f:
+                    shutil.copyfileobj(f, out, 1024 * 1024)
+                offsets.update((num, base + off) for num, off in result["offsets"].items())
+
+            page_nums = [nums for result in results for nums in result["pages"]]
+            kids = [num for nums in page_nums for num in nums]
+            tail = StreamingPdfWriter(out, max(result["next_num"] for result in results))
+
+            nodes = build_outline(entries, page_nums, root_dir, titles or {})
+            outlines = write_outline(tail, nodes) if nodes else None
+            dests = [dest for result in results for dest in result["dests"]]
+            finish_document(tail, kids, outlines, write_dest_tree(tail, dests) if dests else None)
+            offsets.update(tail.offsets)
+            write_xref(out, offsets)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    peaks = [r["rss_peak_mb"] for r in results if r["rss_peak_mb"] is not None]
+    report = {"inputs": len(entries), "merged": sum(1 for nums in page_nums if nums), "pages": len(kids),
+              "skipped": [item for r in results for item in r["skipped"]], "bookmarks": count_outline(nodes), "destinations": len(dests),
+              "fragments": len(fragments), "processes": min(workers, len(fragments)) if len(fragments) > 1 else 1,
+              "seconds": round(time.time() - started, 2),
+              "output_mb": round(os.path.getsize(output_file) / 1024 / 1024, 2),
+              "rss_start_mb": round(rss_start, 1) if rss_start is not None else None,
+              "rss_peak_mb": round(max(peaks), 1) if peaks else None}
+    if optimize:
+        print("🗜️ Sharing duplicate fonts/images and compressing streams...")
+        report["optimize"] = optimize_pdf(output_file)
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"✅ Created Combined PDF: {output_file}")
+    print(f"   {report['pages']} pages from {report['merged']} files, {report['bookmarks']} bookmarks, {report['destinations']} named destinations, {report['output_mb']} MB "
+          f"in {report['seconds']}s on {report['processes']} process(es)"
+          + (f", peak RSS {report['rss_peak_mb']} MB per process" if report["rss_peak_mb"] is not None else ""))
+    if optimize:
+        opt = report["optimize"]
+        print(f"   Optimized: {opt['before_mb']} MB -> {opt['after_mb']} MB (-{opt['saved_pct']}%) in {opt['seconds']}s, "
+              f"{opt['deduped']} duplicate streams shared, {opt['compressed']} streams compressed")
+    if report["skipped"]:
+        print(f"⚠️ Skipped {len(report['skipped'])} unreadable inputs" + (f" (see {report_path})" if report_path else "") + ":")
+        for item in report["skipped"][:10]:
+            print(f"   ❌ {item['path']}: {item['error']}")
+    return report
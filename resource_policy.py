@@ -0,0 +1,146 @@
+import fnmatch
+from urllib.parse import urlparse
+
+# ------------------------------------------------------------------
+# REQUEST INTERCEPTION (page.route resource policy)
+# ------------------------------------------------------------------
+# Decision order for every request:
+#   1. type in allow_types              -> allowed (e.g. the page itself)
+#   2. host in deny_hosts               -> blocked
+#   3. type in deny_types               -> blocked
+#   4. allow_hosts set, host not in it  -> blocked (strict first-party mode)
+#   5. otherwise                        -> allowed
+# Hosts are fnmatch patterns ("*.onetrust.com"). Types are Playwright
+# resource types: document, stylesheet, image, media, font, script,
+# texttrack, xhr, fetch, eventsource, websocket, manifest, ping, other.
+#
+# Allowed requests go to route.fallback(), not continue_(), so a handler
+# registered earlier (e.g. the record/replay archive) still sees them; with
+# no other handler it behaves like continue_().
+#
+# Note: Playwright turns off the browser HTTP cache while routing is on, so
+# stylesheets/scripts are fetched per page. On the Esri sites that is still
+# far cheaper than waiting for consent/analytics beacons to go idle.
+#
+# Blocked requests are counted per host and per reason only (bounded, no
+# query strings), and the report never contacts a blocked URL. So the bytes a
+# blocked request would have cost are not known; what is measured is the
+# bytes the allowed requests actually transferred (request.sizes() on
+# "requestfinished": response headers + body as received).
+
+# Consent, analytics, tag managers and survey/feedback widgets seen on
+# enterprise.arcgis.com, pro.arcgis.com and esri.github.io
+ESRI_DENY_HOSTS = [
+    "cdn.cookielaw.org", "*.cookielaw.org", "*.onetrust.com", "*.onetrust.io",
+    "assets.adobedtm.com", "*.omtrdc.net", "*.demdex.net", "*.everesttech.net",
+    "www.googletagmanager.com", "www.google-analytics.com", "*.google-analytics.com", "*.doubleclick.net",
+    "*.qualtrics.com", "*.hotjar.com", "*.clarity.ms", "bat.bing.com",
+    "connect.facebook.net", "snap.licdn.com", "px.ads.linkedin.com", "*.twitter.com",
+    "js-agent.newrelic.com", "bam.nr-data.net", "*.mouseflow.com", "*.optimizely.com",
+    "metrics.esri.com", "smetrics.esri.com", "*.metrics.esri.com",
+]
+
+# Strict mode only: the docs themselves plus the Esri CDNs that serve their CSS and Calcite components
+ESRI_ALLOW_HOSTS = [
+    "enterprise.arcgis.com", "pro.arcgis.com", "doc.arcgis.com", "developers.arcgis.com",
+    "esri.github.io", "js.arcgis.com", "*.esri.com", "*.arcgis.com",
+]
+
+# Print output does not need these. Web fonts are the only visible change:
+# PDFs fall back to the system sans-serif.
+ESRI_DENY_TYPES = ["font", "media", "websocket", "eventsource", "manifest", "texttrack", "ping"]
+
+def host_matches(host, patterns):
+    return any(fnmatch.fnmatch(host, p) for p in patterns)
+
+class ResourcePolicy:
+    """Allow/deny requests by resource type and host, counting what was blocked."""
+
+    def __init__(self, deny_hosts=(), allow_hosts=(), deny_types=(), allow_types=()):
+        self.deny_hosts = list(deny_hosts)
+        self.allow_hosts = list(allow_hosts)
+        self.deny_types = set(deny_types)
+        self.allow_types = set(allow_types)
+        self.stats = {"allowed": 0, "blocked": 0, "blocked_hosts": {}, "blocked_by": {}, "finished": 0, "loaded_bytes": 0}
+
+    @classmethod
+    def esri_docs(cls, strict=False):
+        return cls(deny_hosts=ESRI_DENY_HOSTS, allow_hosts=ESRI_ALLOW_HOSTS if strict else (),
+                   deny_types=ESRI_DENY_TYPES, allow_types=["document"])
+
+    def decide(self, url, resource_type):
+        """Return the reason a request is blocked, or None to let it through."""
+        if resource_type in self.allow_types:
+            return None
+        host = (urlparse(url).hostname or "").lower()
+        if not host:
+            return None # data:, blob:, about:
+        if host_matches(host, self.deny_hosts):
+            return f"host:{host}"
+        if resource_type in self.deny_types:
+            return f"type:{resource_type}"
+        if self.allow_hosts and not host_matches(host, self.allow_hosts):
+            return f"host:{host}"
+        return None
+
+    def _record(self, url, reason):
+        if reason is None:
+            self.stats["allowed"] += 1
+            return
+        self.stats["blocked"] += 1
+        host = (urlparse(url).hostname or "").lower()
+        self.stats["blocked_hosts"][host] = self.stats["blocked_hosts"].get(host, 0) + 1
+        self.stats["blocked_by"][reason] = self.stats["blocked_by"].get(reason, 0) + 1
+
+    def _loaded(self, sizes):
+        self.stats["finished"] += 1
+        self.stats["loaded_bytes"] += max(0, sizes.get("responseHeadersSize", 0)) + max(0, sizes.get("responseBodySize", 0))
+
+    # -- sync API ---------------------------------------------------
+    def attach(self, target):
+        """Install on a sync Page or BrowserContext."""
+        def handle(route):
+            reason = self.decide(route.request.url, route.request.resource_type)
+            self._record(route.request.url, reason)
+            if reason: route.abort()
+            else: route.fallback()
+        def finished(request):
+            try: self._loaded(request.sizes())
+            except Exception: pass # page or context already closed
+        target.route("**/*", handle)
+        target.on("requestfinished", finished)
+
+    # -- async API --------------------------------------------------
+    async def attach_async(self, target):
+        """Install on an async Page or BrowserContext."""
+        async def handle(route):
+            reason = self.decide(route.request.url, route.request.resource_type)
+            self._record(route.request.url, reason)
+            if reason: await route.abort()
+            else: await route.fallback()
+        async def finished(request):
+            try: self._loaded(await request.sizes())
+            except Exception: pass # page or context already closed
+        await target.route("**/*", handle)
+        target.on("requestfinished", finished)
+
+    # -- reporting --------------------------------------------------
+    def merge(self, stats):
+        """Fold in the stats of another policy instance (e.g. from a worker process)."""
+        for key in ("allowed", "blocked", "finished", "loaded_bytes"):
+            self.stats[key] += stats.get(key, 0)
+        for key in ("blocked_hosts", "blocked_by"):
+            for k, v in stats[key].items():
+                self.stats[key][k] = self.stats[key].get(k, 0) + v
+
+    def report(self):
+        total = self.stats["allowed"] + self.stats["blocked"]
+        if not total: return
+        print(f"\n🛡️ Resource Policy: blocked {self.stats['blocked']} of {total} requests ({self.stats['blocked'] / total:.0%}) "
+              f"on {len(self.stats['blocked_hosts'])} hosts")
+        if self.stats["finished"]:
+            print(f"   {self.stats['loaded_bytes'] / 1024 / 1024:.1f} MB transferred by {self.stats['finished']} allowed requests "
+                  f"(blocked requests are never fetched, so their size is not known)")
+        top = sorted(self.stats["blocked_by"].items(), key=lambda kv: kv[1], reverse=True)[:10]
+        for reason, count in top:
+            print(f"   {count:6d}  {reason}")
@@ -0,0 +1,189 @@
+import os
+import sys
+import time
+import sqlite3
+from markdown_export import hierarchy_of
+
+# ------------------------------------------------------------------
+# FULL-TEXT SEARCH INDEX (SQLite FTS5, built while rendering)
+# ------------------------------------------------------------------
+# print_page already has every page loaded and cleaned up (details opened,
+# header injected, print CSS applied). Right before page.pdf one evaluate
+# reads the visible text of the same content container, the H1 and the
+# breadcrumbs, and the row is queued here: no extra navigation.
+#
+# Rows are written in batches (one transaction per BATCH pages) into one
+# database shared by every printer, each tagged with its site, so the
+# Enterprise, Pro and Cookbook crawls can be searched together. A page is
+# keyed by URL: re-rendering it replaces its row, and finish() drops pages
+# of that site that are no longer in the plan.
+#
+# Query from the command line:
+#   python search_index.py "portal federation"
+#   python search_index.py --site 05Pro_ArcPyReference --limit 5 'arcpy.da NEAR/5 cursor'
+# The query is FTS5 syntax: words, "phrases", prefix*, AND/OR/NOT, NEAR, column:term.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,  -- rowid of the page in pages_fts
+    url TEXT UNIQUE NOT NULL,
+    site TEXT NOT NULL,
+    path TEXT,
+    indexed REAL
+);
+CREATE INDEX IF NOT EXISTS pages_site ON pages (site);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(title, breadcrumbs, hierarchy, body, tokenize='porter unicode61');
+"""
+
+# bm25 weights per column: title, breadcrumbs, hierarchy, body
+RANK_WEIGHTS = (10.0, 2.0, 4.0, 1.0)
+
+# Visible text of the printed content (without the breadcrumb copy HEADER_INJECT_JS put on top)
+PAGE_TEXT_JS = """(selectors) => {
+    let content = selectors.map(s => document.querySelector(s)).find(Boolean) || document.body;
+    let text = content.innerText;
+    let injected = content.querySelector('.injected-breadcrumb');
+    if (injected) text = text.replace(injected.innerText, '');
+
+    let h1 = content.querySelector('h1') || document.querySelector('h1');
+    let nav = document.querySelector('nav.breadcrumbs:not(.injected-breadcrumb)');
+    let crumbs = [];
+    if (nav) {
+        let items = nav.querySelectorAll('.crumb');
+        crumbs = Array.from(items.length ? items : nav.querySelectorAll('a')).map(a => a.textContent.trim()).filter(Boolean);
+    }
+    return {title: h1 ? h1.innerText.trim() : '', breadcrumbs: crumbs, text: text.trim()};
+}"""
+
+class SearchIndex:
+    """Batched FTS5 index of rendered pages, for one site in a shared database."""
+
+    BATCH = 50
+
+    def __init__(self, path, site, content_selectors=("main",)):
+        self.path = path
+        self.site = site
+        self.content_selectors = list(content_selectors)
+        self.root = None
+        self.titles = {} # folder path -> sidebar title, for the hierarchy column
+        self.pending = []
+        self.stats = {"indexed": 0, "batches": 0, "chars": 0, "seconds": 0.0}
+        self._db = None
+        self._pid = None
+
+    @property
+    def db(self):
+        # One connection per process (spawned shard workers open their own)
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._db
+
+    def set_plan(self, root_dir, titles):
+        """Folder titles of the current plan, used to build each page's hierarchy path."""
+        self.root = root_dir
+        self.titles = dict(titles)
+
+    # -- capture (called from print_page) -----------------------------
+    def capture(self, pg, url, path, title):
+        self.add(url, path, title, pg.evaluate(PAGE_TEXT_JS, self.content_selectors))
+
+    async def capture_async(self, pg, url, path, title):
+        self.add(url, path, title, await pg.evaluate(PAGE_TEXT_JS, self.content_selectors))
+
+    def add(self, url, path, title, page):
+        hierarchy = hierarchy_of(path, self.root, self.titles, title) if self.root else [title]
+        self.pending.append((url.split('#')[0], path, page["title"] or title, " > ".join(page["breadcrumbs"]),
+                             " > ".join(hierarchy), page["text"]))
+        if len(self.pending) >= self.BATCH:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        started = time.time()
+        rows, self.pending = self.pending, []
+        db = self.db
+        with db:
+            db.execute("BEGIN")
+            for url, path, title, crumbs, hierarchy, body in rows:
+                row = db.execute("SELECT id FROM pages WHERE url = ?", (url,)).fetchone()
+                if row:
+                    db.execute("DELETE FROM pages_fts WHERE rowid = ?", row)
+                    db.execute("UPDATE pages SET site = ?, path = ?, indexed = ? WHERE id = ?", (self.site, path, time.time(), row[0]))
+                    page_id = row[0]
+                else:
+                    page_id = db.execute("INSERT INTO pages (url, site, path, indexed) VALUES (?, ?, ?, ?)",
+                                         (url, self.site, path, time.time())).lastrowid
+                db.execute("INSERT INTO pages_fts (rowid, title, breadcrumbs, hierarchy, body) VALUES (?, ?, ?, ?, ?)",
+                           (page_id, title, crumbs, hierarchy, body))
+        self.stats["indexed"] += len(rows)
+        self.stats["batches"] += 1
+        self.stats["chars"] += sum(len(row[-1]) for row in rows)
+        self.stats["seconds"] += time.time() - started
+
+    def finish(self, urls=None):
+        """Flush, and when urls is given drop this site's pages that are not among them."""
+        self.flush()
+        if urls is None:
+            return
+        keep = {url.split('#')[0] for url in urls}
+        db = self.db
+        stale = [row for row in db.execute("SELECT id, url FROM pages WHERE site = ?", (self.site,)) if row[1] not in keep]
+        with db:
+            db.execute("BEGIN")
+            db.executemany("DELETE FROM pages_fts WHERE rowid = ?", [(row[0],) for row in stale])
+            db.executemany("DELETE FROM pages WHERE id = ?", [(row[0],) for row in stale])
+        self.stats["pruned"] = len(stale)
+
+    # -- reporting --------------------------------------------------
+    def merge(self, stats):
+        """Fold in the stats of another index instance (e.g. from a worker process)."""
+        for key in ("indexed", "batches", "chars", "seconds"):
+            self.stats[key] += stats[key]
+
+    def report(self):
+        total = self.db.execute("SELECT COUNT(*) FROM pages WHERE site = ?", (self.site,)).fetchone()[0]
+        print(f"\n🔎 Search index: {self.stats['indexed']} pages indexed in {self.stats['batches']} batches "
+              f"({self.stats['chars'] / 1024 / 1024:.1f} MB text, {self.stats['seconds']:.1f}s), "
+              f"{total} pages of '{self.site}' in {self.path}"
+              + (f", {self.stats['pruned']} stale removed" if self.stats.get("pruned") else ""))
+
+def search(db_path, query, site=None, limit=20):
+    """[(site, title, hierarchy, url, snippet)] best match first."""
+    db = sqlite3.connect(db_path)
+    sql = f"""SELECT p.site, pages_fts.title, pages_fts.hierarchy, p.url,
+                     snippet(pages_fts, 3, '[', ']', ' … ', 16)
+              FROM pages_fts JOIN pages p ON p.id = pages_fts.rowid
+              WHERE pages_fts MATCH ? {"AND p.site = ?" if site else ""}
+              ORDER BY bm25(pages_fts, {", ".join(map(str, RANK_WEIGHTS))}) LIMIT ?"""
+    try:
+        return db.execute(sql, (query, site, limit) if site else (query, limit)).fetchall()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    args = sys.argv[1:]
+    options = {"--db": "docs_search.db", "--site": None, "--limit": "20"}
+    for name in options:
+        if name in args:
+            at = args.index(name)
+            options[name] = args[at + 1]
+            del args[at:at + 2]
+    if not args:
+        print("usage: python search_index.py [--db docs_search.db] [--site NAME] [--limit N] QUERY")
+        sys.exit(2)
+
+    started = time.time()
+    try:
+        results = search(options["--db"], " ".join(args), options["--site"], int(options["--limit"]))
+    except sqlite3.OperationalError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    for n, (site, title, hierarchy, url, snippet) in enumerate(results, 1):
+        print(f"{n:2d}. {title}  [{site}]\n    {hierarchy}\n    {url}\n    {' '.join(snippet.split())}\n")
+    print(f"🔎 {len(results)} results in {(time.time() - started) * 1000:.1f} ms")
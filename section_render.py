@@ -0,0 +1,89 @@
+import os
+from pypdf import PdfReader, PdfWriter
+
+# ------------------------------------------------------------------
+# SECTION RENDERING (one page.pdf per folder)
+# ------------------------------------------------------------------
+# Every page normally costs its own Chromium print job (layout + PDF
+# serialization). In section mode the pages of a folder are still loaded and
+# prepared one after the other (navigation, <details>, injected header, print
+# CSS, search capture), but instead of printing each one, only the prepared
+# content container is kept (CAPTURE_JS: links and images made absolute).
+# After the last page of the batch, its own container is replaced by all of
+# them (ASSEMBLE_JS), each in an anchored <section id="pdf-section-N"> that
+# starts on a new sheet, and the batch is printed with a single page.pdf.
+#
+# Chromium writes a named destination for every element id, so the section
+# PDF is cut back at those anchors into the per-page files the plan, --resume,
+# the incremental manifest and the merge bookmarks are keyed by. A batch whose
+# anchors can't be read is printed page by page instead.
+#
+#   for batch in section_batches(jobs, 50):
+#       parts = [capture(job) for job in batch]
+#       page.evaluate(ASSEMBLE_JS, [selectors, parts]); page.pdf(path=tmp)
+#       split_section(tmp, [job['path'] for job in batch])
+
+SECTION_ID = "pdf-section-{}"
+SECTION_FILE = "~section.pdf" # the batch PDF, next to the page PDFs until it is cut
+
+CAPTURE_JS = """(selectors) => {
+    let content = selectors.map(s => document.querySelector(s)).find(Boolean) || document.body;
+    content.querySelectorAll('a[href]').forEach(a => a.setAttribute('href', a.href));
+    content.querySelectorAll('img').forEach(img => {
+        if (img.currentSrc || img.src) img.setAttribute('src', img.currentSrc || img.src);
+        img.removeAttribute('srcset');
+        img.removeAttribute('loading');
+    });
+    return content.innerHTML;
+}"""
+
+# Resolves once every image of the assembled document has loaded or failed (at most 10s)
+ASSEMBLE_JS = """async ([selectors, parts]) => {
+    let content = selectors.map(s => document.querySelector(s)).find(Boolean) || document.body;
+    content.innerHTML = parts.map((html, n) =>
+        `<section class="pdf-section" id="pdf-section-${n}" style="display: block; break-before: ${n ? 'page' : 'auto'};">${html}</section>`
+    ).join('');
+    let pending = [...content.querySelectorAll('img')].filter(img => !img.complete)
+        .map(img => new Promise(resolve => { img.onload = img.onerror = resolve; }));
+    await Promise.race([Promise.all(pending), new Promise(resolve => setTimeout(resolve, 10000))]);
+    return content.querySelectorAll('section.pdf-section').length;
+}"""
+
+def section_batches(jobs, limit):
+    """Consecutive jobs of the same folder, at most limit per batch (work-list order is kept)."""
+    batch = []
+    for job in jobs:
+        if batch and (os.path.dirname(job['path']) != os.path.dirname(batch[0]['path']) or len(batch) >= limit):
+            yield batch
+            batch = []
+        batch.append(job)
+    if batch:
+        yield batch
+
+def section_starts(reader, count):
+    """Index of the first PDF page of each section, or None when an anchor is missing or out of order."""
+    dests = reader.named_destinations # /Dests dictionary keys (Chromium's) keep their leading slash
+    starts = []
+    for n in range(count):
+        name = SECTION_ID.format(n)
+        dest = dests.get(name) or dests.get("/" + name)
+        if dest is None:
+            return None
+        starts.append(reader.get_destination_page_number(dest))
+    if not starts or starts[0] != 0 or any(b <= a for a, b in zip(starts, starts[1:])):
+        return None
+    return starts
+
+def split_section(section_pdf, paths):
+    """Cut section_pdf at its section anchors into one PDF per path; False (nothing written) when it can't."""
+    reader = PdfReader(section_pdf)
+    starts = section_starts(reader, len(paths))
+    if starts is None:
+        return False
+    bounds = starts + [len(reader.pages)]
+    for path, start, end in zip(paths, bounds, bounds[1:]):
+        writer = PdfWriter()
+        for number in range(start, end):
+            writer.add_page(reader.pages[number])
+        writer.write(path)
+    return True
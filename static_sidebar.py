@@ -0,0 +1,519 @@
+import re
+import gzip
+import zlib
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+# ------------------------------------------------------------------
+# BROWSER-FREE SIDEBAR DISCOVERY
+# ------------------------------------------------------------------
+# The aside.js-accordion sidebar on the Enterprise and Pro sites (and the
+# calcite-tree on the Cookbook) is server-rendered, so discovery can run on
+# plain HTTP + Python parsing. The parsers below are ports of the in-page
+# scripts in full_site_printer.py ("site") and arcgis_pro_printer.py
+# ("pro"), returning the same item dicts.
+# Chromium is then only needed for rendering.
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+# ------------------------------------------------------------------
+# HTTP (keep-alive connection pool)
+# ------------------------------------------------------------------
+class Response:
+    def __init__(self, url, status, headers, body):
+        self.url = url # final URL after redirects
+        self.status = status
+        self.headers = headers # lower-cased names
+        self.body = body
+
+    @property
+    def text(self):
+        charset = re.search(r'charset=([\w-]+)', self.headers.get("content-type", ""))
+        return self.body.decode(charset.group(1) if charset else "utf-8", errors="replace")
+
+class HttpPool:
+    """Keep-alive HTTP(S) connections: one per host per thread, reused across requests."""
+
+    def __init__(self, timeout=30, headers=None):
+        self.timeout = timeout
+        self.headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"}
+        self.headers.update(headers or {})
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "connections": 0, "bytes": 0}
+
+    def _connection(self, scheme, host, fresh=False):
+        conns = self.local.__dict__.setdefault("conns", {})
+        if fresh or (scheme, host) not in conns:
+            if (scheme, host) in conns:
+                conns[(scheme, host)].close()
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conns[(scheme, host)] = cls(host, timeout=self.timeout)
+            with self.lock: self.stats["connections"] += 1
+        return conns[(scheme, host)]
+
+    def request(self, url, method="GET", headers=None, max_redirects=5):
+        for _ in range(max_redirects + 1):
+            parts = urlsplit(url)
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            hdrs = dict(self.headers, **(headers or {}))
+            for attempt in range(2):
+                conn = self._connection(parts.scheme, parts.netloc, fresh=attempt > 0)
+                try:
+                    conn.request(method, path, headers=hdrs)
+                    resp = conn.getresponse()
+                    body = resp.read()
+                    break
+                except (http.client.RemoteDisconnected, http.client.CannotSendRequest, ConnectionResetError, BrokenPipeError):
+                    # Server dropped an idle keep-alive connection: reconnect once
+                    if attempt: raise
+            resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+            with self.lock:
+                self.stats["requests"] += 1
+                self.stats["bytes"] += len(body)
+
+            if resp.status in (301, 302, 303, 307, 308) and "location" in resp_headers:
+                url = urljoin(url, resp_headers["location"])
+                continue
+
+            encoding = resp_headers.get("content-encoding", "")
+            if encoding == "gzip":
+                body = gzip.decompress(body)
+            elif encoding == "deflate":
+                body = zlib.decompress(body)
+            return Response(url, resp.status, resp_headers, body)
+        raise RuntimeError(f"Too many redirects: {url}")
+
+    def get_text(self, url):
+        resp = self.request(url)
+        if resp.status >= 400:
+            raise RuntimeError(f"HTTP {resp.status} for {url}")
+        return resp.text, resp.url
+
+    def close(self):
+        for conn in self.local.__dict__.get("conns", {}).values():
+            conn.close()
+
+# ------------------------------------------------------------------
+# MINIMAL DOM (just enough of Element for the parseNode ports)
+# ------------------------------------------------------------------
+VOID_TAGS = {"AREA", "BASE", "BR", "COL", "EMBED", "HR", "IMG", "INPUT", "LINK", "META", "SOURCE", "TRACK", "WBR"}
+SKIP_TEXT = {"SCRIPT", "STYLE", "TEMPLATE", "NOSCRIPT"}
+
+class Element:
+    __slots__ = ("tag", "attrs", "nodes", "parent")
+
+    def __init__(self, tag, attrs=None, parent=None):
+        self.tag = tag # upper case, like Element.tagName
+        self.attrs = attrs or {}
+        self.nodes = [] # child Elements and text strings, in order
+        self.parent = parent
+
+    @property
+    def children(self):
+        return [n for n in self.nodes if isinstance(n, Element)]
+
+    @property
+    def classes(self):
+        return self.attrs.get("class", "").split()
+
+    def has_class(self, name):
+        return name in self.classes
+
+    def has_attr(self, name):
+        return name in self.attrs
+
+    def iter(self):
+        """Descendants in document order (not including self)."""
+        stack = list(reversed(self.children))
+        while stack:
+            el = stack.pop()
+            yield el
+            stack.extend(reversed(el.children))
+
+    def find(self, pred):
+        return next((el for el in self.iter() if pred(el)), None)
+
+    def find_all(self, pred):
+        return [el for el in self.iter() if pred(el)]
+
+    def closest(self, pred):
+        el = self
+        while el is not None:
+            if pred(el): return el
+            el = el.parent
+        return None
+
+    def direct_child(self, tag):
+        return next((c for c in self.children if c.tag == tag), None)
+
+    def text_content(self):
+        if self.tag in SKIP_TEXT: return ""
+        return "".join(n if isinstance(n, str) else n.text_content() for n in self.nodes)
+
+    def inner_text(self):
+        # Static stand-in for innerText: textContent with whitespace collapsed
+        return re.sub(r"\s+", " ", self.text_content()).strip()
+
+    def own_text(self):
+        return "".join(n for n in self.nodes if isinstance(n, str))
+
+def by_class(name):
+    return lambda el: el.has_class(name)
+
+def by_tag(tag):
+    return lambda el: el.tag == tag
+
+class DomBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element("#document")
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        tag = tag.upper()
+        # <li> implicitly closes an open <li> of the same list
+        if tag == "LI":
+            for i in range(len(self.stack) - 1, 0, -1):
+                if self.stack[i].tag in ("UL", "OL"): break
+                if self.stack[i].tag == "LI":
+                    del self.stack[i:]
+                    break
+        el = Element(tag, {k: (v if v is not None else "") for k, v in attrs}, self.stack[-1])
+        self.stack[-1].nodes.append(el)
+        if tag not in VOID_TAGS:
+            self.stack.append(el)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag.upper() not in VOID_TAGS:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        tag = tag.upper()
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].nodes.append(data)
+
+def parse_html(html):
+    builder = DomBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+# ------------------------------------------------------------------
+# parseNode PORTS
+# ------------------------------------------------------------------
+def link_item(a, base_url):
+    is_collapsed = a.has_attr("data-collapsed") or a.has_class("icon-ui-right")
+    return {"type": "link", "title": a.inner_text(), "url": href(a, base_url), "is_collapsed": is_collapsed}
+
+def href(a, base_url):
+    # Same as the DOM `a.href` property: absolute, "" when missing
+    return urljoin(base_url, a.attrs["href"]) if "href" in a.attrs else ""
+
+# ------------------------------------------------------------------
+# FLAT NODE TABLE (parseNode in one pass)
+# ------------------------------------------------------------------
+# TREE_PARSER_JS in both printers no longer returns the nested tree: it
+# emits one row per item, [parent, kind, title, url, flags] in document
+# order (parent = row index, -1 = top level), and the tree is nested here by
+# tree_from_rows(). sidebar_rows() is the same engine over the static DOM.
+#   link       {type: link, title, url, is_collapsed}
+#   group      an LI link with children, or a calcite group titled by its own
+#              link (the folder's landing page) {type: group, title, url, children}
+#   section    a site accordion section / untitled-link calcite group {type: group, title, children}
+#   accordion  a Pro accordion section, + needs_expansion (url = its data-url fragment)
+# A section or accordion drops direct children that repeat its own title,
+# the same filter parseNode applied to its subItems.
+
+COLLAPSED, NEEDS_EXPANSION = 1, 2
+SECTION_KINDS = ("section", "accordion")
+
+# Lookups parseNode did with child.querySelector(); indexed once, bottom-up
+FIRST_MATCHES = {"title": by_class("accordion-title"), "h3": by_tag("H3"), "h4": by_tag("H4"),
+                 "content": by_class("accordion-content"), "tree": by_tag("CALCITE-TREE")}
+
+def first_descendants(root, preds=FIRST_MATCHES):
+    """{element: {key: first descendant in document order matching preds[key]}} for root and everything under it."""
+    memo = {}
+    def visit(el):
+        found = {}
+        for child in el.children:
+            sub = visit(child)
+            for key, pred in preds.items():
+                if key not in found:
+                    if pred(child): found[key] = child
+                    elif key in sub: found[key] = sub[key]
+        memo[el] = found
+        return found
+    visit(root)
+    return memo
+
+def sidebar_rows(root, base_url, variant="site"):
+    """Flat node table of the sidebar under root (port of TREE_PARSER_JS in full_site_printer / arcgis_pro_printer)."""
+    first = first_descendants(root)
+    rows = []
+    kept = [] # per row: direct children that survive the section title filter
+
+    def counts(parent, title):
+        return parent >= 0 and not (rows[parent][1] in SECTION_KINDS and rows[parent][2] == title)
+
+    def push(parent, kind, title, url="", flags=0):
+        rows.append([parent, kind, title, url, flags])
+        kept.append(0)
+        if counts(parent, title): kept[parent] += 1
+        return len(rows) - 1
+
+    def truncate(mark):
+        # Undo a tentative group and everything emitted under it
+        parent, _, title, _, _ = rows[mark]
+        if counts(parent, title): kept[parent] -= 1
+        del rows[mark:], kept[mark:]
+
+    def link_flags(a):
+        return COLLAPSED if a.has_attr("data-collapsed") or a.has_class("icon-ui-right") else 0
+
+    def walk(node, parent):
+        for child in node.children:
+            # SKIP Headers
+            if child.has_class("accordion-title") or child.tag in ("H3", "H4"): continue
+
+            # CASE 1: GROUP (Accordion/Header Container, Calcite Group)
+            found = first[child]
+            header = found.get("title") or found.get("h3") or found.get("h4")
+            is_section = child.has_class("accordion-section")
+            if variant == "pro":
+                if is_section or (header and "content" in found):
+                    fragment = urljoin(base_url, child.attrs["data-url"]) if child.has_attr("data-url") else ""
+                    gid = push(parent, "accordion", (header or child).inner_text(), fragment)
+                    walk(found.get("content") or child, gid)
+                    needs_expansion = bool(fragment) or (not kept[gid] and is_section)
+                    if kept[gid] or needs_expansion:
+                        rows[gid][4] = NEEDS_EXPANSION if needs_expansion else 0
+                        continue
+                    truncate(gid)
+            else:
+                is_calcite_group = child.tag == "CALCITE-TREE-ITEM" and child.has_attr("has-children")
+                if is_section or header or is_calcite_group:
+                    landing = None
+                    if is_calcite_group:
+                        title = child.own_text().strip()
+                        if not title:
+                            # Titled by its own link: a folder with a landing page
+                            landing = child.direct_child("A")
+                            if landing: title = landing.inner_text()
+                    else:
+                        title = (header or child).inner_text()
+                    if landing:
+                        gid = push(parent, "group", title, href(landing, base_url))
+                    else:
+                        gid = push(parent, "section", title)
+                    walk(found.get("content") or found.get("tree") or child, gid)
+                    if kept[gid] or is_section or is_calcite_group:
+                        continue
+                    truncate(gid)
+
+            # CASE 2: LI WRAPPER (OR CALCITE LEAF)
+            if child.tag == "LI" or (variant == "site" and child.tag == "CALCITE-TREE-ITEM" and not child.has_attr("has-children")):
+                link = child.direct_child("A")
+                if not link:
+                    walk(child, parent)
+                    continue
+                gid = push(parent, "group", link.inner_text(), href(link, base_url))
+                for c in child.children:
+                    if c is not link: walk(c, gid)
+                if not kept[gid]:
+                    rows[gid][1], rows[gid][4] = "link", link_flags(link)
+                continue
+
+            # CASE 3: FLATTEN WRAPPERS
+            if child.tag in ("NAV", "DIV", "UL") or (variant == "site" and child.tag == "CALCITE-TREE"):
+                walk(child, parent)
+                continue
+
+            # CASE 4: LOOSE LINK
+            if child.tag == "A":
+                push(parent, "link", child.inner_text(), href(child, base_url), link_flags(child))
+
+    walk(root, -1)
+    return rows
+
+def tree_from_rows(rows):
+    """Nested sidebar items (the dicts parseNode used to return) from a flat node table."""
+    top = []
+    lists = {-1: top} # row -> its children list; rows dropped by the title filter have none
+    for n, (parent, kind, title, url, flags) in enumerate(rows):
+        siblings = lists.get(parent)
+        if siblings is None or (parent >= 0 and rows[parent][1] in SECTION_KINDS and rows[parent][2] == title):
+            continue
+        if kind == "link":
+            siblings.append({"type": "link", "title": title, "url": url, "is_collapsed": bool(flags & COLLAPSED)})
+            continue
+        item = {"type": "group", "title": title}
+        if kind == "group": item["url"] = url
+        item["children"] = lists[n] = []
+        if kind == "accordion":
+            item["needs_expansion"] = bool(flags & NEEDS_EXPANSION)
+            if url: item["fragment_url"] = url
+        siblings.append(item)
+    return top
+
+def parse_section_pro(node, base_url):
+    """Port of the section parseNode() inside arcgis_pro_printer.ACTIVE_CHILDREN_JS."""
+    items = []
+    for child in node.children:
+        if child.tag in ("H1", "H2", "H3", "H4", "H5") or child.has_class("accordion-title"): continue
+        if child.has_class("accordion-section"):
+            items.extend(parse_section_pro(child.find(by_class("accordion-content")) or child, base_url))
+            continue
+        if child.tag == "LI":
+            link = child.direct_child("A")
+            if link: items.append(link_item(link, base_url))
+            for c in child.children:
+                if c.tag in ("UL", "DIV"): items.extend(parse_section_pro(c, base_url))
+            continue
+        if child.tag in ("NAV", "DIV", "UL"):
+            items.extend(parse_section_pro(child, base_url))
+            continue
+        if child.tag == "A":
+            items.append(link_item(child, base_url))
+    return items
+
+def sidebar_root(doc, variant):
+    root = doc.find(lambda el: el.tag == "ASIDE" and el.has_class("js-accordion"))
+    if root is None and variant == "site":
+        panel = doc.find(lambda el: el.has_class("shell-panel"))
+        toc = panel.find(by_class("toc")) if panel else None
+        root = (toc.find(by_tag("CALCITE-TREE")) if toc else None) or doc.find(by_tag("CALCITE-TREE"))
+    return root
+
+def find_active_link(doc, url):
+    # Server HTML may not carry .is-active (the accordion script sets it), so
+    # fall back to the sidebar link pointing at the page itself. Deepest wins.
+    root = sidebar_root(doc, "site") or doc
+    links = root.find_all(by_tag("A"))
+    active = [a for a in links if a.has_class("is-active")]
+    if not active:
+        target = url.split('#')[0]
+        active = [a for a in links if href(a, url).split('#')[0] == target]
+    return active[-1] if active else None
+
+def link_depth(a, scope):
+    """Nesting depth of a sidebar link without layout: aria-level, else the lists (ul / ol / role=group) around it."""
+    holder = a.closest(lambda el: el is scope or el.has_attr("aria-level"))
+    if holder is not None and holder.has_attr("aria-level"):
+        try: return int(holder.attrs["aria-level"])
+        except ValueError: pass
+    depth, el = 0, a.parent
+    while el is not None and el is not scope:
+        if el.tag in ("UL", "OL") or el.attrs.get("role") == "group": depth += 1
+        el = el.parent
+    return depth
+
+def is_hidden(el):
+    return el.closest(lambda e: e.has_attr("hidden") or e.attrs.get("aria-hidden") == "true"
+                      or re.search(r"display:\s*none", e.attrs.get("style", ""))) is not None
+
+JS_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+
+def js_unescape(body):
+    def sub(m):
+        esc = m.group(1)
+        if esc[0] in "ux": return chr(int(esc[1:], 16))
+        return JS_ESCAPES.get(esc, esc)
+    return re.sub(r'\\(u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|.)', sub, body, flags=re.S)
+
+def js_string_html(source):
+    """Pull the HTML out of a sidebar fragment .js file (string literals that contain tags)."""
+    if source.lstrip().startswith("<"):
+        return source
+    literals = re.findall(r'(["\'`])((?:\\.|(?!\1).)*)\1', source, re.S)
+    return "".join(js_unescape(body) for _, body in literals if "<" in body)
+
+class StaticSidebar:
+    """Discovery source that fetches and parses pages over HTTP instead of driving Chromium."""
+
+    def __init__(self, variant="site", pool=None):
+        self.variant = variant # "site" (Enterprise/Cookbook) or "pro"
+        self.pool = pool or HttpPool()
+        self.last_wait = "ready" # a fetch has no readiness wait (same attribute as BrowserSidebar)
+
+    def _doc(self, url):
+        html, final_url = self.pool.get_text(url)
+        return parse_html(html), final_url
+
+    def tree(self, url):
+        doc, base = self._doc(url)
+        root = sidebar_root(doc, self.variant)
+        if root is None: return []
+        return tree_from_rows(sidebar_rows(root, base, self.variant))
+
+    def lazy_children(self, url):
+        doc, base = self._doc(url)
+        if self.variant == "pro":
+            return self._pro_active_children(doc, base)
+        return self._site_active_children(doc, base)
+
+    def group_children(self, item):
+        """Children of a lazy Pro accordion group, read straight from its fragment file."""
+        if not item.get("fragment_url"): return []
+        source, base = self.pool.get_text(item["fragment_url"])
+        doc = parse_html(js_string_html(source))
+        content = doc.find(by_class("accordion-content")) or doc.find(by_tag("NAV")) or doc
+        return [link_item(a, base) for a in content.find_all(by_tag("A"))]
+
+    def expand_groups(self, items, workers=8):
+        """Children of every lazy Pro group in items, fragments fetched concurrently: {title: children}."""
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            children = list(pool.map(self.group_children, items))
+        groups = {}
+        for item, links in zip(items, children):
+            groups.setdefault(item["title"], links) # first group with that title, like the browser
+        return groups
+
+    def _site_active_children(self, doc, base):
+        # 1. Active item promoted to a section header
+        header = doc.find(lambda el: el.has_class("accordion-title") and (el.has_class("is-active") or (el.parent is not None and el.parent.has_class("accordion-section") and el.parent.has_class("is-active"))))
+        if header:
+            section = header.closest(by_class("accordion-section"))
+            content = section.find(by_class("accordion-content")) if section else None
+            if content:
+                return [link_item(a, base) for a in content.find_all(by_tag("A"))]
+
+        # 2. Links after the active one in its section that sit deeper (same
+        # structural rule as ACTIVE_CHILDREN_JS; there is no layout to fall back on)
+        link = find_active_link(doc, base)
+        if link is None: return []
+        scope = link.closest(by_class("accordion-section")) or link.closest(by_class("js-accordion")) or sidebar_root(doc, "site")
+        if scope is None: return []
+        links = [a for a in scope.iter() if a.tag == "A"]
+        active_depth = link_depth(link, scope)
+        items = []
+        for a in links[links.index(link) + 1:]:
+            if is_hidden(a): continue
+            if link_depth(a, scope) <= active_depth: break
+            items.append(link_item(a, base))
+        if items: return items
+
+        # 3. Links in the container right after the active link (Link + Nav pattern)
+        siblings = link.parent.children if link.parent else []
+        i = siblings.index(link)
+        nxt = siblings[i + 1] if i + 1 < len(siblings) else None
+        if nxt is not None and nxt.tag in ("NAV", "UL", "DIV"):
+            return [link_item(a, base) for a in nxt.find_all(by_tag("A"))]
+        return []
+
+    def _pro_active_children(self, doc, base):
+        active = doc.find(by_class("is-active")) or find_active_link(doc, base)
+        if active is None: return []
+        container = active.closest(by_class("accordion-content")) or active.closest(by_class("accordion-section"))
+        if container is None: container = active.parent
+        return parse_section_pro(container, base) if container is not None else []
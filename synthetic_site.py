@@ -0,0 +1,252 @@
+import sys
+import math
+import random
+import threading
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ------------------------------------------------------------------
+# SYNTHETIC DOCS SITE (offline benchmarks)
+# ------------------------------------------------------------------
+# A generated documentation site with the sidebar markup the printers and
+# static_sidebar.py parse, served from memory (pages are rendered per request,
+# so 20,000 pages cost no disk):
+#   site      aside.js-accordion sections (.accordion-title + nav.accordion-content),
+#             lazy folders as a[data-collapsed] whose children only appear,
+#             nested and indented, on the folder's own pages
+#   pro       the same accordion, every third section lazy: data-url points at
+#             a .js fragment that accordion.js loads when its title is clicked
+#   cookbook  shell-panel .toc calcite-tree with has-children items, the whole
+#             tree on every page (the large-sidebar case), hydrated by script
+# Every page has breadcrumbs, a hero-banner H1 (header.trailer-1 for site and
+# cookbook) and body content with lists, code, a table and <details>.
+#
+#   python synthetic_site.py --variant pro --pages 2000 --port 8123
+
+WORDS = ("portal server federation layer service feature map scene raster vector geodatabase enterprise "
+         "workflow deployment license cluster tile cache schema domain subtype relationship attribute "
+         "query spatial reference projection python toolbox cursor geometry extent symbology").split()
+
+SITE_CSS = """
+body { font-family: sans-serif; margin: 0; }
+aside.js-accordion, .shell-panel { float: left; width: 280px; }
+ul, calcite-tree[slot="children"] { padding-left: 16px; }
+calcite-tree, calcite-tree-item { display: block; }
+main, .column-17, .column-19 { margin-left: 300px; }
+.hero { background: #eee; padding: 24px; }
+"""
+
+ACCORDION_JS = """
+window.sidebarFragment = function (id, html) {
+    let section = document.querySelector('.accordion-section[data-fragment="' + id + '"]');
+    if (!section) return;
+    let content = section.querySelector('.accordion-content');
+    content.innerHTML = html;
+    content.style.display = 'block';
+};
+document.addEventListener('click', function (e) {
+    let title = e.target.closest('.accordion-title');
+    if (!title) return;
+    let section = title.closest('.accordion-section');
+    let content = section.querySelector('.accordion-content');
+    if (section.dataset.url && !content.querySelector('a')) {
+        let script = document.createElement('script');
+        script.src = section.dataset.url;
+        document.head.appendChild(script);
+        return;
+    }
+    content.style.display = content.style.display === 'none' ? 'block' : 'none';
+});
+"""
+
+class SyntheticSite:
+    """Page tree of one generated site and the HTML for each of its URLs."""
+
+    def __init__(self, variant="site", pages=1000, seed=0, paragraphs=6, lazy_share=0.7):
+        if variant not in ("site", "pro", "cookbook"):
+            raise ValueError(f"unknown variant {variant!r}")
+        self.variant = variant
+        self.seed = seed
+        self.paragraphs = paragraphs
+        self.pages = {} # id -> {title, section, folder, children}
+        self.sections = [] # [{title, entries: [page ids]}]; an entry with children is a lazy folder
+        self._build(pages, lazy_share)
+
+    # -- structure --------------------------------------------------
+    def _title(self, rng, n):
+        return " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(2, 4))) + f" {n}"
+
+    def _page(self, rng, section, folder=None):
+        pid = len(self.pages) + 1
+        self.pages[pid] = {"title": self._title(rng, pid), "section": section, "folder": folder, "children": []}
+        return pid
+
+    def _build(self, total, lazy_share):
+        rng = random.Random(self.seed)
+        sections = max(2, min(60, round(math.sqrt(total) / 2)))
+        per_section = total / sections
+        folder_size = max(5, min(200, round(math.sqrt(per_section) * 2)))
+        for s in range(sections):
+            quota = round(per_section * (s + 1)) - round(per_section * s)
+            section = {"title": f"{self._title(rng, s + 1)} Guide", "entries": []}
+            self.sections.append(section)
+            folders = int(quota * lazy_share) // (folder_size + 1)
+            for _ in range(folders):
+                landing = self._page(rng, s)
+                section["entries"].append(landing)
+                for _ in range(folder_size):
+                    self.pages[landing]["children"].append(self._page(rng, s, landing))
+            for _ in range(quota - folders * (folder_size + 1)):
+                section["entries"].append(self._page(rng, s))
+            rng.shuffle(section["entries"])
+
+    def url(self, pid):
+        return f"/docs/p{pid:05d}.htm"
+
+    @property
+    def start_path(self):
+        # A plain page: a folder landing would show its children in the start tree
+        return self.url(next(pid for pid in self.sections[0]["entries"] if not self.pages[pid]["children"]))
+
+    def is_lazy_section(self, s):
+        return self.variant == "pro" and s % 3 == 1
+
+    # -- sidebar ----------------------------------------------------
+    def _li(self, pid, current):
+        page = self.pages[pid]
+        active = ' class="is-active"' if pid == current else ""
+        if not page["children"]:
+            return f'<li><a href="{self.url(pid)}"{active}>{escape(page["title"])}</a></li>'
+        link = f'<a href="{self.url(pid)}" data-collapsed="true"{active}>{escape(page["title"])}</a>'
+        if current != pid and self.pages.get(current, {}).get("folder") != pid:
+            return f"<li>{link}</li>"
+        kids = "".join(self._li(child, current) for child in page["children"])
+        return f"<li>{link}<ul>{kids}</ul></li>"
+
+    def section_links(self, s, current=None):
+        return "<ul>" + "".join(self._li(pid, current) for pid in self.sections[s]["entries"]) + "</ul>"
+
+    def _accordion(self, current):
+        own = self.pages[current]["section"] if current else None
+        parts = []
+        for s, section in enumerate(self.sections):
+            title = f'<h4 class="accordion-title">{escape(section["title"])}</h4>'
+            if self.is_lazy_section(s) and s != own:
+                parts.append(f'<div class="accordion-section" data-url="/fragments/s{s:03d}.js" data-fragment="s{s:03d}">{title}'
+                             f'<nav class="accordion-content" style="display:none"></nav></div>')
+            else:
+                parts.append(f'<div class="accordion-section">{title}'
+                             f'<nav class="accordion-content">{self.section_links(s, current)}</nav></div>')
+        return f'<aside class="js-accordion">{"".join(parts)}</aside>'
+
+    def _calcite_item(self, pid, current):
+        page = self.pages[pid]
+        link = f'<a href="{self.url(pid)}"{" class=is-active" if pid == current else ""}>{escape(page["title"])}</a>'
+        if not page["children"]:
+            return f"<calcite-tree-item>{link}</calcite-tree-item>"
+        kids = "".join(self._calcite_item(child, current) for child in page["children"])
+        return f'<calcite-tree-item has-children>{link}<calcite-tree slot="children">{kids}</calcite-tree></calcite-tree-item>'
+
+    def _calcite(self, current):
+        items = "".join(f'<calcite-tree-item has-children>{escape(section["title"])}<calcite-tree slot="children">'
+                        + "".join(self._calcite_item(pid, current) for pid in section["entries"])
+                        + "</calcite-tree></calcite-tree-item>" for section in self.sections)
+        return f'<div class="shell-panel"><div class="toc"><calcite-tree>{items}</calcite-tree></div></div>'
+
+    def fragment(self, s):
+        """Pro lazy group fragment: a script that hands the group's links to accordion.js."""
+        html = self.section_links(s).replace("\\", "\\\\").replace('"', '\\"')
+        return f'sidebarFragment("s{s:03d}", "{html}");\n'
+
+    # -- pages ------------------------------------------------------
+    def _body(self, pid):
+        rng = random.Random(self.seed * 100003 + pid)
+        words = lambda n: " ".join(rng.choice(WORDS) for _ in range(n))
+        parts = [f"<h2>Overview</h2>"]
+        parts += [f"<p>{words(rng.randint(40, 90))}.</p>" for _ in range(self.paragraphs)]
+        parts.append("<h2>Steps</h2><ol>" + "".join(f"<li>{words(8)}</li>" for _ in range(5)) + "</ol>")
+        parts.append(f'<pre><code class="language-python">import arcpy\nfor row in arcpy.da.SearchCursor("{words(1)}", ["{words(1)}"]):\n    print(row)</code></pre>')
+        parts.append("<table><tr><th>Parameter</th><th>Type</th><th>Description</th></tr>"
+                     + "".join(f"<tr><td>{words(1)}</td><td>String</td><td>{words(12)}</td></tr>" for _ in range(4)) + "</table>")
+        parts.append(f"<details><summary>More about {words(2)}</summary><p>{words(60)}.</p></details>")
+        return "".join(parts)
+
+    def page_html(self, pid):
+        page = self.pages[pid]
+        section = self.sections[page["section"]]
+        crumbs = ['<a class="crumb" href="/">Docs</a>', f'<a class="crumb">{escape(section["title"])}</a>']
+        if page["folder"]:
+            crumbs.append(f'<a class="crumb" href="{self.url(page["folder"])}">{escape(self.pages[page["folder"]]["title"])}</a>')
+        breadcrumbs = f'<nav class="breadcrumbs">{"".join(crumbs)}</nav>'
+        title = escape(page["title"])
+
+        if self.variant == "pro":
+            sidebar = self._accordion(pid)
+            content = f'<div class="column-19" role="main">{breadcrumbs}<h1>{title}</h1>{self._body(pid)}</div>'
+        else:
+            sidebar = self._accordion(pid) if self.variant == "site" else self._calcite(pid)
+            content = (f'<header class="trailer-1"><div class="hero"><h1>{title}</h1></div></header>'
+                       f'{breadcrumbs}<main class="column-17">{self._body(pid)}</main>')
+        hydrate = "<script>document.querySelectorAll('calcite-tree').forEach(t => t.setAttribute('calcite-hydrated', ''))</script>" \
+                  if self.variant == "cookbook" else ""
+        return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>'
+                f'<link rel="stylesheet" href="/site.css"><script src="/accordion.js"></script></head>'
+                f'<body><header class="site-header">Synthetic Docs</header>{sidebar}{content}'
+                f'<footer class="esri-footer">footer</footer>{hydrate}</body></html>')
+
+    def resolve(self, path):
+        """(status, content type, body) for a request path."""
+        path = path.split("?")[0].split("#")[0]
+        if path == "/":
+            path = self.start_path
+        if path == "/site.css":
+            return 200, "text/css", SITE_CSS
+        if path == "/accordion.js":
+            return 200, "application/javascript", ACCORDION_JS
+        if path.startswith("/fragments/s") and path.endswith(".js"):
+            s = int(path[len("/fragments/s"):-3])
+            if s < len(self.sections): return 200, "application/javascript", self.fragment(s)
+        if path.startswith("/docs/p") and path.endswith(".htm"):
+            pid = int(path[len("/docs/p"):-4])
+            if pid in self.pages: return 200, "text/html", self.page_html(pid)
+        return 404, "text/plain", "not found"
+
+# ------------------------------------------------------------------
+# SERVER
+# ------------------------------------------------------------------
+def serve(site, port=0):
+    """Serve site on 127.0.0.1 from a daemon thread; returns (server, base URL)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # keep-alive, like the real sites (and HttpPool)
+
+        def do_GET(self):
+            status, content_type, body = site.resolve(self.path)
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {"--variant": "site", "--pages": "1000", "--port": "8123", "--seed": "0"}
+    for name in options:
+        if name in args:
+            options[name] = args[args.index(name) + 1]
+    site = SyntheticSite(options["--variant"], int(options["--pages"]), seed=int(options["--seed"]))
+    server, base = serve(site, int(options["--port"]))
+    print(f"🧪 {site.variant}: {len(site.pages)} pages in {len(site.sections)} sections, start at {base}{site.start_path}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
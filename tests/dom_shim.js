@@ -0,0 +1,180 @@
+// Just enough of the browser DOM to run the printers' in-page sidebar
+// scripts in node, so tests can compare them with the static_sidebar ports.
+//
+//   node dom_shim.js <input.json>
+//   input: {dom: {t, a, n}, script, arg, base, indent}
+//
+// dom is the static_sidebar.parse_html() tree (t = tag, a = attributes,
+// n = child nodes, strings for text). There is no CSS: an element is hidden
+// when it or an ancestor has [hidden], aria-hidden="true" or display: none in
+// its style attribute, and getBoundingClientRect().left is `indent` px per
+// ul / ol / calcite-tree[slot=children] around the element, the way the docs
+// sites' sidebar CSS indents nested lists, plus any padding-left / margin-left
+// px in the style attributes of the element and its ancestors.
+const fs = require('fs');
+
+global.Node = {ELEMENT_NODE: 1, TEXT_NODE: 3};
+global.NodeFilter = {SHOW_ELEMENT: 1, FILTER_ACCEPT: 1, FILTER_REJECT: 2, FILTER_SKIP: 3};
+
+// -- selectors ---------------------------------------------------------------
+function splitTop(text, sep) {
+    let parts = [], depth = 0, quote = null, current = '';
+    for (let ch of text) {
+        if (quote) { if (ch === quote) quote = null; }
+        else if (ch === '"' || ch === "'") quote = ch;
+        else if (ch === '[' || ch === '(') depth++;
+        else if (ch === ']' || ch === ')') depth--;
+        else if (ch === sep && depth === 0) { parts.push(current); current = ''; continue; }
+        current += ch;
+    }
+    parts.push(current);
+    return parts;
+}
+
+function parseCompound(text) {
+    let compound = {tag: null, scope: false, classes: [], attrs: []};
+    let re = /^(\*|[a-zA-Z][\w-]*)|\.([\w-]+)|\[([\w-]+)(?:([*^$]?=)["']?([^"'\]]*)["']?)?\]|(:scope)/g;
+    let m;
+    while ((m = re.exec(text)) && m[0]) {
+        if (m[1]) compound.tag = m[1] === '*' ? null : m[1].toUpperCase();
+        else if (m[2]) compound.classes.push(m[2]);
+        else if (m[3]) compound.attrs.push({name: m[3], op: m[4], value: m[5]});
+        else if (m[6]) compound.scope = true;
+    }
+    return compound;
+}
+
+function parseSelector(selector) {
+    return splitTop(selector, ',').map(part => {
+        let tokens = [];
+        for (let chunk of splitTop(part.trim().replace(/\s*>\s*/g, ' > '), ' ')) if (chunk) tokens.push(chunk);
+        let steps = [], combinator = ' ';
+        for (let token of tokens) {
+            if (token === '>') { combinator = '>'; continue; }
+            steps.push({combinator, compound: parseCompound(token)});
+            combinator = ' ';
+        }
+        return steps;
+    });
+}
+
+function matchesCompound(el, c, scope) {
+    if (c.scope && el !== scope) return false;
+    if (c.tag && el.tagName !== c.tag) return false;
+    for (let name of c.classes) if (!el.classList.contains(name)) return false;
+    for (let a of c.attrs) {
+        let value = el.getAttribute(a.name);
+        if (value === null) return false;
+        if (a.op === '=' && value !== a.value) return false;
+        if (a.op === '*=' && !value.includes(a.value)) return false;
+        if (a.op === '^=' && !value.startsWith(a.value)) return false;
+        if (a.op === '$=' && !value.endsWith(a.value)) return false;
+    }
+    return true;
+}
+
+function matchesSteps(el, steps, i, scope) {
+    if (!matchesCompound(el, steps[i].compound, scope)) return false;
+    if (i === 0) return true;
+    if (steps[i].combinator === '>') return !!el.parentElement && matchesSteps(el.parentElement, steps, i - 1, scope);
+    for (let up = el.parentElement; up; up = up.parentElement) {
+        if (matchesSteps(up, steps, i - 1, scope)) return true;
+    }
+    return false;
+}
+
+function matches(el, selector, scope) {
+    return parseSelector(selector).some(steps => matchesSteps(el, steps, steps.length - 1, scope));
+}
+
+// -- nodes -------------------------------------------------------------------
+class Text {
+    constructor(text, parent) { this.nodeType = 3; this.textContent = text; this.parentElement = parent; }
+}
+
+class Element {
+    constructor(json, parent, doc) {
+        this.nodeType = 1;
+        this.tagName = json.t;
+        this.attrs = Object.assign({}, json.a);
+        this.parentElement = parent;
+        this.ownerDocument = doc;
+        this.childNodes = json.n.map(n => typeof n === 'string' ? new Text(n, this) : new Element(n, this, doc));
+        this.children = this.childNodes.filter(n => n.nodeType === 1);
+        this.classList = {contains: name => (this.attrs['class'] || '').split(/\s+/).includes(name)};
+    }
+    get nextElementSibling() {
+        if (!this.parentElement) return null;
+        let siblings = this.parentElement.children;
+        return siblings[siblings.indexOf(this) + 1] || null;
+    }
+    get textContent() {
+        if (['SCRIPT', 'STYLE', 'TEMPLATE'].includes(this.tagName)) return '';
+        return this.childNodes.map(n => n.textContent).join('');
+    }
+    get innerText() { return this.hidden() ? '' : this.textContent.replace(/\s+/g, ' ').trim(); }
+    get href() { return 'href' in this.attrs ? new URL(this.attrs.href, this.ownerDocument.base).href : ''; }
+    get offsetParent() { return this.hidden() ? null : this.parentElement; }
+    hidden() {
+        return !!this.closest('[hidden], [aria-hidden="true"], [style*="display: none"], [style*="display:none"]');
+    }
+    hasAttribute(name) { return name in this.attrs; }
+    getAttribute(name) { return name in this.attrs ? this.attrs[name] : null; }
+    setAttribute(name, value) { this.attrs[name] = String(value); }
+    matches(selector) { return matches(this, selector, this); }
+    closest(selector) {
+        for (let el = this; el; el = el.parentElement) if (matches(el, selector, el)) return el;
+        return null;
+    }
+    contains(other) {
+        for (let el = other; el; el = el.parentElement) if (el === this) return true;
+        return false;
+    }
+    *descendants() { for (let c of this.children) { yield c; yield* c.descendants(); } }
+    querySelectorAll(selector) { return [...this.descendants()].filter(el => matches(el, selector, this)); }
+    querySelector(selector) {
+        for (let el of this.descendants()) if (matches(el, selector, this)) return el;
+        return null;
+    }
+    getBoundingClientRect() {
+        let left = 0;
+        for (let el = this; el; el = el.parentElement) {
+            if (el !== this && (el.tagName === 'UL' || el.tagName === 'OL' || (el.tagName === 'CALCITE-TREE' && el.getAttribute('slot') === 'children'))) {
+                left += this.ownerDocument.indent;
+            }
+            for (let m of (el.getAttribute('style') || '').matchAll(/(?:padding|margin)-left:\s*(\d+)px/g)) left += Number(m[1]);
+        }
+        return {left, right: left + 200, top: 0, bottom: 20, width: 200, height: 20};
+    }
+}
+
+class TreeWalker {
+    constructor(root, filter) { this.root = root; this.filter = filter; this.currentNode = root; }
+    accepts(el) {
+        let f = this.filter && (this.filter.acceptNode || this.filter);
+        return !f || f(el) === NodeFilter.FILTER_ACCEPT;
+    }
+    nextNode() {
+        let order = [...this.root.descendants()];
+        for (let i = order.indexOf(this.currentNode) + 1; i < order.length; i++) {
+            if (this.accepts(order[i])) return (this.currentNode = order[i]);
+        }
+        return null;
+    }
+}
+
+function makeDocument(json, base, indent) {
+    let doc = {base, indent};
+    let root = new Element(json, null, doc);
+    doc.documentElement = root;
+    doc.body = root.querySelector('body') || root;
+    doc.querySelector = selector => root.querySelector(selector);
+    doc.querySelectorAll = selector => root.querySelectorAll(selector);
+    doc.createTreeWalker = (start, whatToShow, filter) => new TreeWalker(start, filter);
+    return doc;
+}
+
+const input = JSON.parse(fs.readFileSync(process.argv[2], 'utf8'));
+global.document = makeDocument(input.dom, input.base, input.indent === undefined ? 16 : input.indent);
+const fn = eval('(' + input.script + ')');
+Promise.resolve(fn(input.arg)).then(out => process.stdout.write(JSON.stringify(out)));
@@ -0,0 +1,78 @@
+// full_site_printer.ACTIVE_CHILDREN_JS as it was before children were found
+// from the DOM structure: indentation only. Kept as the reference output for
+// tests/test_active_children.py.
+() => {
+    let items = [];
+    
+    // 1. Try to find if active item is now a HEADER (Accordion Title)
+    // In some views, clicking a link promotes it to a section header.
+    let activeHeader = document.querySelector('.accordion-title.is-active, .accordion-section.is-active > .accordion-title');
+    if (activeHeader) {
+        let section = activeHeader.closest('.accordion-section');
+        let content = section.querySelector('.accordion-content');
+        if (content) {
+            content.querySelectorAll('a').forEach(a => {
+                 let isCollapsed = a.hasAttribute('data-collapsed') || a.classList.contains('icon-ui-right');
+                 items.push({ type: 'link', title: a.innerText.trim(), url: a.href, is_collapsed: isCollapsed });
+            });
+            return items;
+        }
+    }
+
+    // 2. Standard Link: Check for Indented Siblings
+    // FIX: Select the DEEPEST active link, not just the first one.
+    let allActive = Array.from(document.querySelectorAll('aside.js-accordion a.is-active'));
+    let activeLink = allActive[allActive.length - 1]; // Last one is deepest
+    
+    if (!activeLink) return [];
+    
+    let activeRect = activeLink.getBoundingClientRect();
+    let activeLeft = activeRect.left;
+    
+    // Get all links in the sidebar
+    let allLinks = Array.from(document.querySelectorAll('aside.js-accordion a'));
+    let startIndex = allLinks.indexOf(activeLink);
+    
+    if (startIndex === -1) return [];
+    
+    // Scan forward
+    for (let i = startIndex + 1; i < allLinks.length; i++) {
+        let link = allLinks[i];
+        
+        // Skip if hidden
+        if (link.offsetParent === null) continue;
+        
+        let linkRect = link.getBoundingClientRect();
+        
+        // HEURISTIC: Indentation > Active Link Indentation (+ margin)
+        // Or if it's in a strictly nested container (UL inside LI)
+        
+        let isNested = (linkRect.left > activeLeft + 2); // At least 2px indented
+        let isSameGroup = (link.closest('.accordion-section') === activeLink.closest('.accordion-section'));
+        
+        // If we hit a new section, stop
+        if (!isSameGroup) break;
+        
+        if (isNested) {
+            let isCollapsed = link.hasAttribute('data-collapsed') || link.classList.contains('icon-ui-right');
+            items.push({ type: 'link', title: link.innerText.trim(), url: link.href, is_collapsed: isCollapsed });
+        } else {
+            // Returned to same level or higher -> Stop
+            break;
+        }
+    }
+    
+    // 3. Fallback: Check for immediate sibling container (Link + Nav pattern)
+    // This catches the case where indentation might be subtle but DOM is structurally clear
+    if (items.length === 0) {
+         let siblingNav = activeLink.nextElementSibling;
+         if (siblingNav && ['NAV','UL','DIV'].includes(siblingNav.tagName)) {
+             siblingNav.querySelectorAll('a').forEach(a => {
+                 let isCollapsed = a.hasAttribute('data-collapsed') || a.classList.contains('icon-ui-right');
+                 items.push({ type: 'link', title: a.innerText.trim(), url: a.href, is_collapsed: isCollapsed });
+             });
+         }
+    }
+    
+    return items;
+}
@@ -0,0 +1 @@
+sidebarFragment("s001", "<ul><li><a href=\"/analysis/buffer.htm\">Buffer</a></li><li><a href=\"/analysis/clip.htm\">Clip — \"vector\"</a><ul><li><a href=\"/analysis/clip-raster.htm\">Clip raster</a></li></ul></li></ul>");
@@ -0,0 +1,32 @@
+import os
+import json
+import shutil
+import tempfile
+import subprocess
+
+import pytest
+
+from static_sidebar import Element, parse_html
+
+SHIM = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dom_shim.js")
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+needs_node = pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+
+def fixture_html(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+def dom_json(el):
+    return {"t": el.tag, "a": el.attrs, "n": [dom_json(n) if isinstance(n, Element) else n for n in el.nodes]}
+
+def run_page_script(script, html, base_url, arg=None, indent=16):
+    """Evaluate an in-page script against html in node (tests/dom_shim.js) and return its result."""
+    payload = {"dom": dom_json(parse_html(html)), "script": script, "arg": arg, "base": base_url, "indent": indent}
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+        json.dump(payload, f)
+    try:
+        out = subprocess.run(["node", SHIM, f.name], capture_output=True, text=True, check=True, timeout=60)
+    finally:
+        os.remove(f.name)
+    return json.loads(out.stdout)
@@ -0,0 +1,59 @@
+import pytest
+
+import arcgis_pro_printer
+import full_site_printer
+from page_scripts import fixture_html, needs_node, run_page_script
+from static_sidebar import StaticSidebar, parse_html, parse_section_pro
+
+BASE = "https://enterprise.arcgis.com/en/server/latest/"
+
+NESTED_LISTS = [
+    {"type": "link", "title": "Prerequisites", "url": BASE + "install/windows/prereqs.htm", "is_collapsed": False},
+    {"type": "link", "title": "Silent install", "url": BASE + "install/windows/silent.htm", "is_collapsed": False},
+    {"type": "link", "title": "Command-line options", "url": BASE + "install/windows/silent-options.htm", "is_collapsed": True},
+    {"type": "link", "title": "Accounts", "url": BASE + "install/windows/accounts.htm", "is_collapsed": False},
+]
+ARIA_LEVEL = [
+    {"type": "link", "title": "Configure HTTPS", "url": BASE + "admin/https.htm", "is_collapsed": False},
+    {"type": "link", "title": "Certificates", "url": BASE + "admin/certificates.htm", "is_collapsed": True},
+    {"type": "link", "title": "SAML", "url": BASE + "admin/saml.htm", "is_collapsed": False},
+]
+FLAT_INDENTED = [
+    {"type": "link", "title": "Map services", "url": BASE + "share/publish/maps.htm", "is_collapsed": False},
+    {"type": "link", "title": "Scene services", "url": BASE + "share/publish/scenes.htm", "is_collapsed": False},
+]
+
+@pytest.mark.parametrize("name, expected", [
+    ("active_nested_lists.html", NESTED_LISTS), # ul / ol / role=group depth
+    ("active_aria_level.html", ARIA_LEVEL),
+])
+def test_static_children_follow_the_structure(name, expected):
+    doc = parse_html(fixture_html(name))
+    assert StaticSidebar("site")._site_active_children(doc, BASE) == expected
+
+@needs_node
+@pytest.mark.parametrize("name, expected", [
+    ("active_nested_lists.html", NESTED_LISTS),
+    ("active_aria_level.html", ARIA_LEVEL),
+    ("active_flat_indented.html", FLAT_INDENTED), # no structure: falls back to indentation
+])
+def test_active_children_js_matches_the_layout_based_script(name, expected):
+    html = fixture_html(name)
+    assert run_page_script(fixture_html("active_children_layout.js"), html, BASE) == expected
+    assert run_page_script(full_site_printer.ACTIVE_CHILDREN_JS, html, BASE) == expected
+
+@needs_node
+def test_active_children_js_ignores_indentation_when_the_structure_is_known():
+    # A theme that doesn't indent aria-level items: the old script found nothing
+    html = fixture_html("active_aria_level.html").replace("padding-left", "margin-top")
+    assert run_page_script(fixture_html("active_children_layout.js"), html, BASE) == []
+    assert run_page_script(full_site_printer.ACTIVE_CHILDREN_JS, html, BASE) == ARIA_LEVEL
+
+@needs_node
+def test_pro_active_children_js_returns_the_whole_section():
+    html = fixture_html("sidebar_pro.html")
+    doc = parse_html(html)
+    section = doc.find(lambda el: el.has_class("accordion-content"))
+    expected = parse_section_pro(section, BASE)
+    assert [item["title"] for item in expected] == ["What's new", "Tour", "Maps", "Layouts"]
+    assert run_page_script(arcgis_pro_printer.ACTIVE_CHILDREN_JS, html, BASE) == expected
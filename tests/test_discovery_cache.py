@@ -0,0 +1,36 @@
+from discovery_cache import DiscoveryCache
+
+SIBLINGS = [{"type": "link", "title": "Install", "url": "https://example.com/install/", "is_collapsed": True}]
+CHILDREN = [{"type": "link", "title": "Windows", "url": "https://example.com/install/windows.htm"}]
+
+def scraper(result):
+    calls = []
+    def scrape(url):
+        calls.append(url)
+        return result
+    return scrape, calls
+
+def test_children_are_reused_from_the_saved_file(tmp_path):
+    path = str(tmp_path / "cache.json")
+    first = DiscoveryCache(path)
+    assert first.children(SIBLINGS[0]["url"], SIBLINGS, scraper(CHILDREN)[0]) == CHILDREN
+    first.save()
+
+    scrape, calls = scraper([])
+    assert DiscoveryCache(path).children(SIBLINGS[0]["url"], SIBLINGS, scrape) == CHILDREN
+    assert calls == []
+
+def test_empty_scrape_is_not_cached(tmp_path):
+    cache = DiscoveryCache(str(tmp_path / "cache.json"))
+    assert cache.children(SIBLINGS[0]["url"], SIBLINGS, scraper([])[0]) == []
+    scrape, calls = scraper(CHILDREN)
+    assert cache.children(SIBLINGS[0]["url"], SIBLINGS, scrape) == CHILDREN
+    assert len(calls) == 1
+
+def test_scrape_after_a_wait_fallback_is_not_cached(tmp_path):
+    cache = DiscoveryCache(str(tmp_path / "cache.json"))
+    cache.children(SIBLINGS[0]["url"], SIBLINGS, scraper(CHILDREN)[0], trusted=lambda: False)
+    scrape, calls = scraper(CHILDREN)
+    cache.children(SIBLINGS[0]["url"], SIBLINGS, scrape)
+    assert len(calls) == 1
+    assert cache.stats["uncached"] == 1
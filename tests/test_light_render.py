@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from light_render import ENGINES, MIN_PDF_BYTES, engine_available, html_to_pdf, page_css, print_document
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "enterprise_page.html")
+URL = "https://enterprise.arcgis.com/en/portal/latest/administer/windows/configure-ha.htm"
+FIGURE = '<svg width="640" height="360" viewBox="0 0 640 360"><rect width="640" height="360"/></svg>'
+
+@pytest.fixture
+def page_html():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return f.read()
+
+def with_figure(source, where="<h2 id=\"ESRI_SECTION1_B\">"):
+    return source.replace(where, FIGURE + where, 1)
+
+def test_docs_page_with_icons_takes_the_light_path(page_html):
+    document, page = print_document(page_html, URL, "fallback", "site", "")
+    assert document is not None, page
+    assert page["title"] == "Configure a highly available portal"
+    assert page["breadcrumbs"] == ["Portal for ArcGIS", "High availability"]
+    assert "<svg" not in document
+    assert "Join the standby machine" in document
+    assert 'href="https://enterprise.arcgis.com/en/portal/latest/system-requirements.htm"' in document
+
+def test_svg_figure_goes_to_chromium(page_html):
+    document, reason = print_document(with_figure(page_html), URL, "fallback", "site", "")
+    assert document is None
+    assert reason == "<svg>"
+
+def test_svg_figure_in_a_dropped_container_is_ignored(page_html):
+    source = with_figure(page_html, where="<p>Was this page helpful?</p>")
+    document, page = print_document(source, URL, "fallback", "site", "")
+    assert document is not None, page
+
+def test_script_rendered_page_goes_to_chromium():
+    source = "<html><body><main><div id=\"root\"></div><script src=\"app.js\"></script></main></body></html>"
+    assert print_document(source, URL, "fallback", "site", "") == (None, "little static text")
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engine_prints_the_fixture(engine, page_html, tmp_path):
+    if not engine_available(engine):
+        pytest.skip(f"{engine} is not installed")
+    document, _ = print_document(page_html, URL, "fallback", "site", page_css({"format": "A4"}))
+    path = str(tmp_path / "page.pdf")
+    html_to_pdf(document, path, engine, URL)
+    assert os.path.getsize(path) >= MIN_PDF_BYTES
@@ -0,0 +1,48 @@
+import os
+
+from markdown_export import chunk_markdown, hierarchy_of
+
+PAGE = """# Configure a highly available portal
+
+## Overview
+
+A highly available portal runs on two machines.
+
+## Steps
+
+1. Install Portal for ArcGIS on both machines.
+
+### Join the standby machine
+
+Run the join command on the standby machine."""
+
+def test_heading_only_section_merges_into_the_next():
+    chunks = chunk_markdown(PAGE)
+    assert [headings for headings, _ in chunks] == [
+        ["Configure a highly available portal", "Overview"],
+        ["Configure a highly available portal", "Steps"],
+        ["Configure a highly available portal", "Steps", "Join the standby machine"],
+    ]
+    assert chunks[0][1] == "# Configure a highly available portal\n\n## Overview\n\nA highly available portal runs on two machines."
+
+def test_heading_at_the_end_still_forms_a_chunk():
+    chunks = chunk_markdown("# Release notes\n\nWhat's new.\n\n## Known issues")
+    assert chunks[-1] == (["Release notes", "Known issues"], "## Known issues")
+
+def test_long_sections_are_cut_at_paragraphs():
+    paragraphs = [f"Paragraph {n} " + "x" * 80 for n in range(10)]
+    chunks = chunk_markdown("# Title\n\n" + "\n\n".join(paragraphs), max_chars=300)
+    assert all(len(text) <= 300 for _, text in chunks)
+    assert all(headings == ["Title"] for headings, _ in chunks)
+    assert "\n\n".join(text for _, text in chunks) == "# Title\n\n" + "\n\n".join(paragraphs)
+
+def test_hierarchy_of_introduction_page_drops_the_repeated_title():
+    root = os.path.join("out", "portal")
+    folder = os.path.join(root, "002_Administer", "003_High_availability")
+    titles = {os.path.join(root, "002_Administer"): "Administer", folder: "High availability"}
+    intro = os.path.join(folder, "000_Introduction.pdf")
+    page = os.path.join(folder, "001_Configure_HA.pdf")
+    assert hierarchy_of(intro, root, titles, "High availability") == ["Administer", "High availability"]
+    assert hierarchy_of(page, root, titles, "Configure HA") == ["Administer", "High availability", "Configure HA"]
+    # A landing page titled differently from its folder keeps both
+    assert hierarchy_of(intro, root, titles, "About high availability") == ["Administer", "High availability", "About high availability"]
@@ -0,0 +1,149 @@
+import os
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, FloatObject, NameObject, NumberObject, StreamObject, TextStringObject
+
+from pdf_merge import dest_prefix, merge_pdfs
+
+def blank_pdf(path, pages=1):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(200, 200)
+    writer.write(path)
+
+LOGO = bytes(range(256)) # 16x16 grey ramp
+
+def text_pdf(path, texts, anchor=None, logo=False):
+    """One page per text (Helvetica, not embedded); anchor names the last page and page 1 links to it.
+
+    logo=True draws the same LOGO image on every page, embedded once per file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({NameObject("/Type"): NameObject("/Font"), NameObject("/Subtype"): NameObject("/Type1"),
+                                                NameObject("/BaseFont"): NameObject("/Helvetica")}))
+    if logo:
+        image = StreamObject()
+        image.set_data(LOGO)
+        image.update({NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Image"),
+                      NameObject("/Width"): NumberObject(16), NameObject("/Height"): NumberObject(16),
+                      NameObject("/ColorSpace"): NameObject("/DeviceGray"), NameObject("/BitsPerComponent"): NumberObject(8)})
+        image = writer._add_object(image)
+    for text in texts:
+        page = writer.add_blank_page(300, 300)
+        contents = StreamObject()
+        draw = "q 32 0 0 32 20 200 cm /Logo Do Q " if logo else ""
+        contents.set_data(f"{draw}BT /F1 12 Tf 20 250 Td ({text}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(contents)
+        page[NameObject("/Resources")] = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+        if logo:
+            page["/Resources"][NameObject("/XObject")] = DictionaryObject({NameObject("/Logo"): image})
+    if anchor:
+        writer.add_named_destination(anchor, len(texts) - 1)
+        link = DictionaryObject({NameObject("/Type"): NameObject("/Annot"), NameObject("/Subtype"): NameObject("/Link"),
+                                 NameObject("/Rect"): ArrayObject(FloatObject(v) for v in (20, 240, 120, 260)),
+                                 NameObject("/Dest"): TextStringObject(anchor)})
+        writer.pages[0][NameObject("/Annots")] = ArrayObject([writer._add_object(link)])
+    writer.write(path)
+
+@pytest.fixture
+def site(tmp_path):
+    """Two top-level folders of two pages each, like a crawl output."""
+    root = tmp_path / "site"
+    for top in ("001_Install", "002_Administer"):
+        for n in range(2):
+            blank_pdf(str(root / top / f"00{n}_Page_{n}.pdf"))
+    return str(root)
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_trailer_size_stays_close_to_the_object_count(site, tmp_path, workers):
+    out = str(tmp_path / "merged.pdf")
+    merge_pdfs(site, out, workers=workers)
+    reader = PdfReader(out)
+    assert len(reader.pages) == 4
+    assert reader.trailer["/Size"] < 100
+
+@pytest.fixture
+def docs(tmp_path):
+    """A crawl output with folder intros, a nested folder, named destinations and one corrupt page."""
+    root = tmp_path / "docs"
+    install, windows, admin = root / "001_Install", root / "001_Install" / "002_Windows", root / "002_Administer"
+    entries = [
+        (install / "000_Introduction.pdf", "Install", ["Install intro"], "requirements"),
+        (install / "001_Requirements.pdf", "Requirements", ["Requirements", "Supported systems"], "systems"),
+        (windows / "000_Introduction.pdf", "Install on Windows", ["Windows intro"], None),
+        (windows / "001_Silent.pdf", "Silent install", ["Silent install"], "options"),
+        (admin / "001_Broken.pdf", "Broken page", None, None),
+        (admin / "002_Backup.pdf", "Backup", ["Backup", "Restore"], "restore"),
+    ]
+    for path, _, texts, anchor in entries:
+        if texts is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            path.write_bytes(b"%PDF-1.7\nthis is not a pdf\n")
+        else:
+            text_pdf(str(path), texts, anchor)
+    titles = {str(install): "Install", str(windows): "Windows", str(admin): "Administer"}
+    return str(root), [(str(path), title) for path, title, _, _ in entries], titles
+
+def outline_titles(reader, items=None):
+    items = reader.outline if items is None else items
+    nested = []
+    for item in items:
+        if isinstance(item, list):
+            nested[-1] = (nested[-1], outline_titles(reader, item))
+        else:
+            nested.append(item.title)
+    return nested
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_merge_keeps_pages_outline_and_named_destinations(docs, tmp_path, workers):
+    root, entries, titles = docs
+    out = str(tmp_path / "merged.pdf")
+    report = merge_pdfs(root, out, entries=entries, titles=titles, workers=workers)
+
+    reader = PdfReader(out)
+    assert len(reader.pages) == report["pages"] == 7
+    assert report["fragments"] == (2 if workers else 1)
+    assert [item["path"] for item in report["skipped"]] == [entries[4][0]]
+    assert [page.extract_text() for page in reader.pages] == [
+        "Install intro", "Requirements", "Supported systems", "Windows intro", "Silent install", "Backup", "Restore"]
+
+    # Folder intros are the folders' own bookmarks; the corrupt page has none
+    assert outline_titles(reader) == [
+        ("Install", ["Requirements", ("Windows", ["Silent install"])]),
+        ("Administer", ["Backup"]),
+    ]
+
+    # Each input's anchors are renamed with its merge position, and still land on its page
+    dests = reader.named_destinations
+    assert sorted(dests) == [dest_prefix(0) + "requirements", dest_prefix(1) + "systems",
+                             dest_prefix(3) + "options", dest_prefix(5) + "restore"]
+    assert {name: reader.get_page_number(dest.page) for name, dest in dests.items()} == {
+        dest_prefix(0) + "requirements": 0, dest_prefix(1) + "systems": 2,
+        dest_prefix(3) + "options": 4, dest_prefix(5) + "restore": 6}
+    # Links point at the renamed anchors
+    links = {n: str(page["/Annots"][0].get_object()["/Dest"]) for n, page in enumerate(reader.pages) if "/Annots" in page}
+    assert links == {0: dest_prefix(0) + "requirements", 1: dest_prefix(1) + "systems",
+                     4: dest_prefix(3) + "options", 5: dest_prefix(5) + "restore"}
+
+def logo_objects(reader):
+    return {page["/Resources"]["/XObject"].raw_get("/Logo").idnum for page in reader.pages}
+
+def test_optimize_stores_a_shared_image_once(tmp_path):
+    root = tmp_path / "docs"
+    for n, texts in enumerate((["Portal"], ["Server", "Data Store"], ["Enterprise Builder"])):
+        text_pdf(str(root / "001_Install" / f"00{n}_Page.pdf"), texts, logo=True)
+    plain, optimized = str(tmp_path / "plain.pdf"), str(tmp_path / "optimized.pdf")
+    merge_pdfs(str(root), plain)
+    report = merge_pdfs(str(root), optimized, optimize=True)
+
+    assert len(logo_objects(PdfReader(plain))) == 3 # one copy per input
+    reader = PdfReader(optimized)
+    assert len(logo_objects(reader)) == 1
+    assert report["optimize"]["deduped"] >= 2
+    assert reader.pages[3]["/Resources"]["/XObject"]["/Logo"].get_data() == LOGO
+    assert len(reader.pages) == 4
+    assert [page.extract_text() for page in reader.pages] == [page.extract_text() for page in PdfReader(plain).pages]
+    assert [page.extract_text() for page in reader.pages] == ["Portal", "Server", "Data Store", "Enterprise Builder"]
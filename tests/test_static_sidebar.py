@@ -0,0 +1,140 @@
+import time
+
+import pytest
+
+import arcgis_pro_printer
+import full_site_printer
+from page_scripts import fixture_html, needs_node, run_page_script
+from static_sidebar import COLLAPSED, NEEDS_EXPANSION, StaticSidebar, js_string_html, parse_html, sidebar_root, sidebar_rows, tree_from_rows
+from synthetic_site import SyntheticSite
+
+BASE = "https://enterprise.arcgis.com/en/portal/latest/administer/"
+
+def link(title, url, collapsed=False):
+    return {"type": "link", "title": title, "url": url, "is_collapsed": collapsed}
+
+def static_tree(name, variant, base=BASE):
+    root = sidebar_root(parse_html(fixture_html(name)), variant)
+    return tree_from_rows(sidebar_rows(root, base, variant))
+
+def page_urls(items):
+    for item in items:
+        if item.get("url"): yield item["url"]
+        yield from page_urls(item.get("children", []))
+
+def test_site_accordion_nests_lists_and_keeps_lazy_folders():
+    tree = static_tree("sidebar_site.html", "site")
+    assert [item["title"] for item in tree] == ["Get started", "Administer", "Related"]
+    started = tree[0]["children"]
+    assert started[1] == {"type": "group", "title": "Deployment overview", "url": BASE + "deploy/overview.htm", "children": [
+        link("Single machine", BASE + "deploy/single-machine.htm"),
+        {"type": "group", "title": "Multiple machines", "url": BASE + "deploy/multi-machine.htm",
+         "children": [link("Highly available", BASE + "deploy/ha.htm")]},
+    ]}
+    # Lazy folders: the children only appear on the folder's own pages
+    assert started[2] == link("Install", BASE + "install/overview.htm", collapsed=True)
+    assert started[3] == link("Upgrade", BASE + "upgrade/overview.htm", collapsed=True)
+    # A section's link that repeats the section title is dropped
+    assert [item["title"] for item in tree[1]["children"]] == ["Configure the portal", "Administrator reference"]
+
+def test_pro_fragment_group_needs_expansion():
+    tree = static_tree("sidebar_pro.html", "pro")
+    analysis = tree[1]
+    assert analysis["needs_expansion"] and analysis["children"] == []
+    assert analysis["fragment_url"] == "https://enterprise.arcgis.com/fragments/s001.js"
+    assert tree[2]["needs_expansion"] and "fragment_url" not in tree[2]
+    assert not tree[0]["needs_expansion"]
+
+def test_calcite_folders_keep_their_landing_page():
+    tree = static_tree("sidebar_cookbook.html", "site", "https://developers.arcgis.com/python/")
+    editing = tree[0]["children"][1]
+    assert editing["url"] == "https://developers.arcgis.com/cookbook/editing.htm"
+    assert editing["children"][1]["url"] == "https://developers.arcgis.com/cookbook/versioning.htm"
+    assert "url" not in tree[0] # titled by text: a section, not a page
+
+class FragmentPool:
+    def __init__(self, source):
+        self.source = source
+
+    def get_text(self, url):
+        return self.source, url
+
+def test_group_children_read_from_the_js_fragment():
+    source = fixture_html("sidebar_pro_fragment.js")
+    assert js_string_html(source).startswith('<ul><li><a href="/analysis/buffer.htm">')
+    sidebar = StaticSidebar("pro", FragmentPool(source))
+    children = sidebar.group_children({"title": "Analysis", "fragment_url": "https://pro.arcgis.com/fragments/s001.js"})
+    assert children == [
+        link("Buffer", "https://pro.arcgis.com/analysis/buffer.htm"),
+        link('Clip — "vector"', "https://pro.arcgis.com/analysis/clip.htm"),
+        link("Clip raster", "https://pro.arcgis.com/analysis/clip-raster.htm"),
+    ]
+
+@pytest.mark.parametrize("pages", [200, 2000])
+def test_cookbook_tree_lists_every_page(pages):
+    # The cookbook sidebar carries the whole tree, so one page must name them all
+    site = SyntheticSite("cookbook", pages)
+    base = "http://127.0.0.1:8123"
+    start = site.url(1)
+    root = sidebar_root(parse_html(site.page_html(1)), "site")
+    found = set(page_urls(tree_from_rows(sidebar_rows(root, base + start, "site"))))
+    missing = sorted(base + site.url(pid) for pid in site.pages if base + site.url(pid) not in found)
+    assert missing == []
+
+@needs_node
+@pytest.mark.parametrize("name, variant, printer", [
+    ("sidebar_site.html", "site", full_site_printer),
+    ("sidebar_cookbook.html", "site", full_site_printer),
+    ("sidebar_pro.html", "pro", arcgis_pro_printer),
+])
+def test_static_rows_match_tree_parser_js(name, variant, printer):
+    html = fixture_html(name)
+    rows = sidebar_rows(sidebar_root(parse_html(html), variant), BASE, variant)
+    if variant == "pro":
+        # Only the static side records the fragment URL (the browser clicks the title instead)
+        rows = [[parent, kind, title, "" if kind == "accordion" else url, flags] for parent, kind, title, url, flags in rows]
+    assert rows == run_page_script(printer.TREE_PARSER_JS, html, BASE)
+
+def test_tree_from_rows_nests_a_known_table():
+    rows = [
+        [-1, "section", "Get started", "", 0],
+        [0, "link", "Get started", "https://x/start.htm", 0], # repeats the section title: dropped
+        [0, "group", "Deploy", "https://x/deploy.htm", 0],
+        [2, "link", "Single machine", "https://x/single.htm", 0],
+        [2, "group", "Deploy", "https://x/deploy-again.htm", 0], # only sections filter titles
+        [4, "link", "Install", "https://x/install.htm", COLLAPSED],
+        [-1, "accordion", "Analysis", "https://x/fragments/s001.js", NEEDS_EXPANSION],
+        [-1, "accordion", "Sharing", "", 0],
+        [7, "section", "Sharing", "", 0], # dropped, and everything under it with it
+        [8, "link", "Share a map", "https://x/share.htm", 0],
+        [7, "link", "Share a layer", "https://x/layer.htm", 0],
+    ]
+    assert tree_from_rows(rows) == [
+        {"type": "group", "title": "Get started", "children": [
+            {"type": "group", "title": "Deploy", "url": "https://x/deploy.htm", "children": [
+                link("Single machine", "https://x/single.htm"),
+                {"type": "group", "title": "Deploy", "url": "https://x/deploy-again.htm", "children": [
+                    link("Install", "https://x/install.htm", collapsed=True)]},
+            ]},
+        ]},
+        {"type": "group", "title": "Analysis", "children": [], "needs_expansion": True,
+         "fragment_url": "https://x/fragments/s001.js"},
+        {"type": "group", "title": "Sharing", "children": [link("Share a layer", "https://x/layer.htm")],
+         "needs_expansion": False},
+    ]
+
+def test_tree_from_rows_scales_linearly():
+    def table(n):
+        # Eight children per row, so the tree is both wide and a few levels deep
+        return [[(i - 1) // 8 if i else -1, "group", f"Page {i}", f"https://x/p{i}.htm", 0] for i in range(n)]
+    def best_of(rows, runs=5):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            tree_from_rows(rows)
+            times.append(time.perf_counter() - start)
+        return min(times)
+    small, large = table(2000), table(20000)
+    assert len(list(page_urls(tree_from_rows(large)))) == 20000
+    # 10x the rows: about 10x the time when linear, about 100x when quadratic
+    assert best_of(large) / best_of(small) < 30
@@ -0,0 +1,118 @@
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+# ------------------------------------------------------------------
+# READINESS SIGNALS
+# ------------------------------------------------------------------
+# Each signal is a JS expression that becomes true once that part of the
+# page is usable. Signals for parts a site doesn't have evaluate to true.
+
+MAIN_CONTENT = "!!document.querySelector('main, div[role=\"main\"], .column-17, .column-19')"
+
+H1_HYDRATED = "(() => { let h = document.querySelector('header.trailer-1 h1') || document.querySelector('h1'); return !!h && h.textContent.trim().length > 0; })()"
+
+CALCITE_TREE_HYDRATED = "(() => { let t = document.querySelector('calcite-tree'); return !t || t.hasAttribute('calcite-hydrated'); })()"
+
+ACCORDION_NAV_POPULATED = "(() => { let a = document.querySelector('aside.js-accordion'); return !a || a.querySelectorAll('nav a').length > 0; })()"
+
+# Answers that mean "slow down", not "this page is broken"
+THROTTLE_STATUS = (429, 503)
+
+class Throttled(Exception):
+    """The server answered a navigation with 429 / 503; retry_after is its Retry-After in seconds, if any."""
+
+    def __init__(self, url, status, retry_after=None):
+        super().__init__(f"HTTP {status} for {url}" + (f" (retry after {retry_after:.0f}s)" if retry_after else ""))
+        self.status = status
+        self.retry_after = retry_after
+
+def check_throttle(response, url):
+    if response is None or response.status not in THROTTLE_STATUS:
+        return
+    try: retry_after = float(response.headers.get("retry-after", ""))
+    except ValueError: retry_after = None
+    raise Throttled(url, response.status, retry_after)
+
+class WaitPolicy:
+    """Navigate, then wait for DOM readiness signals instead of a blanket networkidle.
+
+    The fallback load state is only awaited when the signals never arrive.
+    """
+
+    def __init__(self, signals, wait_until="domcontentloaded", nav_timeout=60000,
+                 signal_timeout=15000, fallback="networkidle", fallback_timeout=10000):
+        self.signals = dict(signals) # name -> JS expression
+        self.wait_until = wait_until
+        self.nav_timeout = nav_timeout
+        self.signal_timeout = signal_timeout
+        self.fallback = fallback
+        self.fallback_timeout = fallback_timeout
+        self.script = "() => " + " && ".join(f"({expr})" for expr in self.signals.values()) if self.signals else None
+        self.stats = {"ready": 0, "fallback": 0, "missing": {}}
+
+    def _missing_script(self):
+        checks = ", ".join(f"[{name!r}, ({expr})]" for name, expr in self.signals.items())
+        return f"() => [{checks}].filter(s => !s[1]).map(s => s[0])"
+
+    def _record(self, outcome, missing=()):
+        self.stats[outcome] += 1
+        for name in missing:
+            self.stats["missing"][name] = self.stats["missing"].get(name, 0) + 1
+
+    # -- sync API ---------------------------------------------------
+    def goto(self, page, url):
+        check_throttle(page.goto(url, wait_until=self.wait_until, timeout=self.nav_timeout), url)
+        if not self.script:
+            return "ready"
+        return self.until(page, self.script, describe=True)
+
+    def until(self, page, script, arg=None, describe=False):
+        """Wait for a custom readiness script; falls back to the load state on timeout."""
+        try:
+            page.wait_for_function(script, arg=arg, timeout=self.signal_timeout)
+            self._record("ready")
+            return "ready"
+        except PlaywrightTimeoutError:
+            missing = []
+            if describe:
+                try: missing = page.evaluate(self._missing_script())
+                except: pass
+            self._record("fallback", missing)
+            try: page.wait_for_load_state(self.fallback, timeout=self.fallback_timeout)
+            except PlaywrightTimeoutError: pass
+            return "fallback"
+
+    # -- async API --------------------------------------------------
+    async def goto_async(self, page, url):
+        check_throttle(await page.goto(url, wait_until=self.wait_until, timeout=self.nav_timeout), url)
+        if not self.script:
+            return "ready"
+        return await self.until_async(page, self.script, describe=True)
+
+    async def until_async(self, page, script, arg=None, describe=False):
+        try:
+            await page.wait_for_function(script, arg=arg, timeout=self.signal_timeout)
+            self._record("ready")
+            return "ready"
+        except PlaywrightTimeoutError:
+            missing = []
+            if describe:
+                try: missing = await page.evaluate(self._missing_script())
+                except: pass
+            self._record("fallback", missing)
+            try: await page.wait_for_load_state(self.fallback, timeout=self.fallback_timeout)
+            except PlaywrightTimeoutError: pass
+            return "fallback"
+
+    # -- reporting --------------------------------------------------
+    def merge(self, stats):
+        self.stats["ready"] += stats["ready"]
+        self.stats["fallback"] += stats["fallback"]
+        for name, count in stats["missing"].items():
+            self.stats["missing"][name] = self.stats["missing"].get(name, 0) + count
+
+    def report(self):
+        total = self.stats["ready"] + self.stats["fallback"]
+        if not total: return
+        print(f"\n⏱️ Wait Policy: {self.stats['ready']} of {total} waits ended on readiness signals, {self.stats['fallback']} fell back to '{self.fallback}'")
+        for name, count in sorted(self.stats["missing"].items(), key=lambda kv: kv[1], reverse=True):
+            print(f"   {count:6d}  never saw {name}")
@@ -0,0 +1,155 @@
+import os
+import json
+import hashlib
+
+# ------------------------------------------------------------------
+# RECORD / REPLAY ARCHIVE (page.route)
+# ------------------------------------------------------------------
+# Layout under the archive root:
+#   blobs/ab/ab12...ef      response bodies, named by their sha256 (shared across URLs)
+#   index-<pid>.jsonl       one record per response: url, status, headers, sha256, size
+# Each process appends to its own index file, so sharded workers can record
+# into the same archive. On replay every index file is read and the latest
+# record for a URL wins.
+#
+# Route order: Playwright runs the most recently registered handler first.
+# Attach the archive BEFORE the resource policy, so blocked requests are
+# aborted by the policy and never reach (or get written to) the archive.
+
+# Hop-by-hop / encoding headers that no longer describe the stored (decoded) body
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+class WebArchive:
+    """Content-addressed store of GET responses, written while crawling and served back offline."""
+
+    def __init__(self, root, mode=None):
+        self.root = root
+        self.mode = mode # None (live), "record" or "replay"
+        self.index = None # url -> record, loaded on first replay
+        self.stats = {"recorded": 0, "replayed": 0, "missing": 0, "bytes": 0, "missing_urls": []}
+
+    # -- storage ----------------------------------------------------
+    def _blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def store(self, url, status, headers, body):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+
+        record = {"url": url, "status": status, "sha256": digest, "size": len(body),
+                  "headers": {k: v for k, v in headers.items() if k.lower() not in DROP_HEADERS}}
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, f"index-{os.getpid()}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        self.stats["recorded"] += 1
+        self.stats["bytes"] += len(body)
+
+    def load(self):
+        self.index = {}
+        if not os.path.isdir(self.root):
+            return self.index
+        for name in sorted(os.listdir(self.root)):
+            if not (name.startswith("index") and name.endswith(".jsonl")):
+                continue
+            with open(os.path.join(self.root, name), encoding="utf-8") as f:
+                for line in f:
+                    try: record = json.loads(line)
+                    except ValueError: continue # torn last line of an interrupted run
+                    self.index[record["url"]] = record
+        return self.index
+
+    def lookup(self, url):
+        """Return (status, headers, body) for a recorded URL, or None."""
+        if self.index is None:
+            self.load()
+        record = self.index.get(url)
+        if not record:
+            return None
+        try:
+            with open(self._blob_path(record["sha256"]), "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        return record["status"], record["headers"], body
+
+    def _miss(self, url):
+        self.stats["missing"] += 1
+        if len(self.stats["missing_urls"]) < 50:
+            self.stats["missing_urls"].append(url)
+
+    # -- sync API ---------------------------------------------------
+    def attach(self, target):
+        """Install on a sync Page or BrowserContext (no-op when mode is None)."""
+        if self.mode == "record":
+            def handle(route):
+                if route.request.method != "GET":
+                    route.fallback()
+                    return
+                try: response = route.fetch()
+                except Exception:
+                    route.abort()
+                    return
+                self.store(route.request.url, response.status, response.headers, response.body())
+                route.fulfill(response=response)
+            target.route("**/*", handle)
+
+        elif self.mode == "replay":
+            def handle(route):
+                hit = self.lookup(route.request.url) if route.request.method == "GET" else None
+                if hit is None:
+                    self._miss(route.request.url)
+                    route.abort("internetdisconnected")
+                    return
+                status, headers, body = hit
+                self.stats["replayed"] += 1
+                route.fulfill(status=status, headers=headers, body=body)
+            target.route("**/*", handle)
+
+    # -- async API --------------------------------------------------
+    async def attach_async(self, target):
+        """Install on an async Page or BrowserContext (no-op when mode is None)."""
+        if self.mode == "record":
+            async def handle(route):
+                if route.request.method != "GET":
+                    await route.fallback()
+                    return
+                try: response = await route.fetch()
+                except Exception:
+                    await route.abort()
+                    return
+                self.store(route.request.url, response.status, response.headers, await response.body())
+                await route.fulfill(response=response)
+            await target.route("**/*", handle)
+
+        elif self.mode == "replay":
+            async def handle(route):
+                hit = self.lookup(route.request.url) if route.request.method == "GET" else None
+                if hit is None:
+                    self._miss(route.request.url)
+                    await route.abort("internetdisconnected")
+                    return
+                status, headers, body = hit
+                self.stats["replayed"] += 1
+                await route.fulfill(status=status, headers=headers, body=body)
+            await target.route("**/*", handle)
+
+    # -- reporting --------------------------------------------------
+    def merge(self, stats):
+        """Fold in the stats of another archive instance (e.g. from a worker process)."""
+        for key in ("recorded", "replayed", "missing", "bytes"):
+            self.stats[key] += stats[key]
+        self.stats["missing_urls"].extend(stats["missing_urls"][:50 - len(self.stats["missing_urls"])])
+
+    def report(self):
+        if self.mode == "record":
+            print(f"\n📼 Archive: recorded {self.stats['recorded']} responses ({self.stats['bytes'] / 1024 / 1024:.1f} MB) into {self.root}")
+        elif self.mode == "replay":
+            print(f"\n📼 Archive: replayed {self.stats['replayed']} responses from {self.root}, {self.stats['missing']} not in the archive")
+            for url in self.stats["missing_urls"][:10]:
+                print(f"   ❌ {url}")